@@ -4,7 +4,6 @@ from multiprocessing.managers import BaseProxy
 
 from algs_wrapper.base import Base
 from utils.file_io import glob_file
-from evaluator.evaluator import Evaluator
 
 class PCGCv1(Base):
     def __init__(self):
@@ -38,6 +37,15 @@ class PCGCv1(Base):
 
         return cmd
     
+    def _encoded_files(self, bin_file):
+        # all the encoded binary files with same filename, except the 
+        # aggregated one written by ``_evaluate_and_log()``
+        aggregated_bin = Path(bin_file).with_suffix('.bin')
+        return sorted(
+            p for p in Path(bin_file).parent.glob(Path(bin_file).stem + '*')
+            if p != aggregated_bin
+        )
+
     # Overwriting the base class method due to the compressed binary 
     # file format of PCGCv1.
     def _evaluate_and_log(
@@ -63,17 +71,12 @@ class PCGCv1(Base):
                 with open(bin_file, 'rb') as fr:
                     fw.write(fr.read())
 
-        evaluator = Evaluator(
+        super()._evaluate_and_log(
             ref_pcfile,
             target_pcfile,
             aggregated_bin,
+            evl_log,
             enc_time,
             dec_time,
             o3d_vis
         )
-        ret = evaluator.evaluate()
-        
-        with open(evl_log, 'w') as f:
-            f.write(ret)
-
-
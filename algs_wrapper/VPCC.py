@@ -2,6 +2,7 @@ import logging
 from re import T
 
 from algs_wrapper.base import Base
+from utils.file_io import read_ply_header
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +27,7 @@ class VPCC(Base):
             '--computeChecksum=0'
         ]
         try:
-            assert self._has_color
+            assert read_ply_header(in_pcfile).has_colors
         except AssertionError as e:
             logger.error(
                 "V-PCC only supports point cloud with color, please check the "
@@ -1,25 +1,37 @@
 import os
 import re
 import abc
+import json
 import time
 import logging
 import datetime
 import subprocess as sp
 from pathlib import Path
 from functools import partial
-from typing import Union, List, Tuple
+from collections import defaultdict
+from typing import Union, List, Tuple, Optional
 from multiprocessing.managers import BaseProxy
 
 import open3d as o3d
 from xvfbwrapper import Xvfb
 
-from utils.processing import parallel
+from utils._version import __version__
+from utils.processing import parallel, pipeline, get_visualizer
 from evaluator.evaluator import Evaluator
-from utils.file_io import load_cfg, glob_file
+from evaluator.metrics.PointBasedMetrics import PointBasedMetrics
+from evaluator.metrics.ProjectionBasedMetrics import ProjectionBasedMetrics
+from evaluator.results import save_result, sidecar_path
+from utils.file_io import load_cfg, glob_file, file_hash
+from utils.run_manifest import RunManifest, file_signature, config_hash
 from evaluator.summary import summarize_one_setup
 
 logger = logging.getLogger(__name__)
 
+# Suffix of the evaluation jobs saved by the deferred evaluation mode
+PENDING_SUFFIX = '.pending'
+# Directory of the run manifests in the experiment directory of a setup
+MANIFEST_DIR = 'manifest'
+
 class Base(metaclass=abc.ABCMeta):
     def __init__(self) -> None:
         algs_cfg_file = (
@@ -32,6 +44,12 @@ class Base(metaclass=abc.ABCMeta):
         self._use_gpu = self._algs_cfg['use_gpu']
         self._failure_cnt = 0
         self.debug = False
+        self.defer_evaluation = False
+        self.memory_limit = None
+        self.projection = None
+        self.resume = True
+        # GPU codecs leave the GPUs idle during the evaluation otherwise
+        self.pipelined = self._use_gpu
 
     @abc.abstractmethod
     def make_encode_cmd(self) -> List[str]:
@@ -87,12 +105,100 @@ class Base(metaclass=abc.ABCMeta):
                 "be counted and skipped."
             )
 
+    @property
+    def defer_evaluation(self) -> bool:
+        return self._defer_evaluation
+    
+    @defer_evaluation.setter
+    def defer_evaluation(self, defer_evaluation: bool) -> None:
+        if type(defer_evaluation) is not bool:
+            logger.error("`defer_evaluation` flag must be a boolean value.")
+            raise ValueError
+        
+        self._defer_evaluation = defer_evaluation
+        if defer_evaluation is True:
+            logger.info(
+                "Deferred evaluation mode is on. The decoded point clouds "
+                "will be evaluated later by ``evaluate_pending()``."
+            )
+
+    @property
+    def memory_limit(self) -> int:
+        """Memory limit of each evaluation in bytes. Point clouds too 
+        large to be evaluated within it are evaluated tile by tile, so 
+        they can be evaluated with all the parallel processes. None for 
+        unbounded.
+        """
+        return self._memory_limit
+    
+    @memory_limit.setter
+    def memory_limit(self, memory_limit: int) -> None:
+        if memory_limit is not None and (
+            type(memory_limit) is not int or memory_limit <= 0
+        ):
+            logger.error("`memory_limit` must be a positive integer or None.")
+            raise ValueError
+        
+        self._memory_limit = memory_limit
+
+    @property
+    def projection(self) -> str:
+        """Renderer of the projection-based metrics. 'numpy' for the 
+        headless renderer, 'open3d' for the open3d visualizer, with a 
+        virtual display and a persistent visualizer for each worker 
+        process, or None to skip the projection-based metrics.
+        """
+        return self._projection
+    
+    @projection.setter
+    def projection(self, projection: str) -> None:
+        if projection not in (None, 'numpy', 'open3d'):
+            logger.error("`projection` must be 'numpy', 'open3d' or None.")
+            raise ValueError
+        
+        self._projection = projection
+
+    @property
+    def resume(self) -> bool:
+        """True for skipping the encoding, decoding and evaluation 
+        already completed by the previous runs with the same input 
+        file, config and evaluator, see ``utils.run_manifest``.
+        """
+        return self._resume
+    
+    @resume.setter
+    def resume(self, resume: bool) -> None:
+        if type(resume) is not bool:
+            logger.error("`resume` flag must be a boolean value.")
+            raise ValueError
+        
+        self._resume = resume
+
+    @property
+    def pipelined(self) -> bool:
+        """True for running the encoding and decoding, and the 
+        evaluation in separate worker pools, overlapping the two stages,
+        see ``utils.processing.pipeline()``. Defaults to True for the 
+        algorithms using GPUs, where the codec pool is sized to the 
+        number of GPUs.
+        """
+        return self._pipelined
+    
+    @pipelined.setter
+    def pipelined(self, pipelined: bool) -> None:
+        if type(pipelined) is not bool:
+            logger.error("`pipelined` flag must be a boolean value.")
+            raise ValueError
+        
+        self._pipelined = pipelined
+
     def run_dataset(
             self,
             ds_name: str,
             exp_dir: Union[str, Path],
             nbprocesses: int = None,
-            ds_cfg_file: Union[str, Path] = 'cfgs/datasets.yml'
+            ds_cfg_file: Union[str, Path] = 'cfgs/datasets.yml',
+            eval_nbprocesses: int = None
         ) -> None:
         """Run the experiments on dataset `ds_name` in the ``exp_dir``.
         
@@ -108,6 +214,60 @@ class Base(metaclass=abc.ABCMeta):
         ds_cfg_file : `Union[str, Path]`, optional
             The YAML config file of datasets. Defaults to 
             'cfgs/datasets.yml'.
+        eval_nbprocesses : `int`, optional
+            Number of evaluation processes if ``pipelined`` is True. If
+            None, it will equal to the cpu count. Defaults to None.
+        """
+        pc_files, dirs = self.setup_dataset(ds_name, exp_dir, ds_cfg_file)
+        exp_dir = dirs['exp_dir']
+        
+        logger.info(
+            f"Start to run experiments on {ds_name} dataset "
+            f"with {type(self).__name__} in {exp_dir}"
+        )
+
+        # A visualizer cannot cross the process boundaries, so each 
+        # worker creates its own one on its own virtual display, see 
+        # ``utils.processing.get_visualizer()``.
+        display = (
+            self.projection == 'open3d' and self.defer_evaluation is False
+        )
+        
+        if self.pipelined is True:
+            pipeline(
+                partial(self._run_codec, **dirs), self._run_evaluation,
+                pc_files, self._use_gpu, nbprocesses, eval_nbprocesses,
+                display=display
+            )
+        else:
+            parallel(
+                partial(self._run, **dirs), pc_files, self._use_gpu, 
+                nbprocesses, display=display
+            )
+        
+        logger.info(f"Total count of failures: {self._failure_cnt}")
+        
+        # summarized by ``evaluate_pending()`` in deferred mode
+        if self.defer_evaluation is False:
+            summarize_one_setup(
+                Path(exp_dir).joinpath('evl'), color=self._has_color
+            )
+
+    def setup_dataset(
+            self,
+            ds_name: str,
+            exp_dir: Union[str, Path],
+            ds_cfg_file: Union[str, Path] = 'cfgs/datasets.yml'
+        ) -> Tuple[List[str], dict]:
+        """Set up the experiments on dataset ``ds_name`` with the 
+        current rate, see ``run_dataset()``.
+
+        Returns
+        -------
+        `Tuple[List[str], dict]`
+            The input point clouds relative to the dataset directory,
+            and the keyword arguments ``src_dir``, ``nor_dir`` and 
+            ``exp_dir`` of ``_run()`` on each of them.
         """
         if ds_cfg_file == 'cfgs/datasets.yml':
             ds_cfg_file = (
@@ -129,41 +289,19 @@ class Base(metaclass=abc.ABCMeta):
             .joinpath(f'{type(self).__name__}/{ds_name}/{self._rate}')
             .resolve()
         )
-        
-        logger.info(
-            f"Start to run experiments on {ds_name} dataset "
-            f"with {type(self).__name__} in {exp_dir}"
-        )
 
         pc_files = glob_file(
             ds_cfg[ds_name]['dataset_dir'],
             ds_cfg[ds_name]['test_pattern'],
             verbose=True
         )
+        dirs = {
+            'src_dir': ds_cfg[ds_name]['dataset_dir'],
+            'nor_dir': ds_cfg[ds_name]['dataset_w_normal_dir'],
+            'exp_dir': exp_dir,
+        }
 
-        # [TODO] 
-        # Workaround for using open3d visualizer with multithreading.
-        # Create visualizer here to prevent the deconstructor of the 
-        # visualizer terminate the `glfw`.
-        # [ref.] https://github.com/intel-isl/Open3D/issues/389#issuecomment-396858138
-        # o3d_vis = o3d.visualization.Visualizer()
-        o3d_vis = None
-
-        prun = partial(
-            self._run,
-            src_dir=ds_cfg[ds_name]['dataset_dir'],
-            nor_dir=ds_cfg[ds_name]['dataset_w_normal_dir'],
-            exp_dir=exp_dir,
-            o3d_vis = o3d_vis
-        )
-        
-        parallel(prun, pc_files, self._use_gpu, nbprocesses)
-        
-        logger.info(f"Total count of failures: {self._failure_cnt}")
-        
-        summarize_one_setup(
-            Path(exp_dir).joinpath('evl'), color=ds_cfg[ds_name]['color']
-        )
+        return pc_files, dirs
 
     def _run(
             self,
@@ -188,47 +326,220 @@ class Base(metaclass=abc.ABCMeta):
             for p2plane metrics.)
         exp_dir : `Union[str, Path]`
             The directory to store experiments results.
-        resolution : `int`, optional
-            Maximum NN distance of the ``pcfile``. Only used for 
-            evaluation. If the resolution is not specified, it will be 
-            calculated on the fly. Defaults to None.
         gpu_queue : `BaseProxy`, optional
             A multiprocessing Manager.Queue() object. The queue stores 
             the GPU device IDs get from GPUtil.getAvailable(). Must be 
             assigned if running a PCC algorithm using GPUs. Defaults to 
             None.
         """
+        job = self._run_codec(pcfile, src_dir, nor_dir, exp_dir, gpu_queue)
+        if job is not None:
+            self._run_evaluation(job, o3d_vis)
+
+    def _run_codec(
+            self,
+            pcfile: Union[str, Path],
+            src_dir: Union[str, Path],
+            nor_dir: Union[str, Path],
+            exp_dir: Union[str, Path],
+            gpu_queue: BaseProxy = None
+        ) -> Optional[dict]:
+        """The codec stage of ``_run()``. Encode and decode the given 
+        ``pcfile``, unless they are completed by the previous runs.
+
+        Parameters are the same as ``_run()``.
+
+        Returns
+        -------
+        `Optional[dict]`
+            The evaluation job of the decoded point cloud for 
+            ``_run_evaluation()``, or None if the experiment failed or 
+            the evaluation is completed by the previous runs.
+        """
         self._gpu_queue = gpu_queue
 
         in_pcfile, nor_pcfile, bin_file, out_pcfile, evl_log = (
             self._set_filepath(pcfile, src_dir, nor_dir, exp_dir)
         )
 
-        try:
-            enc_time, dec_time = self._encode_and_decode(
-                in_pcfile, bin_file, out_pcfile
-            )
-        except:
-            if not self.debug:
+        # stages completed by the previous runs, see ``RunManifest``
+        manifest = self._manifest(pcfile, exp_dir)
+        encode_key = self._encode_key(in_pcfile)
+        encoded = manifest.get(
+            'encode', encode_key, self._encoded_files(bin_file)
+        ) if self.resume else None
+        decoded = manifest.get(
+            'decode', self._decode_key(bin_file), [out_pcfile]
+        ) if encoded is not None else None
+
+        if decoded is not None:
+            enc_time, dec_time = encoded['time'], decoded['time']
+            logger.debug(f"Skip encoding and decoding {in_pcfile}.")
+        else:
+            try:
+                if encoded is not None:
+                    enc_time = encoded['time']
+                    dec_time = self._decode(bin_file, out_pcfile)
+                else:
+                    enc_time, dec_time = self._encode_and_decode(
+                        in_pcfile, bin_file, out_pcfile
+                    )
+            except:
+                if not self.debug:
+                    self._failure_cnt += 1
+                    return None
+
+            # failed codecs are logged by ``_run_command()`` without
+            # raising, so no evaluation job is returned for them
+            if (
+                enc_time is None or dec_time is None
+                or not Path(out_pcfile).exists()
+            ):
+                logger.error(f"Failed to encode and decode {in_pcfile}.")
                 self._failure_cnt += 1
-                return
+                return None
+
+            encoded_files = self._encoded_files(bin_file)
+            manifest.record(
+                'encode', encode_key, encoded_files, time=enc_time
+            )
+            manifest.record(
+                'decode', self._decode_key(bin_file), [out_pcfile],
+                time=dec_time
+            )
         
         # # For evaluation only
         # enc_time = dec_time = -1
         # if not Path(out_pcfile).exists():
         #     return
         
+        evaluate_key = self._evaluate_key(nor_pcfile, out_pcfile, bin_file)
+        evaluated = manifest.get(
+            'evaluate', evaluate_key, [evl_log, sidecar_path(evl_log)]
+        )
+        if self.resume and evaluated is not None:
+            logger.debug(f"Skip evaluating {out_pcfile}.")
+            return None
+        
+        return {
+            'ref_pcfile': nor_pcfile,
+            'target_pcfile': out_pcfile,
+            'bin_file': bin_file,
+            'evl_log': evl_log,
+            'enc_time': enc_time,
+            'dec_time': dec_time,
+            'manifest': [str(manifest.path), evaluate_key],
+        }
+
+    def _run_evaluation(self, job: dict, o3d_vis = None) -> None:
+        """The evaluation stage of ``_run()``. Evaluate the decoded point
+        cloud of a job from ``_run_codec()``, and record it in the run 
+        manifest with its running time.
+        """
+        start_time = time.time()
         self._evaluate_and_log(
-            nor_pcfile, out_pcfile, bin_file, evl_log, enc_time, dec_time, o3d_vis
+            job['ref_pcfile'], job['target_pcfile'], job['bin_file'], 
+            job['evl_log'], job['enc_time'], job['dec_time'], o3d_vis
+        )
+        evl_time = time.time() - start_time
+
+        if self.defer_evaluation is True:
+            # recorded by ``evaluate_pending()``
+            pending_file = Path(job['evl_log']).with_suffix(PENDING_SUFFIX)
+            pending = json.loads(pending_file.read_text())
+            pending['manifest'] = job['manifest']
+            pending_file.write_text(json.dumps(pending))
+        else:
+            manifest_file, evaluate_key = job['manifest']
+            RunManifest(manifest_file).record(
+                'evaluate', evaluate_key, 
+                [job['evl_log'], sidecar_path(job['evl_log'])], 
+                time=evl_time
+            )
+
+    def pending_stages(
+            self,
+            pcfile: Union[str, Path],
+            src_dir: Union[str, Path],
+            nor_dir: Union[str, Path],
+            exp_dir: Union[str, Path]
+        ) -> List[str]:
+        """The stages of the experiment on ``pcfile`` not completed by
+        the previous runs, i.e., the stages ``_run()`` would run.
+
+        Parameters are the same as ``_run()``.
+
+        Returns
+        -------
+        `List[str]`
+            The pending stages among 'encode', 'decode' and 'evaluate'.
+        """
+        in_pcfile, nor_pcfile, bin_file, out_pcfile, evl_log = (
+            self._set_filepath(pcfile, src_dir, nor_dir, exp_dir, mkdir=False)
+        )
+        if self.resume is False:
+            return ['encode', 'decode', 'evaluate']
+
+        manifest = self._manifest(pcfile, exp_dir)
+        if manifest.get(
+            'encode', self._encode_key(in_pcfile), 
+            self._encoded_files(bin_file)
+        ) is None:
+            return ['encode', 'decode', 'evaluate']
+        if manifest.get(
+            'decode', self._decode_key(bin_file), [out_pcfile]
+        ) is None:
+            return ['decode', 'evaluate']
+        if manifest.get(
+            'evaluate', self._evaluate_key(nor_pcfile, out_pcfile, bin_file),
+            [evl_log, sidecar_path(evl_log)]
+        ) is None:
+            return ['evaluate']
+
+        return []
+
+    def _manifest(
+            self,
+            pcfile: Union[str, Path],
+            exp_dir: Union[str, Path]
+        ) -> RunManifest:
+        """The run manifest of the experiment on ``pcfile``.
+        """
+        return RunManifest(
+            Path(exp_dir).joinpath(MANIFEST_DIR, pcfile).with_suffix('.json')
         )
 
+    def _encode_key(self, in_pcfile: Union[str, Path]) -> dict:
+        return {
+            'input': file_hash(in_pcfile),
+            'config': self._config_hash(),
+            # encoding parameters of the dataset, see ``setup_dataset()``
+            'dataset': {'scale': self._pc_scale, 'color': self._has_color},
+        }
+
+    def _decode_key(self, bin_file: Union[str, Path]) -> dict:
+        return {'bin': file_signature(self._encoded_files(bin_file))}
+
+    def _evaluate_key(
+            self,
+            nor_pcfile: Union[str, Path],
+            out_pcfile: Union[str, Path],
+            bin_file: Union[str, Path]
+        ) -> dict:
+        return {
+            'reference': file_hash(nor_pcfile),
+            'target': file_signature([out_pcfile]),
+            'bin': file_signature(self._encoded_files(bin_file)),
+            'evaluator': self._evaluator_options(),
+        }
 
     def _set_filepath(
             self, 
             pcfile: Union[str, Path],
             src_dir: Union[str, Path],
             nor_dir: Union[str, Path],
-            exp_dir: Union[str, Path]
+            exp_dir: Union[str, Path],
+            mkdir: bool = True
         ) -> Tuple[str, str, str, str, str]:
         """Set up the experiment file paths, including encoded binary, 
         decoded point cloud, and evaluation log.
@@ -244,6 +555,8 @@ class Base(metaclass=abc.ABCMeta):
             for p2plane metrics.)
         exp_dir : `Union[str, Path]`
             The directory to store experiments results.
+        mkdir : `bool`, optional
+            True for creating the output directories. Defaults to True.
         
         Returns
         -------
@@ -261,15 +574,63 @@ class Base(metaclass=abc.ABCMeta):
         out_pcfile = Path(exp_dir).joinpath('dec', pcfile)
         evl_log = Path(exp_dir).joinpath('evl', pcfile).with_suffix('.log')
         
-        bin_file.parent.mkdir(parents=True, exist_ok=True)
-        out_pcfile.parent.mkdir(parents=True, exist_ok=True)
-        evl_log.parent.mkdir(parents=True, exist_ok=True)
+        if mkdir is True:
+            bin_file.parent.mkdir(parents=True, exist_ok=True)
+            out_pcfile.parent.mkdir(parents=True, exist_ok=True)
+            evl_log.parent.mkdir(parents=True, exist_ok=True)
 
         return (
             str(in_pcfile), str(nor_pcfile), str(bin_file), str(out_pcfile), 
             str(evl_log)
         )
 
+    def _config_hash(self) -> str:
+        """Hash of the config of the algorithm with the current rate.
+        """
+        cfg = {
+            key: val for key, val in self._algs_cfg.items()
+            if re.fullmatch('r[0-9]+', key) is None
+        }
+        cfg['rate'] = self._algs_cfg[self.rate]
+
+        return config_hash(cfg)
+
+    def _evaluator_options(self) -> dict:
+        """Version and options of the evaluator, and the versions of the
+        metric families. Evaluation logs written with different ones are
+        evaluated again when resuming, recomputing only the outdated
+        metric families missing in the metric cache.
+        """
+        return {
+            'version': __version__,
+            'projection': self.projection,
+            'metrics': {
+                metric.NAME: metric.VERSION
+                for metric in (PointBasedMetrics, ProjectionBasedMetrics)
+            }
+        }
+
+    def _encoded_files(self, bin_file: Union[str, Path]) -> List[Path]:
+        """The files written by the encoder.
+        """
+        return [Path(bin_file)]
+
+    def _decode(
+            self,
+            bin_file: Union[str, Path],
+            out_pcfile: Union[str, Path]
+        ) -> float:
+        """Decode an existing binary file, see ``_encode_and_decode()``.
+        """
+        dec_cmd = self.make_decode_cmd(bin_file, out_pcfile)
+
+        try:
+            dec_time = self._run_command(dec_cmd)
+        except:
+            dec_time = None
+        finally:
+            return dec_time
+
     def _encode_and_decode(
             self,
             in_pcfile: Union[str, Path],
@@ -386,15 +747,135 @@ class Base(metaclass=abc.ABCMeta):
             dec_time: float = None,
             o3d_vis = None
         ):
+        if self.defer_evaluation is True:
+            job = {
+                'ref_pcfile': str(ref_pcfile),
+                'target_pcfile': str(target_pcfile),
+                'bin_file': str(bin_file),
+                'evl_log': str(evl_log),
+                'enc_time': enc_time,
+                'dec_time': dec_time,
+                'color': self._has_color,
+                'memory_limit': self.memory_limit,
+                'projection': self.projection,
+            }
+            pending_file = Path(evl_log).with_suffix(PENDING_SUFFIX)
+            pending_file.write_text(json.dumps(job))
+            return
+        
+        if o3d_vis is None and self.projection == 'open3d':
+            o3d_vis = get_visualizer()
+        
         evaluator = Evaluator(
             ref_pcfile,
             target_pcfile,
             bin_file,
             enc_time,
             dec_time,
-            o3d_vis
+            o3d_vis,
+            memory_limit=self.memory_limit,
+            projection=self.projection is not None
         )
-        ret = evaluator.evaluate()
-        
-        with open(evl_log, 'w') as f:
-            f.write(ret)
\ No newline at end of file
+        save_result(evl_log, evaluator.evaluate())
+
+def evaluate_pending(
+        exp_dir: Union[str, Path],
+        nbprocesses: int = None
+    ) -> None:
+    """Evaluate the decoded point clouds saved by the deferred 
+    evaluation mode (``Base.defer_evaluation``) in ``exp_dir``. The jobs
+    are grouped by the reference point cloud and the evaluation options
+    (``memory_limit`` and ``projection``), so the decoded point clouds 
+    of one source file, across the algorithms and rates, are evaluated 
+    in a single pass with ``Evaluator.evaluate_many()``. The evaluated 
+    setups are summarized afterwards.
+
+    Parameters
+    ----------
+    exp_dir : `Union[str, Path]`
+        The directory of experiments results.
+    nbprocesses : `int`, optional
+        Specify the number of cpu parallel processes. If None, it will 
+        equal to the cpu count. Defaults to None.
+    """
+    pending_files = list(Path(exp_dir).rglob(f'*{PENDING_SUFFIX}'))
+    if len(pending_files) == 0:
+        logger.info(f"No pending evaluation in {exp_dir}.")
+        return
+    
+    groups = defaultdict(list)
+    for pending_file in pending_files:
+        job = json.loads(pending_file.read_text())
+        job['pending_file'] = str(pending_file)
+        groups[
+            job['ref_pcfile'], job.get('memory_limit'), job.get('projection')
+        ].append(job)
+    
+    logger.info(
+        f"Evaluate {len(pending_files)} decoded point clouds against "
+        f"{len(groups)} reference point clouds."
+    )
+    parallel(
+        _evaluate_group, list(groups.values()), nbprocesses=nbprocesses,
+        display=any(
+            job.get('projection') == 'open3d'
+            for jobs in groups.values() for job in jobs
+        )
+    )
+    
+    # the logs are stored in '{exp_dir}/evl', see ``Base._set_filepath()``
+    setups = {}
+    for jobs in groups.values():
+        for job in jobs:
+            evl_dir = next(
+                p for p in Path(job['evl_log']).parents if p.name == 'evl'
+            )
+            setups[evl_dir] = job['color']
+    for evl_dir, color in setups.items():
+        summarize_one_setup(evl_dir, color=color)
+
+def _evaluate_group(jobs: List[dict]) -> None:
+    """Evaluate the pending ``jobs`` sharing the same reference point 
+    cloud and evaluation options, and write the evaluation logs. The 
+    jobs failed to evaluate stay pending.
+    """
+    for job in jobs:
+        if not Path(job['target_pcfile']).exists():
+            logger.warning(
+                f"Not found the decoded point cloud {job['target_pcfile']}."
+                f" Drop its pending evaluation."
+            )
+            os.remove(job['pending_file'])
+    jobs = [job for job in jobs if Path(job['target_pcfile']).exists()]
+    if len(jobs) == 0:
+        return
+    
+    projection = jobs[0].get('projection')
+    start_time = time.time()
+    results = Evaluator.evaluate_many(
+        jobs[0]['ref_pcfile'],
+        [
+            (job['target_pcfile'], job['bin_file'], job['enc_time'],
+             job['dec_time'])
+            for job in jobs
+        ],
+        o3d_vis=get_visualizer() if projection == 'open3d' else None,
+        memory_limit=jobs[0].get('memory_limit'),
+        projection=projection is not None
+    )
+    # the reference is loaded once for the group, so each target is
+    # recorded with an equal share of the running time
+    evl_time = (time.time() - start_time) / len(jobs)
+    
+    for job, ret in zip(jobs, results):
+        if ret is None:
+            continue
+        save_result(job['evl_log'], ret)
+        if 'manifest' in job:
+            manifest_file, evaluate_key = job['manifest']
+            RunManifest(manifest_file).record(
+                'evaluate', evaluate_key, 
+                [job['evl_log'], sidecar_path(job['evl_log'])], 
+                time=evl_time
+            )
+        os.remove(job['pending_file'])
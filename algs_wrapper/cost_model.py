@@ -0,0 +1,110 @@
+import logging
+from collections import defaultdict
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stages of an experiment on a point cloud, see ``Base.pending_stages()``
+STAGES = ('encode', 'decode', 'evaluate')
+
+class CostModel():
+    """Predicts the running time of each stage of an experiment from the
+    number of points of the input point cloud, fitted on the running
+    times recorded by the previous runs.
+
+    The running time of a stage is modeled as t = a + b * n for n
+    points, fitted by least squares on the records of the same
+    algorithm and rate, or of the same algorithm if the rate has no
+    record yet, or of all the algorithms if the algorithm has none.
+    """
+    def __init__(self) -> None:
+        # (number of points, seconds) of each (stage, [algorithm,
+        # [rate]])
+        self._samples = defaultdict(list)
+        self._fitted = {}
+
+    def add(
+            self,
+            stage: str,
+            algorithm: str,
+            rate: str,
+            num_points: int,
+            seconds: float
+        ) -> None:
+        """Add a recorded running time of a stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            One of ``STAGES``.
+        algorithm : `str`
+            Name of the algorithm.
+        rate : `str`
+            Tag of the rate control set.
+        num_points : `int`
+            Number of points of the input point cloud.
+        seconds : `float`
+            The running time.
+        """
+        for key in _keys(stage, algorithm, rate):
+            self._samples[key].append((num_points, seconds))
+            self._fitted.pop(key, None)
+
+    def predict(
+            self,
+            stage: str,
+            algorithm: str,
+            rate: str,
+            num_points: int
+        ) -> Optional[float]:
+        """Predict the running time of a stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            One of ``STAGES``.
+        algorithm : `str`
+            Name of the algorithm.
+        rate : `str`
+            Tag of the rate control set.
+        num_points : `int`
+            Number of points of the input point cloud.
+
+        Returns
+        -------
+        `Optional[float]`
+            The predicted running time in seconds, or None if no
+            running time of the stage is recorded.
+        """
+        for key in _keys(stage, algorithm, rate):
+            if key in self._samples:
+                if key not in self._fitted:
+                    self._fitted[key] = _fit(self._samples[key])
+                intercept, slope = self._fitted[key]
+                return intercept + slope * num_points
+
+        return None
+
+def _keys(stage: str, algorithm: str, rate: str) -> List[tuple]:
+    # from the most specific to the least specific
+    return [(stage, algorithm, rate), (stage, algorithm), (stage,)]
+
+def _fit(samples: List[Tuple[int, float]]) -> Tuple[float, float]:
+    """Least-squares fit of t = a + b * n with non-negative a and b.
+    """
+    num_points, seconds = np.asarray(samples, dtype=np.float64).T
+
+    if np.ptp(num_points) > 0:
+        slope, intercept = np.polyfit(num_points, seconds, 1)
+        if slope >= 0 and intercept >= 0:
+            return float(intercept), float(slope)
+        if slope < 0:
+            # no trend, e.g., dominated by the startup time
+            return float(seconds.mean()), 0.0
+    if num_points.sum() > 0:
+        # proportional to the number of points
+        return 0.0, float(seconds.sum() / num_points.sum())
+
+    return float(seconds.mean()), 0.0
@@ -0,0 +1,298 @@
+import logging
+from pathlib import Path
+from functools import lru_cache
+from collections import Counter
+from typing import Union, List, Tuple, NamedTuple, Optional
+
+from utils.file_io import load_cfg, read_ply_header
+from utils.processing import schedule, GPU_GROUP
+from algs_wrapper.base import Base
+from algs_wrapper.cost_model import CostModel, STAGES
+from algs_wrapper.Draco import Draco
+from algs_wrapper.GPCC import GPCC
+from algs_wrapper.VPCC import VPCC
+from algs_wrapper.GeoCNNv1 import GeoCNNv1
+from algs_wrapper.GeoCNNv2 import GeoCNNv2
+from algs_wrapper.PCGCv1 import PCGCv1
+from algs_wrapper.PCGCv2 import PCGCv2
+from evaluator.summary import summarize_one_setup, summarize_all_to_csv
+
+logger = logging.getLogger(__name__)
+
+EXPERIMENTS_CFG = (
+    Path(__file__).parents[1].joinpath('cfgs/experiments.yml').resolve()
+)
+EXPERIMENTS_SHORT_CFG = (
+    Path(__file__).parents[1]
+    .joinpath('cfgs/experiments_short.yml').resolve()
+)
+ALGORITHMS = {
+    alg.__name__: alg
+    for alg in (Draco, GPCC, VPCC, GeoCNNv1, GeoCNNv2, PCGCv1, PCGCv2)
+}
+# Attributes of the algorithm wrappers configurable in the ``options``
+# of each algorithm
+OPTIONS = ('debug', 'memory_limit', 'projection', 'resume')
+
+class Job(NamedTuple):
+    """An experiment on a single point cloud.
+    """
+    algorithm: str
+    dataset: str
+    rate: str
+    pcfile: str
+    # the algorithm wrapper set up for the dataset and the rate
+    wrapper: Base
+    # ``src_dir``, ``nor_dir`` and ``exp_dir`` of ``Base._run()``
+    dirs: dict
+
+def load_experiments(
+        cfg_file: Union[str, Path] = EXPERIMENTS_CFG
+    ) -> Tuple[List[Job], dict]:
+    """Expand the experiment matrix in ``cfg_file`` into the jobs of
+    each (algorithm, dataset, rate, point cloud).
+
+    Parameters
+    ----------
+    cfg_file : `Union[str, Path]`, optional
+        The YAML config file of the experiment matrix. Defaults to
+        ``EXPERIMENTS_CFG``.
+
+    Returns
+    -------
+    `Tuple[List[Job], dict]`
+        The jobs, and the config.
+    """
+    cfg = load_cfg(cfg_file)
+    ds_cfg_file = cfg.get('ds_cfg_file', 'cfgs/datasets.yml')
+
+    jobs = []
+    for alg_name, alg_cfg in cfg['algorithms'].items():
+        if alg_name not in ALGORITHMS:
+            logger.error(
+                f"Unknown algorithm: {alg_name}. "
+                f"Use one of {list(ALGORITHMS)}."
+            )
+            raise ValueError
+        options = alg_cfg.get('options') or {}
+        for key in options:
+            if key not in OPTIONS:
+                logger.error(
+                    f"Unknown option of {alg_name}: {key}. "
+                    f"Use one of {OPTIONS}."
+                )
+                raise ValueError
+
+        for rate in alg_cfg['rates']:
+            for ds_name in alg_cfg['datasets']:
+                # each setup has its own wrapper, which is set up for
+                # the dataset
+                wrapper = ALGORITHMS[alg_name]()
+                for key, val in options.items():
+                    setattr(wrapper, key, val)
+                wrapper.rate = rate
+                pc_files, dirs = wrapper.setup_dataset(
+                    ds_name, cfg['exp_dir'], ds_cfg_file
+                )
+                jobs += [
+                    Job(alg_name, ds_name, wrapper.rate, pcfile, wrapper, dirs)
+                    for pcfile in pc_files
+                ]
+
+    return jobs, cfg
+
+def pending_jobs(jobs: List[Job]) -> List[Tuple[Job, List[str]]]:
+    """The jobs not completed by the previous runs, with their pending
+    stages, see ``Base.pending_stages()``.
+    """
+    ret = []
+    for job in jobs:
+        stages = job.wrapper.pending_stages(job.pcfile, **job.dirs)
+        if len(stages) > 0:
+            ret.append((job, stages))
+
+    return ret
+
+def fit_cost_model(jobs: List[Job]) -> CostModel:
+    """Fit the cost model on the running times recorded in the run 
+    manifests of ``jobs``, including the outdated records.
+    """
+    model = CostModel()
+    for job in jobs:
+        num_points = _num_points(job)
+        if num_points is None:
+            continue
+        manifest = job.wrapper._manifest(job.pcfile, job.dirs['exp_dir'])
+        for stage in STAGES:
+            info = manifest.recorded(stage)
+            if info is not None and info.get('time') is not None:
+                model.add(
+                    stage, job.algorithm, job.rate, num_points, info['time']
+                )
+
+    return model
+
+def predict_costs(
+        model: CostModel,
+        job: Job,
+        stages: List[str]
+    ) -> Tuple[Optional[float], Optional[float]]:
+    """Predicted running time of the pending ``stages`` of ``job``.
+
+    Returns
+    -------
+    `Tuple[Optional[float], Optional[float]]`
+        The predicted running time of the encoding and decoding, and of
+        the evaluation, in seconds. None if unknown.
+    """
+    num_points = _num_points(job)
+    if num_points is None:
+        return None, None
+
+    costs = {
+        stage: model.predict(stage, job.algorithm, job.rate, num_points)
+        for stage in stages
+    }
+    codec_stages = [stage for stage in stages if stage != 'evaluate']
+    codec_cost = (
+        None if any(costs[stage] is None for stage in codec_stages)
+        else sum(costs[stage] for stage in codec_stages)
+    )
+
+    return codec_cost, costs.get('evaluate')
+
+def schedule_experiments(
+        cfg_file: Union[str, Path] = EXPERIMENTS_CFG,
+        dry_run: bool = False,
+        nbprocesses: int = None
+    ) -> None:
+    """Run all the pending experiments of the matrix in ``cfg_file`` in
+    a single worker pool, without a barrier between the setups. The
+    encoding and decoding of each point cloud is limited by the
+    ``max_jobs`` of its algorithm (and by the number of GPUs for the
+    algorithms using GPUs), and its evaluation is started right after
+    it, see ``utils.processing.schedule()``. All the setups are
+    summarized at the end.
+
+    The jobs are started longest first by the running times predicted by
+    ``fit_cost_model()``, or by the number of points if none is 
+    recorded yet, so a large point cloud is not left alone at the end.
+
+    Parameters
+    ----------
+    cfg_file : `Union[str, Path]`, optional
+        The YAML config file of the experiment matrix. Defaults to
+        ``EXPERIMENTS_CFG``.
+    dry_run : `bool`, optional
+        True for listing the pending jobs without running them.
+        Defaults to False.
+    nbprocesses : `int`, optional
+        Number of worker processes. If None, it will be ``nbprocesses``
+        in ``cfg_file``, or the cpu count. Defaults to None.
+    """
+    jobs, cfg = load_experiments(cfg_file)
+    model = fit_cost_model(jobs)
+    pending = [
+        (job, stages, predict_costs(model, job, stages))
+        for job, stages in pending_jobs(jobs)
+    ]
+    # longest first, the ones of unknown cost by the number of points
+    pending.sort(
+        key=lambda item: (
+            _total_cost(item[2]) or 0.0, _num_points(item[0]) or 0
+        ),
+        reverse=True
+    )
+
+    logger.info(f"{len(pending)} of {len(jobs)} jobs are pending.")
+    if dry_run is True:
+        for job, stages, costs in pending:
+            total = _total_cost(costs)
+            print(
+                f"{job.algorithm} {job.dataset} {job.rate} {job.pcfile}: "
+                f"{', '.join(stages)} "
+                f"({'?' if total is None else f'{total:.1f}'} s)"
+            )
+        counts = Counter(
+            (job.algorithm, job.dataset, job.rate) for job, _, _ in pending
+        )
+        for (alg_name, ds_name, rate), count in sorted(counts.items()):
+            print(f"{alg_name} {ds_name} {rate}: {count} pending")
+        return
+
+    limits = {}
+    for alg_name, alg_cfg in cfg['algorithms'].items():
+        max_jobs = alg_cfg.get('max_jobs')
+        if max_jobs is not None:
+            if type(max_jobs) is not int or max_jobs <= 0:
+                logger.error(
+                    f"`max_jobs` of {alg_name} must be a positive integer."
+                )
+                raise ValueError
+            limits[alg_name] = max_jobs
+
+    if len(pending) > 0:
+        schedule(
+            [
+                (
+                    _run_codec, 
+                    (job.wrapper, job.pcfile, job.dirs, eval_cost),
+                    [job.algorithm, GPU_GROUP]
+                    if job.wrapper._use_gpu else [job.algorithm],
+                    codec_cost
+                )
+                for job, _, (codec_cost, eval_cost) in pending
+            ],
+            limits,
+            nbprocesses or cfg.get('nbprocesses'),
+            display=any(
+                job.wrapper.projection == 'open3d' for job, _, _ in pending
+            )
+        )
+
+    # each setup once
+    setups = {job.dirs['exp_dir']: job.wrapper for job in jobs}
+    for exp_dir, wrapper in setups.items():
+        if Path(exp_dir).joinpath('evl').exists():
+            summarize_one_setup(
+                Path(exp_dir).joinpath('evl'), color=wrapper._has_color
+            )
+    summarize_all_to_csv(cfg['exp_dir'])
+
+def _run_codec(
+        wrapper: Base,
+        pcfile: str,
+        dirs: dict,
+        eval_cost: Optional[float] = None,
+        gpu_queue = None
+    ) -> Optional[list]:
+    """Encode and decode ``pcfile``, and return the job evaluating the
+    decoded point cloud.
+    """
+    job = wrapper._run_codec(pcfile, gpu_queue=gpu_queue, **dirs)
+    if job is None:
+        return None
+
+    return [(wrapper._run_evaluation, (job,), [], eval_cost)]
+
+def _total_cost(
+        costs: Tuple[Optional[float], Optional[float]]
+    ) -> Optional[float]:
+    if any(cost is None for cost in costs):
+        return None
+    return sum(costs)
+
+def _num_points(job: Job) -> Optional[int]:
+    return _read_num_points(
+        str(Path(job.dirs['src_dir']).joinpath(job.pcfile))
+    )
+
+@lru_cache(maxsize=None)
+def _read_num_points(pcfile: str) -> Optional[int]:
+    # the same input point cloud is shared by all the algorithms and 
+    # rates
+    try:
+        return read_ply_header(pcfile).num_points
+    except (OSError, ValueError):
+        logger.warning(f"Failed to read the number of points of {pcfile}.")
+        return None
@@ -1,21 +1,25 @@
 import argparse
 import logging.config
 
-import open3d as o3d
-from xvfbwrapper import Xvfb
-
 from utils.file_io import get_logging_config
 from evaluator.evaluator import Evaluator
 
 def evaluate_pc(args):
-    o3d_vis = o3d.visualization.Visualizer()
     evaluator = Evaluator(
         args.ref_pc,
         args.target_pc,
-        o3d_vis=o3d_vis
+        resolution=args.resolution,
+        memory_limit=(
+            int(args.memory_limit * (1 << 30)) if args.memory_limit else None
+        ),
+        sample_size=args.sample_size,
+        stratified=not args.random_sampling,
+        projection=args.projection,
+        vmaf=args.vmaf,
+        metric_cache=not args.no_metric_cache
     )
     ret = evaluator.evaluate()
-    print(ret)
+    print(ret.log)
     
 if __name__ == '__main__':
     LOGGING_CONFIG = get_logging_config('utils/logging.conf')
@@ -44,15 +48,53 @@ if __name__ == '__main__':
     )
     parser.add_argument(
         '--resolution',
-        type=int,
+        type=float,
         default=None,
         help="Maximum NN distance of the ``ref_pc``. If the resolution "
-             "is not specified, it will be calculated on the fly."
+             "is not specified, it will be loaded from the resolution "
+             "cache or calculated on the fly."
+    )
+    parser.add_argument(
+        '--memory_limit',
+        type=float,
+        default=None,
+        help="Memory limit of the evaluation in GiB. Point clouds too "
+             "large to be evaluated within it are evaluated tile by tile."
+    )
+    parser.add_argument(
+        '--sample_size',
+        type=int,
+        default=None,
+        help="Approximate the point-based metrics with this number of "
+             "sampled points in each direction, and log their confidence "
+             "intervals. If not specified, the exact metrics are "
+             "calculated."
+    )
+    parser.add_argument(
+        '--random_sampling',
+        action='store_true',
+        help="Use simple random sampling instead of stratified sampling "
+             "in the approximate mode."
+    )
+    parser.add_argument(
+        '--projection',
+        action='store_true',
+        help="Evaluate the projection-based metrics as well. The views "
+             "are rendered without a display server."
+    )
+    parser.add_argument(
+        '--vmaf',
+        action='store_true',
+        help="Run vmaf on the projected views as well. Y/Cb/Cr-PSNR and "
+             "SSIM are always calculated in memory."
+    )
+    parser.add_argument(
+        '--no_metric_cache',
+        action='store_true',
+        help="Evaluate all the metrics again instead of loading the "
+             "unchanged results from the metric cache."
     )
     
     args = parser.parse_args()
     
-    disp = Xvfb()
-    disp.start()
-    evaluate_pc(args)
-    disp.stop()
\ No newline at end of file
+    evaluate_pc(args)
\ No newline at end of file
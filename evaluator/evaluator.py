@@ -1,44 +1,194 @@
 
+import logging
 from pathlib import Path
-from typing import Union, List, Tuple
-
-import open3d as o3d
+from contextlib import ExitStack, nullcontext
+from typing import Union, List, Tuple, Optional, Callable
 
 from utils._version import __version__
+from libs.metric_base import MetricBase
+from libs.point_cloud import PointCloud
+from evaluator.resolution import get_resolution
+from evaluator.results import EvaluationResult
+from evaluator.index_cache import get_reference_index
+from evaluator.metric_cache import evaluate_cached
+from evaluator.metrics.pc_distortion import ReferenceIndex
+from evaluator.metrics.tiled_distortion import estimate_memory
 from evaluator.metrics.PointBasedMetrics import PointBasedMetrics
 from evaluator.metrics.ProjectionBasedMetrics import ProjectionBasedMetrics
 
+logger = logging.getLogger(__name__)
 
 class Evaluator():
     def __init__(
             self,
-            ref_pc: Union[str, Path],
-            target_pc: Union[str, Path],
+            ref_pc: Union[str, Path, PointCloud],
+            target_pc: Union[str, Path, PointCloud],
             bin_file: Union[str, Path] = None,
             enc_t: float = None,
             dec_t: float = None,
-            o3d_vis = None
+            o3d_vis = None,
+            resolution: float = None,
+            ref_index: Union[
+                ReferenceIndex, Callable[[], ReferenceIndex]
+            ] = None,
+            memory_limit: int = None,
+            sample_size: int = None,
+            stratified: bool = True,
+            projection: bool = False,
+            vmaf: bool = False,
+            metric_cache: bool = True
         ):
-        self._ref_pc = Path(ref_pc)
-        self._target_pc = Path(target_pc)
+        # loaded once and shared by all the metrics
+        self._ref_pc = PointCloud.wrap(ref_pc)
+        self._target_pc = PointCloud.wrap(target_pc)
         self._bin_file = Path(bin_file) if bin_file else None
         self._enc_t = enc_t
         self._dec_t = dec_t
         self._o3d_vis = o3d_vis
+        self._resolution = resolution
+        self._ref_index = ref_index
+        self._memory_limit = memory_limit
+        # approximate point-based metrics if ``sample_size`` is set
+        self._sample_size = sample_size
+        self._stratified = stratified
+        # projection-based metrics are rendered by the headless renderer
+        # unless ``o3d_vis`` is given
+        self._projection = projection
+        self._vmaf = vmaf
+        # load the unchanged results of each metric family from the
+        # metric cache
+        self._metric_cache = metric_cache
         self._results = ''
+        self._values = {}
+
+    @classmethod
+    def evaluate_many(
+            cls,
+            ref_pc: Union[str, Path, PointCloud],
+            targets: List[Tuple],
+            o3d_vis = None,
+            resolution: float = None,
+            memory_limit: int = None,
+            sample_size: int = None,
+            stratified: bool = True,
+            projection: bool = False,
+            vmaf: bool = False,
+            metric_cache: bool = True
+        ) -> List[Optional[EvaluationResult]]:
+        """Evaluate many target point clouds (e.g., the decoded point 
+        clouds of all the algorithms and rates) against the same 
+        reference point cloud. The reference is loaded, and its 
+        resolution and search structure are looked up, only once. The
+        search structure is only looked up when the first target misses
+        the point-based metrics in the metric cache.
+
+        Parameters
+        ----------
+        ref_pc : `Union[str, Path, PointCloud]`
+            The reference point cloud.
+        targets : `List[Tuple]`
+            The arguments of each target after ``ref_pc`` in the 
+            constructor, i.e., (target_pc, bin_file, enc_t, dec_t). The 
+            trailing ones are optional.
+        o3d_vis : optional
+            The open3d visualizer. Defaults to None.
+        resolution : `float`, optional
+            Maximum NN distance of the ``ref_pc``. Loaded from the
+            resolution cache or calculated if not specified. Defaults
+            to None.
+        memory_limit : `int`, optional
+            Memory limit of each evaluation in bytes. The search
+            structure of ``ref_pc`` is not built if ``ref_pc`` is too
+            large to be evaluated within it. Defaults to None,
+            unbounded.
+        sample_size : `int`, optional
+            Number of query points sampled in each direction for the
+            approximate point-based metrics. Defaults to None, the
+            exact metrics.
+        stratified : `bool`, optional
+            True for stratified sampling, False for simple random
+            sampling in the approximate mode. Defaults to True.
+        projection : `bool`, optional
+            True for evaluating the projection-based metrics as well.
+            Defaults to False.
+        vmaf : `bool`, optional
+            True for running vmaf on the projected views as well. 
+            Defaults to False.
+        metric_cache : `bool`, optional
+            True for loading the results of the metric families 
+            evaluated before from the metric cache, and computing only
+            the missing or outdated ones. Defaults to True.
+
+        Returns
+        -------
+        `List[Optional[EvaluationResult]]`
+            The evaluation results of each target, or None for the 
+            targets failed to evaluate, so one broken target does not 
+            discard the results of the others.
+        """
+        ref_pc = PointCloud.wrap(ref_pc)
+        if resolution is None:
+            resolution = get_resolution(
+                ref_pc.path, ref_pc.points, memory_limit=memory_limit
+            )
+        # targets are about the size of the reference
+        num_points = ref_pc.num_points
+        if (
+            memory_limit is not None
+            and estimate_memory(num_points, num_points) > memory_limit
+        ):
+            shared_index = nullcontext()
+        else:
+            shared_index = _LazyIndex(ref_pc)
+        
+        results = []
+        with shared_index as ref_index:
+            for target in targets:
+                target_pc, *args = target
+                evaluator = cls(
+                    ref_pc, target_pc, *args, o3d_vis=o3d_vis, 
+                    resolution=resolution, ref_index=ref_index,
+                    memory_limit=memory_limit, sample_size=sample_size,
+                    stratified=stratified, projection=projection, 
+                    vmaf=vmaf, metric_cache=metric_cache
+                )
+                try:
+                    results.append(evaluator.evaluate())
+                except Exception as e:
+                    logger.error(f"Failed to evaluate {target_pc}: {e!r}")
+                    results.append(None)
+                # the shared index is closed on exit if nothing refers
+                # to it
+                del evaluator
+        
+        return results
 
-    def evaluate(self):
+    def evaluate(self) -> EvaluationResult:
+        """Run all the metrics.
+
+        Returns
+        -------
+        `EvaluationResult`
+            The evaluation results, with the formatted evaluation 
+            results in ``log``.
+        """
         # get log header
         self._get_log_header()
         
         # log running time and bitrate
         self._log_running_time_and_filesize()
         
-        # ProjMetrics = ProjectionBasedMetrics(self._ref_pc, self._target_pc, self._o3d_vis)
-        PointMetrics = PointBasedMetrics(self._ref_pc, self._target_pc)
-        
-        # self._results += ProjMetrics.evaluate()
-        self._results += PointMetrics.evaluate()
+        if self._projection:
+            ProjMetrics = ProjectionBasedMetrics(
+                self._ref_pc, self._target_pc, self._o3d_vis, self._vmaf
+            )
+            self._run_metric(ProjMetrics)
+
+        PointMetrics = PointBasedMetrics(
+            self._ref_pc, self._target_pc, self._resolution, self._ref_index,
+            self._memory_limit, self._sample_size, self._stratified
+        )
+        self._run_metric(PointMetrics)
         
         # [TODO] Dynamic Import Modules
         # for metrics_cls in load_modules():
@@ -46,16 +196,31 @@ class Evaluator():
         #     ret = instance.evaluate(self._ref_pc, self._target_pc)
         #     self._results += ret
         
-        return self._results
+        return EvaluationResult(
+            pc_file=str(self._target_pc.path), log=self._results, 
+            **self._values
+        )
     
+    def _run_metric(self, metric: MetricBase) -> None:
+        """Evaluate a metric family, or load its results from the metric
+        cache, and append them to the log.
+        """
+        if self._metric_cache:
+            ret, values = evaluate_cached(metric)
+        else:
+            ret, values = metric.evaluate(), metric.values
+
+        self._results += ret
+        self._values.update(values)
+
     def _get_log_header(self) -> None:
         """Log the version of PCC Arena and the path of two point cloud.
         """
         
         lines = [
             f"PCC-Arena Evaluator {__version__}",
-            f"Reference Point Cloud: {self._ref_pc}",
-            f"Target Point Cloud: {self._target_pc}",
+            f"Reference Point Cloud: {self._ref_pc.path}",
+            f"Target Point Cloud: {self._target_pc.path}",
             "\n",
         ]
         lines = '\n'.join(lines)
@@ -68,11 +233,10 @@ class Evaluator():
         """
         
         # number of points in reference point cloud
-        pc = o3d.io.read_point_cloud(str(self._ref_pc))
-        num_points = len(pc.points)
+        num_points = self._ref_pc.num_points
 
         # file size of reference point cloud in `kB`
-        ref_pc_size = Path(self._ref_pc).stat().st_size / 1000
+        ref_pc_size = self._ref_pc.path.stat().st_size / 1000
         
         # check if binary file is initialized in constructor
         if self._bin_file:
@@ -90,6 +254,10 @@ class Evaluator():
         else:
             enc_t = dec_t = -1
 
+        self._values.update({
+            'encT': float(enc_t), 'decT': float(dec_t), 'bpp': float(bpp)
+        })
+
         lines = [
             f"========== Time & Binary Size ==========",
             f"Encoding time (s)           : {enc_t}",
@@ -102,4 +270,28 @@ class Evaluator():
         ]
         lines = '\n'.join(lines)
 
-        self._results += lines
\ No newline at end of file
+        self._results += lines
+
+class _LazyIndex():
+    """The shared search structure of a reference point cloud, looked up
+    by ``get_reference_index()`` on the first call, and released when
+    the context exits.
+    """
+    def __init__(self, ref_pc: PointCloud) -> None:
+        self._ref_pc = ref_pc
+        self._ref_index = None
+        self._stack = ExitStack()
+
+    def __call__(self) -> ReferenceIndex:
+        if self._ref_index is None:
+            self._ref_index = self._stack.enter_context(
+                get_reference_index(self._ref_pc)
+            )
+        return self._ref_index
+
+    def __enter__(self) -> '_LazyIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._ref_index = None
+        self._stack.close()
@@ -0,0 +1,95 @@
+import pickle
+import logging
+from pathlib import Path
+from typing import Union, ContextManager
+
+from libs.point_cloud import PointCloud
+from utils.file_io import file_hash
+from utils.cache import DiskCache, get_cache_dir
+from utils.shared_memory import share_object
+from evaluator.metrics.pc_distortion import ReferenceIndex
+
+logger = logging.getLogger(__name__)
+
+# Name of the index cache directory, see ``get_cache_dir()``
+INDEX_CACHE = 'index'
+# Maximum total size of the index cache in bytes
+INDEX_CACHE_MAX_SIZE = 16 * (1 << 30)
+# Bump when the layout of ``ReferenceIndex`` changes to invalidate the
+# cached indices
+INDEX_VERSION = 2
+
+def get_reference_index(
+        ref_pc: Union[str, Path, PointCloud],
+        colors: bool = True,
+        normals: bool = True,
+        cache_dir: Union[str, Path] = None,
+        max_size: int = INDEX_CACHE_MAX_SIZE
+    ) -> ContextManager[ReferenceIndex]:
+    """Get the search structure of the reference point cloud 
+    ``ref_pc``. References do not change across the experiments, so 
+    the index is built once, serialized into an on-disk cache keyed by 
+    the hash of the file, and loaded by the later runs. Worker 
+    processes of ``utils.processing.parallel()`` share one copy of the 
+    index in shared memory, which is released when the last of them 
+    exits the context, see ``utils.shared_memory.share_object()``.
+
+    Parameters
+    ----------
+    ref_pc : `Union[str, Path, PointCloud]`
+        The reference point cloud.
+    colors : `bool`, optional
+        True to include the colors of ``ref_pc`` (if any) in the index.
+        Defaults to True.
+    normals : `bool`, optional
+        True to include the normals of ``ref_pc`` (if any) in the 
+        index. Defaults to True.
+    cache_dir : `Union[str, Path]`, optional
+        The directory of the index cache. Defaults to
+        None, ``get_cache_dir(INDEX_CACHE)``.
+    max_size : `int`, optional
+        The maximum total size of the index cache in bytes. The least 
+        recently used indices are evicted. Defaults to 
+        ``INDEX_CACHE_MAX_SIZE``.
+
+    Returns
+    -------
+    `ContextManager[ReferenceIndex]`
+        The deduplicated reference point cloud and its search 
+        structure, valid within the context.
+    """
+    ref_pc = PointCloud.wrap(ref_pc)
+    colors = colors and ref_pc.has_colors()
+    normals = normals and ref_pc.has_normals()
+    
+    if cache_dir is None:
+        cache_dir = get_cache_dir(INDEX_CACHE)
+    cache = DiskCache(cache_dir, suffix='.pkl', max_size=max_size)
+    key = (
+        f'{file_hash(ref_pc.path)}-v{INDEX_VERSION}'
+        f'-c{int(colors)}n{int(normals)}'
+    )
+
+    def load_or_build():
+        cached = cache.load(key)
+        if cached is not None:
+            try:
+                return pickle.loads(cached)
+            except Exception:
+                logger.warning(
+                    f"Failed to load the cached index of {ref_pc.path}, "
+                    f"rebuild it."
+                )
+
+        ref_index = ReferenceIndex(
+            ref_pc.points,
+            ref_pc.colors if colors else None,
+            ref_pc.normals if normals else None,
+        )
+        cache.save(
+            key, pickle.dumps(ref_index, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+        return ref_index
+
+    return share_object(key, load_or_build)
@@ -0,0 +1,85 @@
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Union, Dict, Tuple, Optional
+
+from libs.metric_base import MetricBase
+from utils.file_io import file_hash
+from utils.cache import DiskCache, get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Name of the metric cache directory, see ``get_cache_dir()``
+METRIC_CACHE = 'metrics'
+# Maximum total size of the metric cache in bytes
+METRIC_CACHE_MAX_SIZE = 1 << 30
+
+def evaluate_cached(
+        metric: MetricBase,
+        cache_dir: Union[str, Path] = None,
+        max_size: int = METRIC_CACHE_MAX_SIZE
+    ) -> Tuple[str, Dict[str, float]]:
+    """Evaluate a metric family, or load its results from the metric
+    cache. The results are keyed by the hashes of the reference and the
+    target point clouds, and the name, the version and the options of
+    the metric family, so re-evaluating unchanged point clouds only
+    computes the new or updated metric families.
+
+    Parameters
+    ----------
+    metric : `MetricBase`
+        The metric family to evaluate.
+    cache_dir : `Union[str, Path]`, optional
+        The directory of the metric cache. Defaults to
+        None, ``get_cache_dir(METRIC_CACHE)``.
+    max_size : `int`, optional
+        The maximum total size of the metric cache in bytes. The least
+        recently used results are evicted. Defaults to
+        ``METRIC_CACHE_MAX_SIZE``.
+
+    Returns
+    -------
+    `Tuple[str, Dict[str, float]]`
+        The formatted evaluation results and the values of the metrics.
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir(METRIC_CACHE)
+    cache = DiskCache(cache_dir, suffix='.json', max_size=max_size)
+    key = _cache_key(metric)
+
+    cached = _load(cache, key)
+    if cached is not None:
+        logger.debug(f"Load the {metric.NAME} metrics from the cache.")
+        return cached
+
+    ret = metric.evaluate()
+    cache.save(
+        key, json.dumps({'log': ret, 'values': metric.values}).encode()
+    )
+
+    return ret, metric.values
+
+def _cache_key(metric: MetricBase) -> str:
+    options = json.dumps(metric.options(), sort_keys=True)
+    digest = hashlib.sha1(
+        f'{file_hash(metric.ref_pc.path)}-{file_hash(metric.target_pc.path)}'
+        f'-{options}'.encode()
+    ).hexdigest()
+
+    return f'{metric.NAME}-v{metric.VERSION}-{digest}'
+
+def _load(
+        cache: DiskCache,
+        key: str
+    ) -> Optional[Tuple[str, Dict[str, float]]]:
+    cached = cache.load(key)
+    if cached is None:
+        return None
+
+    try:
+        cached = json.loads(cached)
+        return cached['log'], cached['values']
+    except (ValueError, KeyError):
+        logger.warning(f"Failed to load the cached metrics {key}.")
+        return None
@@ -1,13 +1,20 @@
-import re
-import subprocess as sp
 from pathlib import Path
-from typing import Union, List, Tuple
-
-
-import open3d as o3d
+from contextlib import nullcontext
+from typing import Union, List, Tuple, Dict, Any, Callable, ContextManager
 
 from libs.metric_base import MetricBase
-from evaluator.dependencies.gdiam_wrapper import findMaxNNdistance
+from libs.point_cloud import PointCloud
+from evaluator.resolution import get_resolution
+from evaluator.index_cache import get_reference_index
+from evaluator.metrics.pc_distortion import (
+    ReferenceIndex, compute_target_metrics
+)
+from evaluator.metrics.tiled_distortion import (
+    estimate_memory, compute_tiled_metrics
+)
+from evaluator.metrics.sampled_distortion import (
+    CONFIDENCE, compute_sampled_metrics
+)
 
 class PointBasedMetrics(MetricBase):
     """Class for evaluating view independent metrics of given point 
@@ -21,18 +28,88 @@ class PointBasedMetrics(MetricBase):
         Y-CPSNR, U-CPSNR, V-CPSNR,
         Hybrid geo-color
     """
+    # Log labels of the metrics with confidence intervals in the
+    # approximate mode
+    _INTERVAL_LABELS = {
+        'acd12_p2pt':  'Asym. Chamfer dist. (1->2) p2pt',
+        'acd21_p2pt':  'Asym. Chamfer dist. (2->1) p2pt',
+        'cd_p2pt':     'Chamfer dist.              p2pt',
+        'cdpsnr_p2pt': 'CD-PSNR (dB)               p2pt',
+        'h_p2pt':      'Hausdorff distance         p2pt',
+        'y_cpsnr':     'Y-CPSNR (dB)                   ',
+        'u_cpsnr':     'U-CPSNR (dB)                   ',
+        'v_cpsnr':     'V-CPSNR (dB)                   ',
+    }
+    NAME = 'point'
+    VERSION = 3
     
     def __init__(
             self,
-            ref_pc: Union[str, Path],
-            target_pc: Union[str, Path]
+            ref_pc: Union[str, Path, PointCloud],
+            target_pc: Union[str, Path, PointCloud],
+            resolution: float = None,
+            ref_index: Union[
+                ReferenceIndex, Callable[[], ReferenceIndex]
+            ] = None,
+            memory_limit: int = None,
+            sample_size: int = None,
+            stratified: bool = True
         ) -> None:
+        """
+        Parameters
+        ----------
+        ref_pc : `Union[str, Path, PointCloud]`
+            The reference point cloud.
+        target_pc : `Union[str, Path, PointCloud]`
+            The target point cloud.
+        resolution : `float`, optional
+            Maximum NN distance of the ``ref_pc``. Loaded from the
+            resolution cache or calculated if not specified. Defaults
+            to None.
+        ref_index : `Union[ReferenceIndex, Callable]`, optional
+            Prebuilt search structure of ``ref_pc``, shared by the
+            evaluations of many targets, or a function returning it, 
+            which is only called if the metrics are computed (e.g., not
+            loaded from the metric cache). Built on the fly if not
+            specified. Defaults to None.
+        memory_limit : `int`, optional
+            Memory limit of the evaluation in bytes. Point clouds too
+            large to be evaluated within it are evaluated tile by tile
+            by ``compute_tiled_metrics()``. Defaults to None, unbounded.
+        sample_size : `int`, optional
+            Number of query points sampled in each direction for the 
+            approximate metrics of ``compute_sampled_metrics()``, with
+            confidence intervals in the log. Defaults to None, the exact
+            metrics.
+        stratified : `bool`, optional
+            True for stratified sampling, False for simple random 
+            sampling in the approximate mode. Defaults to True.
+        """
         super().__init__(ref_pc, target_pc)
-        self._pc_error_bin = (
-            Path(__file__).parents[1].
-            joinpath("dependencies/mpeg-pcc-dmetric-master/test/pc_error")
-            .resolve()
-        )
+        self._resolution = resolution
+        self._ref_index = ref_index
+        self._memory_limit = memory_limit
+        self._sample_size = sample_size
+        self._stratified = stratified
+
+    def options(self) -> Dict[str, Any]:
+        """The resolution and the sampling options. The tiled
+        evaluation under ``memory_limit`` is exact, so it is not an
+        option.
+        """
+        if self._resolution is None:
+            self._resolution = get_resolution(
+                self._ref_pc.path, self._ref_pc.points,
+                memory_limit=self._memory_limit
+            )
+        options = {'resolution': float(self._resolution)}
+        if self._sample_size is not None:
+            options.update({
+                'sample_size': self._sample_size,
+                'stratified': self._stratified
+            })
+
+        return options
 
     def evaluate(self) -> str:
         """Run the evaluation and generate the formatted evaluation 
@@ -73,109 +150,169 @@ class PointBasedMetrics(MetricBase):
         return ret
 
     def _get_quality_metrics(self)-> None:
-        """Calculate and parse the results of quality metrics from
-        pc_error.
+        """Calculate the quality metrics with the in-process metric 
+        engine, which reproduces the results of pc_error (except the
+        p2plane and hybrid metrics of references with duplicated points,
+        see ``drop_duplicates()``).
         """
-        ret = self._pc_error_wrapper()
-
-        # Related to source code starting from `evaluator/dependencies
-        # /mpeg-pcc-dmetric-master/source/pcc_distortion.cpp:826`
-        chosen_metrics = [
-            'ACD1      (p2point): ',
-            'ACD2      (p2point): ',
-            'CD        (p2point): ',
-            'CD,PSNR   (p2point): ',
-            'h.        (p2point): ',
-            'ACD1      (p2plane): ',
-            'ACD2      (p2plane): ',
-            'CD        (p2plane): ',
-            'CD,PSNR   (p2plane): ',
-            'h.        (p2plane): ',
-        ]
-        if self._has_color:
-            chosen_metrics += [
-                'c[0],PSNRF         : ',
-                'c[1],PSNRF         : ',
-                'c[2],PSNRF         : ',
-                'hybrid geo-color   : ',
-            ]
-
-        chosen_metrics = [re.escape(pattern) for pattern in chosen_metrics]
-
-        found_val = []
-
-        for pattern in chosen_metrics:
-            isfound = False
-            for line in ret.splitlines():
-                m = re.search(f'(?<={pattern}).*', line)
-                if m:
-                    found_val.append(m.group())
-                    isfound = True
-                    break
-            if isfound is False:
-                found_val.append('nan')
+        if self._resolution is None:
+            self._resolution = get_resolution(
+                self._ref_pc.path, self._ref_pc.points,
+                memory_limit=self._memory_limit
+            )
 
-        assert len(found_val) == len(chosen_metrics)
+        intervals = None
+        if self._sample_size is not None:
+            with self._reference_index() as ref_index:
+                found_val, intervals = compute_sampled_metrics(
+                    ref_index,
+                    self._target_pc.points,
+                    float(self._resolution),
+                    target_colors=(
+                        self._target_pc.colors if self._has_color else None
+                    ),
+                    sample_size=self._sample_size,
+                    stratified=self._stratified
+                )
+        elif self._exceeds_memory_limit():
+            found_val = compute_tiled_metrics(
+                self._ref_pc,
+                self._target_pc,
+                float(self._resolution),
+                self._memory_limit,
+                colors=self._has_color,
+                normals=self._has_normal
+            )
+        else:
+            with self._reference_index() as ref_index:
+                found_val = compute_target_metrics(
+                    ref_index,
+                    self._target_pc.points,
+                    float(self._resolution),
+                    target_colors=(
+                        self._target_pc.colors if self._has_color else None
+                    ),
+                )
 
+        # values printed like pc_error, i.e., with the 6 significant
+        # digits of C++ streams
+        shown = {
+            key: f'{found_val[key]:g}' for key in self._logged_metrics()
+        }
         lines = [
             f"========== Point-based Metrics =========",
-            f"Asym. Chamfer dist. (1->2) p2pt: {found_val[0]}",
-            f"Asym. Chamfer dist. (2->1) p2pt: {found_val[1]}",
-            f"Chamfer dist.              p2pt: {found_val[2]}",
-            f"CD-PSNR (dB)               p2pt: {found_val[3]}",
-            f"Hausdorff distance         p2pt: {found_val[4]}",
+            f"Asym. Chamfer dist. (1->2) p2pt: {shown['acd12_p2pt']}",
+            f"Asym. Chamfer dist. (2->1) p2pt: {shown['acd21_p2pt']}",
+            f"Chamfer dist.              p2pt: {shown['cd_p2pt']}",
+            f"CD-PSNR (dB)               p2pt: {shown['cdpsnr_p2pt']}",
+            f"Hausdorff distance         p2pt: {shown['h_p2pt']}",
             "\n",
         ]
-        if self._has_normal:
+        if self._has_p2plane():
             lines += [
                 f"----------------------------------------",
-                f"Asym. Chamfer dist. (1->2) p2pl: {found_val[5]}",
-                f"Asym. Chamfer dist. (2->1) p2pl: {found_val[6]}",
-                f"Chamfer dist.              p2pl: {found_val[7]}",
-                f"CD-PSNR (dB)               p2pl: {found_val[8]}",
-                f"Hausdorff distance         p2pl: {found_val[9]}",
+                f"Asym. Chamfer dist. (1->2) p2pl: {shown['acd12_p2pl']}",
+                f"Asym. Chamfer dist. (2->1) p2pl: {shown['acd21_p2pl']}",
+                f"Chamfer dist.              p2pl: {shown['cd_p2pl']}",
+                f"CD-PSNR (dB)               p2pl: {shown['cdpsnr_p2pl']}",
+                f"Hausdorff distance         p2pl: {shown['h_p2pl']}",
                 "\n",
             ]
         if self._has_color:
             lines += [
                 f"----------------------------------------",
-                f"Y-CPSNR (dB)                   : {found_val[10]}",
-                f"U-CPSNR (dB)                   : {found_val[11]}",
-                f"V-CPSNR (dB)                   : {found_val[12]}",
+                f"Y-CPSNR (dB)                   : {shown['y_cpsnr']}",
+                f"U-CPSNR (dB)                   : {shown['u_cpsnr']}",
+                f"V-CPSNR (dB)                   : {shown['v_cpsnr']}",
                 "\n",
             ]
-        if self._has_color and self._has_normal:
+        if self._has_color and self._has_p2plane():
             lines += [
                 f"============== QoE Metric ==============",
-                f"Hybrid geo-color               : {found_val[13]}",
+                f"Hybrid geo-color               : {shown['hybrid']}",
                 "\n",
             ]
 
-        self._results += lines
+        if intervals is not None:
+            lines = self._add_intervals(lines, found_val, intervals)
 
-    def _pc_error_wrapper(self) -> str:
-        """Wrapper of the metric software, which modifies the formulas 
-        and adds new metrics based on mpeg-pcc-dmetric.
+        self._results += lines
+        self._values.update({
+            key: float(found_val[key]) for key in self._logged_metrics()
+        })
 
-        Returns
-        -------
-        `str`
-            The result of objective quality metrics.
+    def _logged_metrics(self) -> List[str]:
+        """Names of the metrics in the log.
         """
-        # [TODO]
-        # Integrate findMaxNNdistance into mpeg-pcc-dmetric
-        if self._resolution is None:
-            self._resolution = findMaxNNdistance(self._ref_pc)
-
-        cmd = [
-            self._pc_error_bin,
-            f'--fileA={self._ref_pc}',
-            f'--fileB={self._target_pc}',
-            f'--color={1 if self._has_color else 0}',
-            '--hausdorff=1',
-            f'--resolution={self._resolution}',
+        metrics = [
+            'acd12_p2pt', 'acd21_p2pt', 'cd_p2pt', 'cdpsnr_p2pt', 'h_p2pt'
         ]
+        if self._has_p2plane():
+            metrics += [
+                'acd12_p2pl', 'acd21_p2pl', 'cd_p2pl', 'cdpsnr_p2pl', 'h_p2pl'
+            ]
+        if self._has_color:
+            metrics += ['y_cpsnr', 'u_cpsnr', 'v_cpsnr']
+        if self._has_color and self._has_p2plane():
+            metrics += ['hybrid']
+
+        return metrics
+
+    def _has_p2plane(self) -> bool:
+        """Check if the p2plane and hybrid metrics are evaluated, i.e.,
+        the reference has normals and the metrics are exact. The
+        approximate mode does not estimate them.
+        """
+        return self._has_normal and self._sample_size is None
+
+    def _reference_index(self) -> ContextManager[ReferenceIndex]:
+        """The search structure of the reference, the one given by the
+        caller or the shared one of ``get_reference_index()``.
+        """
+        if callable(self._ref_index):
+            return nullcontext(self._ref_index())
+        if self._ref_index is not None:
+            return nullcontext(self._ref_index)
+
+        return get_reference_index(
+            self._ref_pc, self._has_color, self._has_normal
+        )
+
+    def _exceeds_memory_limit(self) -> bool:
+        """Check if evaluating the point clouds in memory is expected
+        to exceed the memory limit.
+        """
+        if self._memory_limit is None:
+            return False
+        
+        return estimate_memory(
+            self._ref_pc.num_points, self._target_pc.num_points
+        ) > self._memory_limit
 
-        ret = sp.run(cmd, capture_output=True, universal_newlines=True)
+    def _add_intervals(
+            self,
+            lines: List[str],
+            found_val: dict,
+            intervals: dict
+        ) -> List[str]:
+        """Add the number of sampled points, and the confidence interval
+        (or the bounds) below each approximate metric. The values stay 
+        on their own lines for the log parser of ``evaluator.summary``.
+        """
+        sampling = 'stratified' if self._stratified else 'random'
+        ret = [
+            lines[0],
+            f"Sampled points (1->2, 2->1)    : "
+            f"{found_val['samples12']}, {found_val['samples21']} ({sampling})",
+        ]
+        for line in lines[1:]:
+            ret.append(line)
+            for key, label in self._INTERVAL_LABELS.items():
+                if key in intervals and line.startswith(f'{label}:'):
+                    name = 'Bounds' if key.startswith('h_') else (
+                        f'{CONFIDENCE:.0%} confidence interval'
+                    )
+                    lo, hi = intervals[key]
+                    ret.append(f"{'  ' + name:<31}: [{lo}, {hi}]")
 
-        return ret.stdout
\ No newline at end of file
+        return ret
@@ -1,15 +1,21 @@
-import os
 import csv
+import logging
+import tempfile
 import subprocess as sp
 from pathlib import Path
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Dict, Any
 
-import cv2
 import numpy as np
-import open3d as o3d
-from xvfbwrapper import Xvfb
 
 from libs.metric_base import MetricBase
+from libs.point_cloud import PointCloud
+from evaluator.view_cache import VIEW_VERSION, get_reference_views
+from evaluator.metrics.renderer import (
+    VIEW_ROTATIONS, render, rotation_from_xyz
+)
+from evaluator.metrics.image_quality import rgb_to_yuv420, psnr, ssim
+
+logger = logging.getLogger(__name__)
 
 class ProjectionBasedMetrics(MetricBase):
     """Class for evaluating view dependent metrics of given point clouds.
@@ -17,17 +23,36 @@ class ProjectionBasedMetrics(MetricBase):
     View Dependent Metrics:
         Y-PSNR, Cb-PSNR, Cr-PSNR
         SSIM,
-        VMAF
+        VMAF (optional)
     """
+    NAME = 'projection'
+    VERSION = 1
 
     def __init__(
             self,
-            ref_pc: Union[str, Path],
-            target_pc: Union[str, Path],
-            o3d_vis
+            ref_pc: Union[str, Path, PointCloud],
+            target_pc: Union[str, Path, PointCloud],
+            o3d_vis = None,
+            vmaf: bool = False
         ) -> None:
+        """
+        Parameters
+        ----------
+        ref_pc : `Union[str, Path, PointCloud]`
+            The reference point cloud.
+        target_pc : `Union[str, Path, PointCloud]`
+            The target point cloud.
+        o3d_vis : optional
+            The open3d visualizer, which needs a display. Defaults to 
+            None, rendering the views with the headless renderer of 
+            ``evaluator.metrics.renderer``.
+        vmaf : `bool`, optional
+            True for running vmaf on the projected views as well. 
+            Defaults to False.
+        """
         super().__init__(ref_pc, target_pc)
         self._visualizer = o3d_vis
+        self._vmaf = vmaf
         # projected image size
         self._width = 1920
         self._height = 1920
@@ -40,74 +65,104 @@ class ProjectionBasedMetrics(MetricBase):
             joinpath("dependencies/vmaf.linux").resolve()
         )
 
+    def options(self) -> Dict[str, Any]:
+        """The renderer and whether vmaf is evaluated.
+        """
+        return {
+            'renderer': 'numpy' if self._visualizer is None else 'open3d',
+            'view_version': VIEW_VERSION,
+            'vmaf': self._vmaf
+        }
+
     def evaluate(self) -> str:
         """Run the evaluation and generate the formatted evaluation 
         results.
-        
-        Parameters
-        ----------
-        camera_parameter : List
-            List of tuple
-            tuple is like (camera_front[100, 100, 0], camera_up[1, 0, 0])
-            You can add as many camera position as possible
 
         Returns
         -------
         `str`
             The formatted evaluation results.
         """
-        
-        # [TODO] find a better way to generate this
-        rotation_matrice = np.array([
-            [  0,   0,  0],
-            [  0, 0.5,  0],
-            [  0, 0.5,  0],
-            [  0, 0.5,  0],
-            [0.5,   0,  0],
-            [  1,   0,  0]
-        ]) * np.pi
-        
-        # disp = Xvfb()
-        # disp.start()
-        # try:
-            # get projected yuv images of ref. and tar. point cloud with
-            # each rotation_matrix
-        imgs = self._render_2d_image(rotation_matrice)
-        # finally:
-            # disp.stop()
-        
+        # get projected RGB images of ref. and tar. point cloud with
+        # each rotation of ``VIEW_ROTATIONS``
+        if self._visualizer is None:
+            imgs = self._render_2d_image(VIEW_ROTATIONS)
+        else:
+            imgs = self._render_2d_image_o3d(VIEW_ROTATIONS)
+
         self._get_quality_metrics(imgs)
         
         ret = '\n'.join(self._results)
         
         return ret
 
-    def _render_2d_image(self, rotation_matrice):
-        # [TODO] May remove with the future version of open3d
-        # A workaround for better point cloud reader to avoid color 
-        # artifacts when reading point cloud with colors
-        
-        # o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Debug)
-        ref_cloud = o3d.t.io.read_point_cloud(str(self._ref_pc))
-        tar_cloud = o3d.t.io.read_point_cloud(str(self._target_pc))
-        
-        l_ref_cloud = ref_cloud.to_legacy_pointcloud()
-        l_tar_cloud = tar_cloud.to_legacy_pointcloud()
+    def _render_2d_image(
+            self,
+            rotation_matrice: np.ndarray
+        ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Render the projected views of both point clouds in memory,
+        without a display. The views of the reference point cloud are 
+        loaded from the view cache if they have been rendered before.
 
-        if self._has_color is False:
-            l_ref_cloud.paint_uniform_color(self._pc_color)
-            l_tar_cloud.paint_uniform_color(self._pc_color)
+        Parameters
+        ----------
+        rotation_matrice : `np.ndarray`
+            (V, 3) rotations of the views about the x, y and z axes.
 
-        l_ref_cloud.colors = o3d.utility.Vector3dVector(
-            np.array(l_ref_cloud.colors) / 255.0
-        )
-        l_tar_cloud.colors = o3d.utility.Vector3dVector(
-            np.array(l_tar_cloud.colors) / 255.0
+        Returns
+        -------
+        `List[Tuple[np.ndarray, np.ndarray]]`
+            The (height, width, 3) RGB images of ref. and tar. point 
+            cloud of each view.
+        """
+        background = np.round(np.array(self._bg_color) * 255)
+        pc_color = np.round(np.array(self._pc_color) * 255)
+
+        # the views are aligned and fitted to the reference point cloud
+        views, ref_imgs = get_reference_views(
+            self._ref_pc, rotation_matrice, self._width, self._height,
+            background, pc_color
         )
-        
-        ref_cloud = l_ref_cloud
-        tar_cloud = l_tar_cloud
-        # end of [TODO]
+
+        if self._has_color and self._target_pc.colors is not None:
+            tar_colors = self._target_pc.colors
+        else:
+            tar_colors = pc_color
+
+        imgs = []
+        for view, ref_img in zip(views, ref_imgs):
+            tar_img = render(
+                self._target_pc.points, tar_colors, view, self._width,
+                self._height, background
+            )
+            imgs.append((ref_img, tar_img))
+
+        return imgs
+
+    def _render_2d_image_o3d(
+            self,
+            rotation_matrice: np.ndarray
+        ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Render the projected views of both point clouds with the 
+        open3d visualizer.
+
+        Parameters
+        ----------
+        rotation_matrice : `np.ndarray`
+            (V, 3) rotations of the views about the x, y and z axes.
+
+        Returns
+        -------
+        `List[Tuple[np.ndarray, np.ndarray]]`
+            The (height, width, 3) RGB images of ref. and tar. point 
+            cloud of each view.
+        """
+        ref_cloud = self._ref_pc.to_o3d()
+        tar_cloud = self._target_pc.to_o3d()
+
+        if self._has_color is False:
+            ref_cloud.paint_uniform_color(self._pc_color)
+            tar_cloud.paint_uniform_color(self._pc_color)
 
         # Align the point clouds based on the oriented bounding box of
         # the reference point cloud
@@ -125,73 +180,53 @@ class ProjectionBasedMetrics(MetricBase):
         imgs = []
         
         # generate projected 2D image with each rotation_matrix
-        for idx, mat in enumerate(rotation_matrice):
-            R = ref_cloud.get_rotation_matrix_from_xyz(mat)
+        for mat in rotation_matrice:
+            R = rotation_from_xyz(mat)
             
-            # save png files at the same folder of `self._target_pc`
-            basename = Path(self._ref_pc).stem
-            ref_png = str(
-                self._target_pc.with_name(f"ref_{basename}_{idx}.png")
-            )
-            tar_png = str(
-                self._target_pc.with_name(f"tar_{basename}_{idx}.png")
-            )
-            
-            ref_cloud.rotate(R, center)
-            vis.add_geometry(ref_cloud)
-            vis.capture_screen_image(ref_png, do_render=True)
-            vis.clear_geometries()
-            
-            tar_cloud.rotate(R, center)
-            vis.add_geometry(tar_cloud)
-            vis.capture_screen_image(tar_png, do_render=True)
-            vis.clear_geometries()
+            views = []
+            for cloud in [ref_cloud, tar_cloud]:
+                cloud.rotate(R, center)
+                vis.add_geometry(cloud)
+                buf = vis.capture_screen_float_buffer(do_render=True)
+                vis.clear_geometries()
+                views.append(
+                    np.round(np.asarray(buf) * 255).astype(np.uint8)
+                )
 
-            ref_BGR = cv2.imread(ref_png)
-            tar_BGR = cv2.imread(tar_png)
-
-            
-            # convert color space from BGR to YUV420
-            ref_yuv = cv2.cvtColor(ref_BGR, cv2.COLOR_BGR2YUV_I420)
-            tar_yuv = cv2.cvtColor(tar_BGR, cv2.COLOR_BGR2YUV_I420)
-            
-            # save yuv files
-            ref_file = f"ref_{Path(self._ref_pc).stem}_{idx}.yuv"
-            tar_file = f"tar_{Path(self._target_pc).stem}_{idx}.yuv"
-            ref_yuv.tofile(ref_file)
-            tar_yuv.tofile(tar_file)
-
-            imgs.append((ref_file, tar_file))
+            imgs.append(tuple(views))
 
+        # the window is kept for the next evaluation with the same 
+        # visualizer, see ``utils.processing.get_visualizer()``
         del vis, opt
 
         return imgs
 
-    def _get_quality_metrics(self, imgs):
-        # keys are related vmaf csv log file
+    def _get_quality_metrics(
+            self,
+            imgs: List[Tuple[np.ndarray, np.ndarray]]
+        ) -> None:
+        """Calculate the PSNR of each plane and the SSIM of the Y plane
+        of the YUV420 images in memory, and the VMAF if enabled, and 
+        average them over the views.
+        """
         chosen_metrics = {
-            'psnr_y': [],
-            'psnr_cb': [],
-            'psnr_cr': [],
-            'float_ssim': [],
-            'vmaf': []
+            'y_psnr': [],
+            'cb_psnr': [],
+            'cr_psnr': [],
+            'ssim': [],
         }
-        
-        for ref_file, tar_file in imgs:
-            log_file = self._vmaf_wrapper(ref_file, tar_file)
-            
-            # collect value of each metric from the log file
-            with open(log_file, 'r') as csvfile:
-                # here we only have one row
-                row = list(csv.DictReader(csvfile))[0]
-            
-            # remove intermidiate files
-            os.remove(ref_file)
-            os.remove(tar_file)
-            os.remove(log_file)
-            
-            for metric in chosen_metrics.keys():
-                chosen_metrics[metric].append(float(row[metric]))
+
+        for ref_img, tar_img in imgs:
+            ref_planes = rgb_to_yuv420(ref_img)
+            tar_planes = rgb_to_yuv420(tar_img)
+            for metric, ref, tar in zip(
+                    ['y_psnr', 'cb_psnr', 'cr_psnr'], ref_planes, tar_planes
+                ):
+                chosen_metrics[metric].append(psnr(ref, tar))
+            chosen_metrics['ssim'].append(ssim(ref_planes[0], tar_planes[0]))
+
+        if self._vmaf:
+            chosen_metrics['vmaf'] = self._get_vmaf(imgs)
 
         # calculate mean of each metric
         for metric in chosen_metrics.keys():
@@ -199,18 +234,62 @@ class ProjectionBasedMetrics(MetricBase):
 
         lines = [
             f"======= Projection-based Metrics =======",
-            f"Y-PSNR (dB)                    : {chosen_metrics['psnr_y']}",
-            f"Cb-PSNR (dB)                   : {chosen_metrics['psnr_cb']}",
-            f"Cr-PSNR (dB)                   : {chosen_metrics['psnr_cr']}",
-            f"SSIM                           : {chosen_metrics['float_ssim']}",
-            f"VMAF                           : {chosen_metrics['vmaf']}"
-            "\n",
+            f"Y-PSNR (dB)                    : {chosen_metrics['y_psnr']}",
+            f"Cb-PSNR (dB)                   : {chosen_metrics['cb_psnr']}",
+            f"Cr-PSNR (dB)                   : {chosen_metrics['cr_psnr']}",
+            f"SSIM                           : {chosen_metrics['ssim']}",
         ]
+        if self._vmaf:
+            lines += [
+                f"VMAF                           : {chosen_metrics['vmaf']}",
+            ]
+        lines += ["\n"]
 
         self._results += lines
+        self._values.update(
+            {metric: float(val) for metric, val in chosen_metrics.items()}
+        )
+
+    def _get_vmaf(
+            self,
+            imgs: List[Tuple[np.ndarray, np.ndarray]]
+        ) -> List[float]:
+        """Run vmaf once on all the views, packed as the frames of one 
+        YUV420 stream for each point cloud, so vmaf starts and loads its
+        model only once. The files are saved in a temporary directory, 
+        so concurrent evaluations do not collide.
+
+        Returns
+        -------
+        `List[float]`
+            The VMAF of each view.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            ref_file = tmp_dir.joinpath("ref.yuv")
+            tar_file = tmp_dir.joinpath("tar.yuv")
+            for idx, yuv_file in enumerate([ref_file, tar_file]):
+                with open(yuv_file, 'wb') as f:
+                    for img in imgs:
+                        for plane in rgb_to_yuv420(img[idx]):
+                            plane.tofile(f)
+
+            log_file = self._vmaf_wrapper(ref_file, tar_file)
+
+            # collect the score of each frame from the log file
+            with open(log_file, 'r') as csvfile:
+                rows = list(csv.DictReader(csvfile))
+
+        if len(rows) != len(imgs):
+            logger.error(
+                f"vmaf scored {len(rows)} frames of {len(imgs)} views."
+            )
+            raise ValueError
+
+        return [float(row['vmaf']) for row in rows]
 
-    def _vmaf_wrapper(self, ref_file, tar_file) -> str:
-        log_file = f"result_{Path(ref_file).stem}.csv"
+    def _vmaf_wrapper(self, ref_file: Path, tar_file: Path) -> Path:
+        log_file = ref_file.with_name(f"result_{ref_file.stem}.csv")
 
         cmd = [
             self._vmaf_bin,
@@ -221,12 +300,10 @@ class ProjectionBasedMetrics(MetricBase):
             f'--height={self._height}',
             '--pixel_format=420',
             '--bitdepth=8',
-            '--feature=psnr',
-            '--feature=float_ssim',
             f'--output={log_file}',
             '--csv'
         ]
 
         sp.run(cmd)
 
-        return log_file
\ No newline at end of file
+        return log_file
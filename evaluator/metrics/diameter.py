@@ -0,0 +1,166 @@
+# @inproceedings{h-pacdp-01,
+#    author    = "S.~{Har-Peled}",
+#    booktitle = SOCG_2001,
+#    title     = "A Practical Approach for Computing the Diameter
+#                 of a Point-Set",
+#    year      = 2001,
+#    pages     = {177--186},
+# }
+#
+# [ref.] https://sarielhp.org/research/papers/00/diameter/diam_prog.html
+
+import logging
+
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+
+logger = logging.getLogger(__name__)
+
+# Average number of candidates in a grid cell when searching for the
+# farthest pair
+LEAF_SIZE = 64
+
+def diameter(
+        points: np.ndarray,
+        eps: float = 0.0,
+        chunk_size: int = None
+    ) -> float:
+    """Calculate the diameter (the distance of the farthest pair of
+    points) of the point cloud. Only the vertices of the convex hull
+    can realize the diameter, so the pairwise distances are computed
+    on the hull vertices only.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates, e.g., memory-mapped.
+    eps : `float`, optional
+        Approximation factor. If larger than 0, the points are snapped
+        to a grid before computing the convex hull, and the returned 
+        value is a (1+eps)-approximation of the diameter. Defaults to 0,
+        the exact diameter.
+    chunk_size : `int`, optional
+        If specified, ``points`` are read ``chunk_size`` points at a 
+        time, and only the hull vertices of each chunk are kept. The 
+        hull of the whole point cloud is spanned by them, so the result
+        is the same. Defaults to None, all the points at once.
+
+    Returns
+    -------
+    `float`
+        The diameter of the point cloud.
+    """
+    chunk_size = chunk_size or max(len(points), 1)
+    candidates = []
+    for start in range(0, len(points), chunk_size):
+        chunk = np.asarray(points[start:start+chunk_size], dtype=np.float64)
+        if eps > 0:
+            chunk = _snap_to_grid(chunk, eps)
+        candidates.append(_extreme_points(chunk))
+    if len(candidates) == 0:
+        return 0.0
+    if len(candidates) == 1:
+        return _max_pairwise_distance(candidates[0])
+
+    return _max_pairwise_distance(
+        _extreme_points(np.concatenate(candidates))
+    )
+
+def _extreme_points(points: np.ndarray) -> np.ndarray:
+    """Vertices of the convex hull of ``points``.
+    """
+    if len(points) <= 4:
+        return points
+
+    try:
+        hull = ConvexHull(points)
+    except QhullError:
+        # Degenerated point clouds (e.g., planar) need to be joggled
+        hull = ConvexHull(points, qhull_options='QJ')
+
+    return points[hull.vertices]
+
+def _snap_to_grid(points: np.ndarray, eps: float) -> np.ndarray:
+    """Keep one point in each grid cell. The cell size is chosen such
+    that the diameter shrinks by a factor of at most (1+eps).
+    """
+    # distance between the extreme points along the longest axis is a
+    # lower bound of the diameter, and at least 1/sqrt(3) of it
+    axis = np.argmax(np.ptp(points, axis=0))
+    lower = np.linalg.norm(
+        points[np.argmax(points[:, axis])] - points[np.argmin(points[:, axis])]
+    )
+    cell = eps * lower / (2 * np.sqrt(3))
+    if cell <= 0:
+        return points
+
+    cells = ((points - points.min(axis=0)) / cell).astype(np.int64)
+    try:
+        cell_id = np.ravel_multi_index(cells.T, tuple(cells.max(axis=0) + 1))
+        _, first = np.unique(cell_id, return_index=True)
+    except ValueError:
+        # too many cells to be indexed by a 64-bit integer
+        _, first = np.unique(cells, axis=0, return_index=True)
+
+    return points[np.sort(first)]
+
+def _max_pairwise_distance(points: np.ndarray) -> float:
+    """Farthest pair distance of ``points``. The points are grouped by
+    a grid into cells, and only the pairs of cells whose bounding boxes
+    may be farther than the current best distance are compared.
+    """
+    if len(points) < 2:
+        return 0.0
+
+    # lower bound of the diameter with a few farthest point iterations
+    best = 0.0
+    p = points[0]
+    for _ in range(3):
+        dist = np.linalg.norm(points - p, axis=1)
+        idx = np.argmax(dist)
+        best, p = max(best, dist[idx]), points[idx]
+
+    # group the points into about ``len(points) / LEAF_SIZE`` cells
+    num_cells = max(1, int(np.ceil((len(points) / LEAF_SIZE) ** (1 / 3))))
+    extent = np.ptp(points, axis=0)
+    extent[extent == 0] = 1
+    cells = np.minimum(
+        ((points - points.min(axis=0)) / extent * num_cells).astype(int),
+        num_cells - 1
+    )
+    cell_id = np.ravel_multi_index(cells.T, (num_cells,) * 3)
+    order = np.argsort(cell_id, kind='stable')
+    points = points[order]
+    _, bounds = np.unique(cell_id[order], return_index=True)
+    bounds = np.append(bounds, len(points))
+
+    lo = np.minimum.reduceat(points, bounds[:-1], axis=0)
+    hi = np.maximum.reduceat(points, bounds[:-1], axis=0)
+
+    # upper bound of the distance between each pair of cells
+    upper = np.sqrt((np.maximum(
+        np.abs(hi[:, None] - lo[None, :]), np.abs(hi[None, :] - lo[:, None])
+    ) ** 2).sum(axis=2))
+
+    # compare each cell with all the cells that may contain a farther
+    # point, starting from the most promising cells
+    points = points - points.mean(axis=0)
+    sqr_norm = np.einsum('ij,ij->i', points, points)
+    cell_of = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    for a in np.argsort(-upper.max(axis=1)):
+        candidates = np.flatnonzero(upper[a] > best)
+        if len(candidates) == 0:
+            continue
+        block = slice(bounds[a], bounds[a+1])
+        others = np.flatnonzero(np.isin(cell_of, candidates))
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab
+        sqr_dist = (
+            sqr_norm[block, None] + sqr_norm[None, others]
+            - 2 * points[block] @ points[others].T
+        )
+        i, j = np.unravel_index(np.argmax(sqr_dist), sqr_dist.shape)
+        # recompute the distance directly to avoid the rounding error
+        dist = np.linalg.norm(points[bounds[a] + i] - points[others[j]])
+        best = max(best, dist)
+
+    return float(best)
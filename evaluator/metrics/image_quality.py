@@ -0,0 +1,116 @@
+import logging
+from typing import Tuple
+
+import cv2
+import numpy as np
+from scipy.ndimage import correlate1d
+
+from evaluator.metrics.pc_distortion import get_psnr
+
+logger = logging.getLogger(__name__)
+
+# Peak value of 8-bit samples
+PEAK = 255
+# Upper bound of the PSNR of 8-bit samples, same as the psnr feature of
+# vmaf, so identical images do not yield inf
+PSNR_MAX = 60.0
+# Gaussian window of SSIM
+SSIM_WINDOW = 11
+SSIM_SIGMA = 1.5
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+# SSIM is computed on images downsampled to about this size, same as
+# the float_ssim feature of vmaf
+SSIM_SCALE_SIZE = 256
+
+def rgb_to_yuv420(img: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Convert an RGB image to the Y, Cb and Cr planes of YUV420, the
+    input format of vmaf.
+
+    Parameters
+    ----------
+    img : `np.ndarray`
+        (H, W, 3) RGB image in uint8. H and W are even.
+
+    Returns
+    -------
+    `Tuple[np.ndarray, ...]`
+        The (H, W) Y plane and the (H/2, W/2) Cb and Cr planes.
+    """
+    height, width = img.shape[:2]
+    yuv = cv2.cvtColor(img, cv2.COLOR_RGB2YUV_I420).reshape(-1)
+    luma = height * width
+    chroma = luma // 4
+
+    return (
+        yuv[:luma].reshape(height, width),
+        yuv[luma:luma + chroma].reshape(height // 2, width // 2),
+        yuv[luma + chroma:].reshape(height // 2, width // 2),
+    )
+
+def psnr(ref: np.ndarray, dist: np.ndarray) -> float:
+    """PSNR of two 8-bit planes, at most ``PSNR_MAX``.
+    """
+    diff = ref.astype(np.float64) - dist.astype(np.float64)
+    mse = float(np.mean(diff * diff))
+
+    return min(get_psnr(mse, PEAK), PSNR_MAX)
+
+def ssim(ref: np.ndarray, dist: np.ndarray) -> float:
+    """Mean SSIM of two 8-bit planes with an 11x11 Gaussian window. The
+    planes are first downsampled by averaging blocks of about
+    ``min(H, W) / SSIM_SCALE_SIZE`` pixels, and the window is only
+    placed inside the planes.
+
+    Parameters
+    ----------
+    ref : `np.ndarray`
+        (H, W) reference plane.
+    dist : `np.ndarray`
+        (H, W) distorted plane.
+
+    Returns
+    -------
+    `float`
+        The mean SSIM.
+    """
+    scale = max(1, int(round(min(ref.shape) / SSIM_SCALE_SIZE)))
+    x = _downsample(ref.astype(np.float64), scale)
+    y = _downsample(dist.astype(np.float64), scale)
+
+    radius = SSIM_WINDOW // 2
+    window = np.exp(
+        -np.arange(-radius, radius + 1) ** 2 / (2 * SSIM_SIGMA ** 2)
+    )
+    window /= window.sum()
+
+    def blur(img):
+        for axis in (0, 1):
+            img = correlate1d(img, window, axis=axis, mode='constant')
+        # keep the positions where the window is inside the plane
+        return img[radius:-radius or None, radius:-radius or None]
+
+    mu_x, mu_y = blur(x), blur(y)
+    var_x = blur(x * x) - mu_x * mu_x
+    var_y = blur(y * y) - mu_y * mu_y
+    cov = blur(x * y) - mu_x * mu_y
+
+    c1 = (SSIM_K1 * PEAK) ** 2
+    c2 = (SSIM_K2 * PEAK) ** 2
+    ssim_map = (
+        (2 * mu_x * mu_y + c1) * (2 * cov + c2)
+        / ((mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2))
+    )
+
+    return float(ssim_map.mean())
+
+def _downsample(img: np.ndarray, scale: int) -> np.ndarray:
+    """Average the ``scale`` x ``scale`` blocks of ``img``. The trailing
+    rows and columns of incomplete blocks are dropped.
+    """
+    if scale == 1:
+        return img
+    height, width = (s // scale for s in img.shape)
+    img = img[:height * scale, :width * scale]
+
+    return img.reshape(height, scale, width, scale).mean(axis=(1, 3))
@@ -0,0 +1,560 @@
+import logging
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from evaluator.metrics.voxel_grid import VoxelGrid, is_voxelized
+
+logger = logging.getLogger(__name__)
+
+# The neighbourhood search follows the patched mpeg-pcc-dmetric
+# (`evaluator/dependencies/mpeg-pcc-dmetric.patch`) with its default
+# options: --dropdups=2, --neighborsProc=1, --averageNormals=1 and
+# --mseSpace=1. Query 10 neighbours first and extend the search to 30
+# neighbours if all of them are at the same distance.
+NUM_RESULTS = 10
+NUM_RESULTS_MAX = 30
+# Weight of combining geometry and color metrics (--hybrid_alpha)
+HYBRID_ALPHA = 0.6597
+# Number of query points processed at once, bounds the memory of the
+# neighbour arrays.
+CHUNK_SIZE = 1 << 18
+
+
+def drop_duplicates(
+        points: np.ndarray,
+        colors: np.ndarray = None,
+        normals: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge the points with identical coordinates. Colors of the
+    duplicated points are averaged (integer division), same as pc_error
+    with ``--dropdups=2``, and the normal of the first duplicate in the
+    input order is kept.
+
+    pc_error keeps the normal of whichever duplicate its unstable sort
+    puts first, so the p2plane and hybrid metrics may deviate from 
+    pc_error slightly on references with duplicated points of different
+    normals. The other metrics do not depend on the normals.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates.
+    colors : `np.ndarray`, optional
+        (N, 3) RGB colors in [0, 255]. Defaults to None.
+    normals : `np.ndarray`, optional
+        (N, 3) normal vectors. Defaults to None.
+
+    Returns
+    -------
+    `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        The unique points, colors and normals.
+    """
+    uniq, first, inverse, counts = np.unique(
+        points, axis=0, return_index=True, return_inverse=True,
+        return_counts=True
+    )
+    if len(uniq) == len(points):
+        return points, colors, normals
+
+    inverse = inverse.reshape(-1)
+    if colors is not None:
+        colors = np.stack([
+            np.bincount(inverse, weights=colors[:, c], minlength=len(uniq))
+            for c in range(3)
+        ], axis=1)
+        colors = (colors // counts[:, None]).astype(np.uint8)
+    if normals is not None:
+        normals = normals[first]
+
+    return uniq, colors, normals
+
+def rgb_to_yuv(colors: np.ndarray) -> np.ndarray:
+    """Convert RGB colors into YUV (ITU-R BT.709) in [0, 1].
+
+    Parameters
+    ----------
+    colors : `np.ndarray`
+        (N, 3) RGB colors in [0, 255].
+
+    Returns
+    -------
+    `np.ndarray`
+        (N, 3) YUV colors.
+    """
+    mat = np.array([
+        [ 0.2126,  0.7152,  0.0722],
+        [-0.1146, -0.3854,  0.5000],
+        [ 0.5000, -0.4542, -0.0458],
+    ])
+    yuv = colors.astype(np.float64) @ mat.T / 255.0
+    yuv[:, 1:] += 0.5
+
+    return yuv.astype(np.float32)
+
+def get_psnr(dist2: float, peak: float) -> float:
+    """PSNR of the given squared error with the peak value ``peak``.
+    """
+    with np.errstate(divide='ignore'):
+        return float(10 * np.log10(peak * peak / np.float64(dist2)))
+
+def nearest_neighbours(
+        tree: cKDTree,
+        points: np.ndarray,
+        chunk_size: int = CHUNK_SIZE
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find the nearest neighbours of ``points`` in ``tree``. All the
+    neighbours at the same distance (within 1e-8) with the nearest one
+    are returned, in a compressed sparse row format.
+
+    Parameters
+    ----------
+    tree : `cKDTree`
+        Search structure of the point cloud to be searched.
+    points : `np.ndarray`
+        (N, 3) query points.
+    chunk_size : `int`, optional
+        Number of points queried at once. Defaults to ``CHUNK_SIZE``.
+
+    Returns
+    -------
+    `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        The number of neighbours of each query point, and the flatten
+        indices and squared distances of the neighbours.
+    """
+    k = min(NUM_RESULTS, tree.n)
+    k_max = min(NUM_RESULTS_MAX, tree.n)
+
+    counts, indices, sqr_dists = [], [], []
+    for start in range(0, len(points), chunk_size):
+        query = points[start:start+chunk_size]
+        dist, idx = tree.query(query, k=k)
+        dist, idx = dist.reshape(len(query), k), idx.reshape(len(query), k)
+        sqr_dist = dist * dist
+
+        # extend the search if all the neighbours are tied
+        redo = np.flatnonzero(sqr_dist[:, 0] == sqr_dist[:, -1])
+        if len(redo) > 0 and k_max > k:
+            dist_r, idx_r = tree.query(query[redo], k=k_max)
+            sqr_dist = np.pad(
+                sqr_dist, ((0, 0), (0, k_max - k)), constant_values=np.inf
+            )
+            idx = np.pad(idx, ((0, 0), (0, k_max - k)))
+            sqr_dist[redo] = dist_r * dist_r
+            idx[redo] = idx_r
+
+        tied = np.ones(sqr_dist.shape, dtype=bool)
+        tied[:, 1:] = np.cumprod(
+            np.abs(np.diff(sqr_dist, axis=1)) < 1e-8, axis=1
+        ).astype(bool)
+
+        counts.append(tied.sum(axis=1))
+        indices.append(idx[tied])
+        sqr_dists.append(sqr_dist[tied])
+
+    return (
+        np.concatenate(counts), np.concatenate(indices),
+        np.concatenate(sqr_dists)
+    )
+
+def scale_normals(
+        normals_a: np.ndarray,
+        num_points_b: int,
+        nn_ab: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        nn_ba: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> np.ndarray:
+    """Derive the normals of point cloud B from the normals of point
+    cloud A. Each point in A contributes its normal to its nearest
+    points in B, and points in B without any contribution take the
+    average normal of their nearest points in A.
+
+    Parameters
+    ----------
+    normals_a : `np.ndarray`
+        (N, 3) normals of point cloud A.
+    num_points_b : `int`
+        Number of points in point cloud B.
+    nn_ab : `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        Nearest neighbours of A in B from ``nearest_neighbours()``.
+    nn_ba : `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        Nearest neighbours of B in A from ``nearest_neighbours()``.
+
+    Returns
+    -------
+    `np.ndarray`
+        (M, 3) normals of point cloud B.
+    """
+    counts, indices, sqr_dists = nn_ab
+    rows = np.repeat(np.arange(len(counts)), counts)
+    exact = sqr_dists == sqr_dists[np.cumsum(counts) - counts][rows]
+
+    contrib = np.bincount(indices[exact], minlength=num_points_b)
+    normals_b = np.stack([
+        np.bincount(
+            indices[exact], weights=normals_a[rows[exact], c],
+            minlength=num_points_b
+        )
+        for c in range(3)
+    ], axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normals_b /= contrib[:, None]
+
+    orphan = contrib == 0
+    if np.any(orphan):
+        counts, indices, sqr_dists = nn_ba
+        rows = np.repeat(np.arange(len(counts)), counts)
+        exact = sqr_dists == sqr_dists[np.cumsum(counts) - counts][rows]
+        exact &= orphan[rows]
+
+        num = np.bincount(rows[exact], minlength=num_points_b)[orphan]
+        for c in range(3):
+            normals_b[orphan, c] = np.bincount(
+                rows[exact], weights=normals_a[indices[exact], c],
+                minlength=num_points_b
+            )[orphan] / num
+
+    return normals_b
+
+def find_metric(
+        points_a: np.ndarray,
+        points_b: np.ndarray,
+        nn_ab: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        normals_b: np.ndarray = None,
+        colors_a: np.ndarray = None,
+        colors_b: np.ndarray = None
+    ) -> Dict[str, np.ndarray]:
+    """Compute the "one-way" quality metrics, looping over each point
+    in A and using the normals of B.
+
+    Parameters
+    ----------
+    points_a : `np.ndarray`
+        (N, 3) points of point cloud A.
+    points_b : `np.ndarray`
+        (M, 3) points of point cloud B.
+    nn_ab : `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        Nearest neighbours of A in B from ``nearest_neighbours()``.
+    normals_b : `np.ndarray`, optional
+        (M, 3) normals of B. Skip the p2plane metrics if None. Defaults
+        to None.
+    colors_a : `np.ndarray`, optional
+        (N, 3) RGB colors of A. Defaults to None.
+    colors_b : `np.ndarray`, optional
+        (M, 3) RGB colors of B. Skip the color metrics if either
+        ``colors_a`` or ``colors_b`` is None. Defaults to None.
+
+    Returns
+    -------
+    `Dict[str, np.ndarray]`
+        The sum of squared errors (``sse_*``), the maximum squared
+        errors (``max_*``), and the Y histogram of A (``y_hist``).
+    """
+    counts, indices, sqr_dists = nn_ab
+    first = np.cumsum(counts) - counts
+    rows = np.repeat(np.arange(len(counts)), counts)
+
+    c2c = sqr_dists[first]
+    ret = {'sse_c2c': c2c.sum(), 'max_c2c': c2c.max()}
+
+    if normals_b is not None:
+        err = points_a[rows] - points_b[indices]
+        nor = normals_b[indices]
+        valid = ~np.isnan(nor).any(axis=1)
+        proj = np.where(
+            valid,
+            np.einsum('ij,ij->i', err, np.nan_to_num(nor)) ** 2,
+            err.sum(axis=1)
+        )
+        c2p = np.bincount(rows, weights=proj, minlength=len(counts)) / counts
+        ret.update({'sse_c2p': c2p.sum(), 'max_c2p': c2p.max()})
+
+    if colors_a is not None and colors_b is not None:
+        ret['sse_color'] = color_errors(colors_a, colors_b, nn_ab).sum(axis=0)
+        ret['y_hist'] = np.bincount(
+            np.floor(
+                rgb_to_yuv(colors_a)[:, 0] * np.float32(255) + 0.5
+            ).astype(int),
+            minlength=256
+        )[:256]
+
+    return ret
+
+def color_errors(
+        colors_a: np.ndarray,
+        colors_b: np.ndarray,
+        nn_ab: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> np.ndarray:
+    """Squared YUV errors between each point in A and the average
+    color of its nearest neighbours in B (--neighborsProc=1).
+
+    Parameters
+    ----------
+    colors_a : `np.ndarray`
+        (N, 3) RGB colors of A.
+    colors_b : `np.ndarray`
+        (M, 3) RGB colors of B.
+    nn_ab : `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+        Nearest neighbours of A in B from ``nearest_neighbours()``.
+
+    Returns
+    -------
+    `np.ndarray`
+        (N, 3) squared errors of the Y, U and V channels.
+    """
+    counts, indices, _ = nn_ab
+    rows = np.repeat(np.arange(len(counts)), counts)
+
+    color = np.stack([
+        np.bincount(rows, weights=colors_b[indices, c], minlength=len(counts))
+        for c in range(3)
+    ], axis=1)
+    color = np.floor(color / counts[:, None] + 0.5)
+
+    return (rgb_to_yuv(colors_a).astype(np.float64) - rgb_to_yuv(color)) ** 2
+
+def search_structure(points: np.ndarray) -> Union[cKDTree, VoxelGrid]:
+    """Build the nearest neighbour search structure of ``points``: a
+    voxel grid if the points are on an integer lattice (e.g., voxelized
+    point clouds), or a KD-tree otherwise.
+    """
+    if is_voxelized(points):
+        return VoxelGrid(points)
+    return cKDTree(points)
+
+def search(
+        index: Union[cKDTree, VoxelGrid],
+        points: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find the nearest neighbours of ``points`` in ``index``, same as
+    ``nearest_neighbours()``. The voxel grid is only used if the query
+    points are on an integer lattice as well.
+    """
+    if isinstance(index, VoxelGrid):
+        if is_voxelized(points):
+            return index.nearest_neighbours(
+                points, NUM_RESULTS_MAX, nearest_neighbours
+            )
+        index = index.tree
+    return nearest_neighbours(index, points)
+
+class ReferenceIndex():
+    """The reference side of the metric computation: the deduplicated
+    reference point cloud and its search structure. Build it once to
+    evaluate many target point clouds against the same reference.
+    """
+    def __init__(
+            self,
+            points: np.ndarray,
+            colors: np.ndarray = None,
+            normals: np.ndarray = None
+        ) -> None:
+        """
+        Parameters
+        ----------
+        points : `np.ndarray`
+            (N, 3) points of the reference point cloud.
+        colors : `np.ndarray`, optional
+            (N, 3) RGB colors of the reference point cloud. Defaults to
+            None.
+        normals : `np.ndarray`, optional
+            (N, 3) normals of the reference point cloud. Defaults to
+            None.
+        """
+        self.points, self.colors, self.normals = drop_duplicates(
+            np.asarray(points, dtype=np.float64), colors, normals
+        )
+        self.index = search_structure(self.points)
+
+def compute_quality_metrics(
+        ref_points: np.ndarray,
+        target_points: np.ndarray,
+        resolution: float,
+        ref_colors: np.ndarray = None,
+        target_colors: np.ndarray = None,
+        ref_normals: np.ndarray = None,
+        hybrid_alpha: float = HYBRID_ALPHA
+    ) -> Dict[str, float]:
+    """Compute the point-based quality metrics of the patched
+    mpeg-pcc-dmetric in-process, with a single nearest neighbour query
+    per direction.
+
+    Parameters
+    ----------
+    ref_points : `np.ndarray`
+        (N, 3) points of the reference point cloud.
+    target_points : `np.ndarray`
+        (M, 3) points of the target point cloud.
+    resolution : `float`
+        Peak value for the CD-PSNR, i.e., the diameter of the reference
+        point cloud.
+    ref_colors : `np.ndarray`, optional
+        (N, 3) RGB colors of the reference point cloud. Defaults to
+        None.
+    target_colors : `np.ndarray`, optional
+        (M, 3) RGB colors of the target point cloud. Defaults to None.
+    ref_normals : `np.ndarray`, optional
+        (N, 3) normals of the reference point cloud. Defaults to None.
+    hybrid_alpha : `float`, optional
+        Weight of combining geometry and color metrics. Defaults to
+        ``HYBRID_ALPHA``.
+
+    Returns
+    -------
+    `Dict[str, float]`
+        Quality metrics named after the columns of the summary csv
+        file. Metrics that cannot be calculated are nan.
+    """
+    return compute_target_metrics(
+        ReferenceIndex(ref_points, ref_colors, ref_normals),
+        target_points, resolution, target_colors, hybrid_alpha
+    )
+
+def compute_target_metrics(
+        ref_index: ReferenceIndex,
+        target_points: np.ndarray,
+        resolution: float,
+        target_colors: np.ndarray = None,
+        hybrid_alpha: float = HYBRID_ALPHA
+    ) -> Dict[str, float]:
+    """Same as ``compute_quality_metrics()``, but reuse the prebuilt
+    ``ref_index`` of the reference point cloud.
+
+    Parameters
+    ----------
+    ref_index : `ReferenceIndex`
+        The reference point cloud and its search structure.
+    target_points : `np.ndarray`
+        (M, 3) points of the target point cloud.
+    resolution : `float`
+        Peak value for the CD-PSNR, i.e., the diameter of the reference
+        point cloud.
+    target_colors : `np.ndarray`, optional
+        (M, 3) RGB colors of the target point cloud. Defaults to None.
+    hybrid_alpha : `float`, optional
+        Weight of combining geometry and color metrics. Defaults to
+        ``HYBRID_ALPHA``.
+
+    Returns
+    -------
+    `Dict[str, float]`
+        Quality metrics named after the columns of the summary csv
+        file. Metrics that cannot be calculated are nan.
+    """
+    ref_points = ref_index.points
+    ref_colors = ref_index.colors
+    ref_normals = ref_index.normals
+    target_points, target_colors, _ = drop_duplicates(
+        np.asarray(target_points, dtype=np.float64), target_colors
+    )
+
+    target_index = search_structure(target_points)
+
+    nn_ab = search(target_index, ref_points)
+    nn_ba = search(ref_index.index, target_points)
+
+    if ref_normals is not None:
+        target_normals = scale_normals(
+            ref_normals, len(target_points), nn_ab, nn_ba
+        )
+    else:
+        target_normals = None
+
+    metric_a = find_metric(
+        ref_points, target_points, nn_ab, target_normals,
+        ref_colors, target_colors
+    )
+    metric_b = find_metric(
+        target_points, ref_points, nn_ba, ref_normals,
+        target_colors, ref_colors
+    )
+
+    return summarize_metrics(
+        metric_a, metric_b, len(ref_points), len(target_points),
+        resolution, hybrid_alpha
+    )
+
+def summarize_metrics(
+        metric_a: Dict[str, np.ndarray],
+        metric_b: Dict[str, np.ndarray],
+        num_a: int,
+        num_b: int,
+        resolution: float,
+        hybrid_alpha: float = HYBRID_ALPHA
+    ) -> Dict[str, float]:
+    """Derive the final symmetric metrics from the results of
+    ``find_metric()`` in both directions.
+
+    Parameters
+    ----------
+    metric_a : `Dict[str, np.ndarray]`
+        Results of the reference to target direction.
+    metric_b : `Dict[str, np.ndarray]`
+        Results of the target to reference direction.
+    num_a : `int`
+        Number of points in the reference point cloud.
+    num_b : `int`
+        Number of points in the target point cloud.
+    resolution : `float`
+        Peak value for the CD-PSNR.
+    hybrid_alpha : `float`, optional
+        Weight of combining geometry and color metrics. Defaults to
+        ``HYBRID_ALPHA``.
+
+    Returns
+    -------
+    `Dict[str, float]`
+        Quality metrics named after the columns of the summary csv
+        file.
+    """
+    resolution = float(resolution)
+    nan = float('nan')
+    ret = {}
+
+    for dist in ['c2c', 'c2p']:
+        key = 'p2pt' if dist == 'c2c' else 'p2pl'
+        if f'sse_{dist}' not in metric_a:
+            ret.update({
+                f'acd12_{key}': nan, f'acd21_{key}': nan, f'cd_{key}': nan,
+                f'cdpsnr_{key}': nan, f'h_{key}': nan,
+            })
+            continue
+        acd12 = float(metric_a[f'sse_{dist}'] / num_a)
+        acd21 = float(metric_b[f'sse_{dist}'] / num_b)
+        cd = 0.5 * (acd12 + acd21)
+        ret.update({
+            f'acd12_{key}': acd12,
+            f'acd21_{key}': acd21,
+            f'cd_{key}': cd,
+            f'cdpsnr_{key}': get_psnr(cd, resolution),
+            f'h_{key}': float(
+                max(metric_a[f'max_{dist}'], metric_b[f'max_{dist}'])
+            ),
+        })
+
+    if 'sse_color' in metric_a:
+        psnr_a = [get_psnr(sse / num_a, 1.0) for sse in metric_a['sse_color']]
+        psnr_b = [get_psnr(sse / num_b, 1.0) for sse in metric_b['sse_color']]
+        ret.update({
+            'y_cpsnr': min(psnr_a[0], psnr_b[0]),
+            'u_cpsnr': min(psnr_a[1], psnr_b[1]),
+            'v_cpsnr': min(psnr_a[2], psnr_b[2]),
+        })
+        if 'sse_c2p' in metric_a:
+            # pc_error normalizes the Y histograms with integer division
+            # Keep the same behavior to stay comparable with prior logs.
+            hist_a = metric_a['y_hist'] // metric_a['y_hist'].sum()
+            hist_b = metric_b['y_hist'] // metric_b['y_hist'].sum()
+            ret['hybrid'] = float(
+                hybrid_alpha * ret['cd_p2pl']
+                + (1 - hybrid_alpha) * np.sqrt(((hist_a - hist_b) ** 2).sum())
+            )
+        else:
+            ret['hybrid'] = nan
+    else:
+        ret.update({
+            'y_cpsnr': nan, 'u_cpsnr': nan, 'v_cpsnr': nan, 'hybrid': nan,
+        })
+
+    return ret
@@ -0,0 +1,226 @@
+import logging
+from typing import List, NamedTuple
+
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+
+logger = logging.getLogger(__name__)
+
+# Side length of the square splat of each point in pixels, same as the
+# default point size of the open3d renderer
+POINT_SIZE = 5
+# Fraction of the image left empty around the reference point cloud
+MARGIN = 0.05
+# Rotations (about x, y and z) of the projected views. Each rotation is
+# applied on top of the previous ones, so the six views are the front,
+# the left, the back, the right, the top and the bottom of the aligned
+# point cloud.
+VIEW_ROTATIONS = np.array([
+    [  0,   0,  0],
+    [  0, 0.5,  0],
+    [  0, 0.5,  0],
+    [  0, 0.5,  0],
+    [0.5,   0,  0],
+    [  1,   0,  0]
+]) * np.pi
+
+class View(NamedTuple):
+    """Orthographic camera looking down the -z axis of the rotated
+    point cloud, with the y axis pointing up in the image.
+    """
+    # (3, 3) rotation applied to the points about ``center``
+    rotation: np.ndarray
+    # (3,) center of the rotation
+    center: np.ndarray
+    # (2,) point (after the rotation) projected to the image center
+    origin: np.ndarray
+    # pixels per unit length
+    scale: float
+
+def rotation_from_xyz(angles: np.ndarray) -> np.ndarray:
+    """Rotation matrix of the rotations about the x, y and z axes, same
+    as ``get_rotation_matrix_from_xyz()`` of open3d, i.e.,
+    ``Rx @ Ry @ Rz``.
+
+    Parameters
+    ----------
+    angles : `np.ndarray`
+        (3,) rotation angles in radians.
+
+    Returns
+    -------
+    `np.ndarray`
+        (3, 3) rotation matrix.
+    """
+    cx, cy, cz = np.cos(angles)
+    sx, sy, sz = np.sin(angles)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+
+    return rx @ ry @ rz
+
+def obb_rotation(points: np.ndarray) -> np.ndarray:
+    """Rotation of the oriented bounding box of ``points``, i.e., the
+    principal axes of the vertices of the convex hull, as computed by
+    ``get_oriented_bounding_box()`` of open3d.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates.
+
+    Returns
+    -------
+    `np.ndarray`
+        (3, 3) rotation matrix whose columns are the axes of the box in
+        ascending order of variance.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) > 4:
+        try:
+            points = points[ConvexHull(points).vertices]
+        except QhullError:
+            # degenerated point clouds (e.g., planar) need to be joggled
+            points = points[ConvexHull(points, qhull_options='QJ').vertices]
+    if len(points) < 2:
+        return np.eye(3)
+
+    _, axes = np.linalg.eigh(np.cov(points, rowvar=False))
+    if np.linalg.det(axes) < 0:
+        axes[:, 2] = -axes[:, 2]
+
+    return axes
+
+def get_views(
+        points: np.ndarray,
+        width: int,
+        height: int,
+        view_rotations: np.ndarray = VIEW_ROTATIONS
+    ) -> List[View]:
+    """Set up the projected views of a reference point cloud. The point
+    cloud is aligned with its oriented bounding box, rotated by each of
+    ``view_rotations`` in turn, and fitted into the image. Render the
+    target point clouds with the same views.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) points of the reference point cloud.
+    width : `int`
+        Width of the images.
+    height : `int`
+        Height of the images.
+    view_rotations : `np.ndarray`, optional
+        (V, 3) rotations about the x, y and z axes in radians. Defaults
+        to ``VIEW_ROTATIONS``.
+
+    Returns
+    -------
+    `List[View]`
+        The V views.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    center = points.mean(axis=0)
+    rotation = obb_rotation(points)
+
+    views = []
+    for angles in view_rotations:
+        rotation = rotation_from_xyz(angles) @ rotation
+        xy = (points - center) @ rotation[:2].T
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+        extent = np.maximum(hi - lo, np.finfo(np.float64).tiny)
+        scale = float(
+            (1 - 2 * MARGIN) * min(width / extent[0], height / extent[1])
+        )
+        views.append(View(rotation, center, (lo + hi) / 2, scale))
+
+    return views
+
+def render(
+        points: np.ndarray,
+        colors: np.ndarray,
+        view: View,
+        width: int,
+        height: int,
+        background: np.ndarray,
+        point_size: int = POINT_SIZE
+    ) -> np.ndarray:
+    """Render a point cloud with square splats and a z-buffer.
+
+    Each splat covers the ``point_size`` x ``point_size`` pixels around
+    its point, so the nearest splat of a pixel belongs to the nearest
+    point among the pixels around it. The nearest point of each pixel
+    is found by one sort, and the splats are drawn by taking the
+    nearest of the shifted copies of the z-buffer.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates.
+    colors : `np.ndarray`
+        (N, 3) RGB colors in [0, 255] or a (3,) color of all the points.
+    view : `View`
+        The camera from ``get_views()``.
+    width : `int`
+        Width of the image.
+    height : `int`
+        Height of the image.
+    background : `np.ndarray`
+        (3,) RGB background color in [0, 255].
+    point_size : `int`, optional
+        Side length of the splats in pixels. Defaults to
+        ``POINT_SIZE``.
+
+    Returns
+    -------
+    `np.ndarray`
+        (height, width, 3) RGB image in uint8.
+    """
+    points = (np.asarray(points, dtype=np.float64) - view.center)
+    points = points @ view.rotation.T
+    u = np.floor(
+        (points[:, 0] - view.origin[0]) * view.scale + width / 2
+    ).astype(np.int64)
+    v = np.floor(
+        height / 2 - (points[:, 1] - view.origin[1]) * view.scale
+    ).astype(np.int64)
+    inside = (u >= 0) & (u < width) & (v >= 0) & (v < height)
+    indices = np.flatnonzero(inside)
+    pixels = v[inside] * width + u[inside]
+    # nearer points have larger z
+    depths = points[inside, 2]
+
+    # the nearest point of each pixel
+    order = np.lexsort((-depths, pixels))
+    pixels = pixels[order]
+    first = np.ones(len(pixels), dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    order = order[first]
+
+    pad = point_size // 2
+    size = (height + point_size - 1, width + point_size - 1)
+    zbuf = np.full(size, -np.inf)
+    nearest = np.full(size, -1, dtype=np.int64)
+    rows, cols = np.divmod(pixels[first], width)
+    zbuf[rows + pad, cols + pad] = depths[order]
+    nearest[rows + pad, cols + pad] = indices[order]
+
+    # the splat of the point at pixel q covers the pixels q + d, so the
+    # candidates of pixel p are the points at the pixels p - d
+    best = np.full((height, width), -np.inf)
+    ret = np.full((height, width), -1, dtype=np.int64)
+    for dy in range(point_size):
+        for dx in range(point_size):
+            shifted = zbuf[dy:dy + height, dx:dx + width]
+            closer = shifted > best
+            best[closer] = shifted[closer]
+            ret[closer] = nearest[dy:dy + height, dx:dx + width][closer]
+
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = np.asarray(background, dtype=np.uint8)
+    covered = ret >= 0
+    colors = np.asarray(colors, dtype=np.uint8)
+    img[covered] = colors[ret[covered]] if colors.ndim == 2 else colors
+
+    return img
@@ -0,0 +1,309 @@
+import math
+import logging
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from scipy.stats import norm
+
+from evaluator.metrics.pc_distortion import (
+    ReferenceIndex, drop_duplicates, get_psnr, search, search_structure,
+    color_errors
+)
+
+logger = logging.getLogger(__name__)
+
+# Default number of query points sampled in each direction
+SAMPLE_SIZE = 1 << 16
+# Default confidence level of the intervals
+CONFIDENCE = 0.95
+# Default seed of the sampling. A fixed seed samples the same reference
+# points for all the targets, so the errors of comparing the targets
+# are smaller than the intervals of each target.
+SEED = 0
+# Average number of query points sampled in each stratum
+STRATUM_SIZE = 4
+# Number of cells per axis of the finest stratification grid
+STRATA_GRID_SIZE = 1 << 10
+
+def stratify(points: np.ndarray, num_strata: int) -> Tuple[np.ndarray, float]:
+    """Partition ``points`` into spatial strata, i.e., the cells of the
+    finest uniform grid with at most ``num_strata`` non-empty cells.
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates.
+    num_strata : `int`
+        Maximum number of strata.
+
+    Returns
+    -------
+    `Tuple[np.ndarray, float]`
+        The stratum of each point (in [0, K)), and the diagonal length
+        of the cells.
+    """
+    lo = points.min(axis=0)
+    extent = float((points.max(axis=0) - lo).max())
+    width = extent / STRATA_GRID_SIZE if extent > 0 else 1.0
+    cells = np.clip(
+        ((points - lo) / width).astype(np.int64), 0, STRATA_GRID_SIZE - 1
+    )
+    keys = (cells[:, 0] * STRATA_GRID_SIZE + cells[:, 1]) * STRATA_GRID_SIZE
+    fine, inverse = np.unique(keys + cells[:, 2], return_inverse=True)
+    fine = np.stack(np.unravel_index(fine, (STRATA_GRID_SIZE,) * 3), -1)
+
+    # coarsen the non-empty cells until there are few enough of them
+    shift = 0
+    while True:
+        coarse = fine >> shift
+        size = STRATA_GRID_SIZE >> shift
+        strata, coarse_inverse = np.unique(
+            (coarse[:, 0] * size + coarse[:, 1]) * size + coarse[:, 2],
+            return_inverse=True
+        )
+        if len(strata) <= num_strata or size == 1:
+            break
+        shift += 1
+
+    labels = coarse_inverse.reshape(-1)[inverse.reshape(-1)]
+
+    return labels, math.sqrt(3) * width * (1 << shift)
+
+def sample_points(
+        points: np.ndarray,
+        sample_size: int,
+        stratified: bool = True,
+        rng: Union[int, np.random.Generator] = None
+    ) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Sample ``sample_size`` points without replacement, uniformly at
+    random or stratified by space with proportional allocation (at
+    least one point per stratum).
+
+    Parameters
+    ----------
+    points : `np.ndarray`
+        (N, 3) point coordinates.
+    sample_size : `int`
+        Number of sampled points. All the points are taken if it is not
+        less than N.
+    stratified : `bool`, optional
+        True for stratified sampling, False for simple random sampling.
+        Defaults to True.
+    rng : `Union[int, np.random.Generator]`, optional
+        The random generator or its seed. Defaults to None.
+
+    Returns
+    -------
+    `Tuple[np.ndarray, np.ndarray, float]`
+        The indices of the sampled points, their weights in the
+        estimate of a mean (summing to 1), and the covering radius,
+        i.e., every point is within the radius of a sampled point (inf
+        if unknown).
+    """
+    num_points = len(points)
+    if sample_size >= num_points:
+        return (
+            np.arange(num_points), np.full(num_points, 1 / num_points), 0.0
+        )
+
+    rng = np.random.default_rng(rng)
+    if not stratified:
+        indices = np.sort(rng.choice(num_points, sample_size, replace=False))
+        return indices, np.full(sample_size, 1 / sample_size), np.inf
+
+    labels, diagonal = stratify(points, max(sample_size // STRATUM_SIZE, 1))
+    sizes = np.bincount(labels)
+    alloc = np.clip(
+        np.round(sample_size * sizes / num_points), 1, sizes
+    ).astype(np.int64)
+
+    # shuffle the points of each stratum and take the first ``alloc``
+    order = np.argsort(labels + rng.random(num_points))
+    sorted_labels = labels[order]
+    first = np.searchsorted(sorted_labels, sorted_labels)
+    rank = np.arange(num_points) - first
+    indices = np.sort(order[rank < alloc[sorted_labels]])
+    weights = (sizes / alloc)[labels[indices]] / num_points
+
+    return indices, weights, diagonal
+
+def estimate_mean(
+        values: np.ndarray,
+        weights: np.ndarray,
+        population: int,
+        z: float
+    ) -> Tuple[float, float]:
+    """Estimate the mean of a population from the sampled ``values``.
+    The variance is estimated as for sampling with replacement with the
+    finite population correction, which is conservative for the
+    proportional allocation of ``sample_points()``.
+
+    Parameters
+    ----------
+    values : `np.ndarray`
+        (n,) sampled values.
+    weights : `np.ndarray`
+        (n,) weights of the sampled values from ``sample_points()``.
+    population : `int`
+        Size of the population.
+    z : `float`
+        Quantile of the standard normal distribution of the confidence
+        level.
+
+    Returns
+    -------
+    `Tuple[float, float]`
+        The estimated mean and the half width of its confidence
+        interval.
+    """
+    n = len(values)
+    mean = float(weights @ values)
+    if n < 2 or n >= population:
+        return mean, 0.0
+
+    var = n / (n - 1) * float((weights * weights) @ (values - mean) ** 2)
+    var *= 1 - n / population
+
+    return mean, z * math.sqrt(var)
+
+def compute_sampled_metrics(
+        ref_index: ReferenceIndex,
+        target_points: np.ndarray,
+        resolution: float,
+        target_colors: np.ndarray = None,
+        sample_size: int = SAMPLE_SIZE,
+        stratified: bool = True,
+        confidence: float = CONFIDENCE,
+        seed: int = SEED
+    ) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
+    """Approximate the point-based quality metrics by querying the
+    nearest neighbours of a sample of the points in each direction.
+
+    The asymmetric Chamfer distances and the color MSEs are means over
+    the query points, so they are estimated with confidence intervals,
+    which are mapped to the CD and the PSNRs. The Hausdorff distance of
+    the sample is a lower bound. With stratified sampling, every point
+    is within the cell diagonal ``r`` of a sampled point, so
+    ``(sqrt(h) + r) ** 2`` is an upper bound of the Hausdorff distance
+    (in squared distance, same as pc_error), where ``h`` is the
+    Hausdorff distance of the sample. The p2plane metrics need the
+    normals derived from all the points, so they are not estimated.
+
+    Stratified sampling takes at least one point of each spatial
+    stratum, so isolated outliers, which dominate the ACD of damaged
+    point clouds, are rarely missed. Simple random sampling misses them
+    and its intervals can be too narrow in this case.
+
+    Parameters
+    ----------
+    ref_index : `ReferenceIndex`
+        The reference point cloud and its search structure.
+    target_points : `np.ndarray`
+        (M, 3) points of the target point cloud.
+    resolution : `float`
+        Peak value for the CD-PSNR, i.e., the diameter of the reference
+        point cloud.
+    target_colors : `np.ndarray`, optional
+        (M, 3) RGB colors of the target point cloud. Defaults to None.
+    sample_size : `int`, optional
+        Number of query points sampled in each direction. Defaults to
+        ``SAMPLE_SIZE``.
+    stratified : `bool`, optional
+        True for stratified sampling, False for simple random sampling.
+        Defaults to True.
+    confidence : `float`, optional
+        Confidence level of the intervals. Defaults to ``CONFIDENCE``.
+    seed : `int`, optional
+        Seed of the sampling. Defaults to ``SEED``.
+
+    Returns
+    -------
+    `Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]`
+        The estimated quality metrics named after the columns of the
+        summary csv file (nan if not estimated) with the numbers of the
+        sampled points (``samples12`` and ``samples21``), and the
+        confidence intervals (bounds for the Hausdorff distance) of the
+        estimated metrics.
+    """
+    rng = np.random.default_rng(seed)
+    z = float(norm.ppf(0.5 + confidence / 2))
+    target_points, target_colors, _ = drop_duplicates(
+        np.asarray(target_points, dtype=np.float64), target_colors
+    )
+    has_colors = ref_index.colors is not None and target_colors is not None
+
+    sides = [
+        (ref_index.points, ref_index.colors, search_structure(target_points),
+         target_colors),
+        (target_points, target_colors, ref_index.index, ref_index.colors),
+    ]
+    estimates = []
+    for points_a, colors_a, index_b, colors_b in sides:
+        indices, weights, cover = sample_points(
+            points_a, sample_size, stratified, rng
+        )
+        nn = search(index_b, points_a[indices])
+        counts, _, sqr_dists = nn
+        c2c = sqr_dists[np.cumsum(counts) - counts]
+
+        h = float(c2c.max())
+        estimate = {
+            'samples': len(indices),
+            'c2c': estimate_mean(c2c, weights, len(points_a), z),
+            'h': (h, (math.sqrt(h) + cover) ** 2),
+        }
+        if has_colors:
+            err = color_errors(colors_a[indices], colors_b, nn)
+            estimate['color'] = [
+                estimate_mean(err[:, c], weights, len(points_a), z)
+                for c in range(3)
+            ]
+        estimates.append(estimate)
+
+    resolution = float(resolution)
+    nan = float('nan')
+    est_a, est_b = estimates
+    (acd12, e12), (acd21, e21) = est_a['c2c'], est_b['c2c']
+    cd = 0.5 * (acd12 + acd21)
+    # the two samples are independent
+    e = 0.5 * math.sqrt(e12 * e12 + e21 * e21)
+
+    ret = {
+        'samples12': est_a['samples'],
+        'samples21': est_b['samples'],
+        'acd12_p2pt': acd12,
+        'acd21_p2pt': acd21,
+        'cd_p2pt': cd,
+        'cdpsnr_p2pt': get_psnr(cd, resolution),
+        'h_p2pt': max(est_a['h'][0], est_b['h'][0]),
+        'acd12_p2pl': nan, 'acd21_p2pl': nan, 'cd_p2pl': nan,
+        'cdpsnr_p2pl': nan, 'h_p2pl': nan, 'hybrid': nan,
+    }
+    intervals = {
+        'acd12_p2pt': (max(acd12 - e12, 0.0), acd12 + e12),
+        'acd21_p2pt': (max(acd21 - e21, 0.0), acd21 + e21),
+        'cd_p2pt': (max(cd - e, 0.0), cd + e),
+        'cdpsnr_p2pt': (
+            get_psnr(cd + e, resolution),
+            get_psnr(max(cd - e, 0.0), resolution)
+        ),
+        'h_p2pt': (ret['h_p2pt'], max(est_a['h'][1], est_b['h'][1])),
+    }
+
+    for c, channel in enumerate(['y', 'u', 'v']):
+        key = f'{channel}_cpsnr'
+        if not has_colors:
+            ret[key] = nan
+            continue
+        # PSNR of each direction and its interval, the lower PSNR is
+        # reported
+        psnrs, lows, highs = [], [], []
+        for estimate in estimates:
+            mse, e = estimate['color'][c]
+            psnrs.append(get_psnr(mse, 1.0))
+            lows.append(get_psnr(mse + e, 1.0))
+            highs.append(get_psnr(max(mse - e, 0.0), 1.0))
+        ret[key] = min(psnrs)
+        intervals[key] = (min(lows), min(highs))
+
+    return ret, intervals
@@ -0,0 +1,792 @@
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from libs.point_cloud import PointCloud
+from utils.ply import get_fields
+from utils.cache import get_cache_dir
+from evaluator.metrics.pc_distortion import (
+    NUM_RESULTS, NUM_RESULTS_MAX, HYBRID_ALPHA, drop_duplicates, search,
+    search_structure, find_metric, summarize_metrics
+)
+
+logger = logging.getLogger(__name__)
+
+# Approximate peak memory of the metric computation per point, i.e.,
+# the points and their attributes, the search structures, the
+# neighbours and the temporary arrays.
+BYTES_PER_POINT = 512
+# Number of cells per axis of the grid partitioning the point clouds.
+# A tile is a cubic block of cells, and the cells around a tile (one
+# cell wide) are its overlap margin.
+GRID_SIZE = 128
+# Number of points read from the point cloud files at once
+CHUNK_SIZE = 1 << 20
+# Name of the parent directory of the temporary tile files, see
+# ``get_cache_dir()``. The system temporary directory is avoided since 
+# it may be in memory (tmpfs).
+TILE_DIR = 'tiles'
+# Neighbours found in a tile are exact if they are closer than the
+# margin by more than the tie tolerance of ``nearest_neighbours()``
+TIE_MARGIN = NUM_RESULTS_MAX * 1e-8
+
+def estimate_memory(num_ref: int, num_target: int) -> int:
+    """Approximate peak memory in bytes of computing the point-based
+    metrics of two point clouds in memory.
+
+    Parameters
+    ----------
+    num_ref : `int`
+        Number of points in the reference point cloud.
+    num_target : `int`
+        Number of points in the target point cloud.
+
+    Returns
+    -------
+    `int`
+        The estimated peak memory in bytes.
+    """
+    return (num_ref + num_target) * BYTES_PER_POINT
+
+def _read_chunks(
+        pc: PointCloud,
+        colors: bool,
+        normals: bool
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Read the points, colors and normals of ``pc`` chunk by chunk.
+    The vertices of PLY files are memory-mapped, so only the current
+    chunk is loaded.
+    """
+    for start in range(0, pc.num_points, CHUNK_SIZE):
+        stop = start + CHUNK_SIZE
+        if pc.vertices is not None:
+            chunk = pc.vertices[start:stop]
+            yield (
+                get_fields(chunk, ['x', 'y', 'z']).astype(np.float64),
+                get_fields(chunk, ['red', 'green', 'blue'])
+                .astype(np.uint8) if colors else None,
+                get_fields(chunk, ['nx', 'ny', 'nz'])
+                .astype(np.float64) if normals else None,
+            )
+        else:
+            yield (
+                np.asarray(pc.points[start:stop], dtype=np.float64),
+                pc.colors[start:stop] if colors else None,
+                np.asarray(pc.normals[start:stop], dtype=np.float64)
+                if normals else None,
+            )
+
+class _Grid():
+    """Uniform grid of ``GRID_SIZE`` cubic cells per axis over the
+    bounding box of both point clouds. Cells are numbered tile by tile,
+    so the points of a tile, and of a cell, are contiguous once sorted
+    by the cell numbers.
+    """
+    def __init__(self, lo: np.ndarray, hi: np.ndarray) -> None:
+        extent = float((hi - lo).max())
+        self.origin = lo
+        self.width = extent / GRID_SIZE if extent > 0 else 1.0
+        # rounding error of the cell boundaries
+        self.tol = 1e-9 * (extent + float(np.abs(lo).max()) + self.width)
+        self.tile_size = GRID_SIZE
+
+    @property
+    def num_tiles(self) -> int:
+        """Number of tiles per axis.
+        """
+        return GRID_SIZE // self.tile_size
+
+    @property
+    def tile_cells(self) -> int:
+        """Number of cells per tile.
+        """
+        return self.tile_size ** 3
+
+    def cells(self, points: np.ndarray) -> np.ndarray:
+        """(N, 3) cell coordinates of ``points``.
+        """
+        cells = np.floor((points - self.origin) / self.width)
+        return np.clip(cells, 0, GRID_SIZE - 1).astype(np.int64)
+
+    def positions(self, cells: np.ndarray) -> np.ndarray:
+        """Numbers of ``cells`` in the tile by tile order.
+        """
+        b, nt = self.tile_size, self.num_tiles
+        t, c = cells // b, cells % b
+        tile = (t[:, 0] * nt + t[:, 1]) * nt + t[:, 2]
+
+        return tile * b ** 3 + (c[:, 0] * b + c[:, 1]) * b + c[:, 2]
+
+    def reorder(self, hist: np.ndarray) -> np.ndarray:
+        """Reorder the (G, G, G) cell histogram ``hist`` into the tile
+        by tile order.
+        """
+        b, nt = self.tile_size, self.num_tiles
+        return (
+            hist.reshape(nt, b, nt, b, nt, b)
+            .transpose(0, 2, 4, 1, 3, 5).ravel()
+        )
+
+    def tile_box(self, tile: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The first and the last cells of ``tile``.
+        """
+        nt = self.num_tiles
+        lo = np.array(np.unravel_index(tile, (nt, nt, nt))) * self.tile_size
+
+        return lo, lo + self.tile_size - 1
+
+    def bounds(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Coordinates of the cell box from ``lo`` to ``hi``. The sides
+        at the border of the grid are unbounded, since no point is
+        beyond them.
+        """
+        lower = np.where(lo > 0, self.origin + lo * self.width, -np.inf)
+        upper = np.where(
+            hi < GRID_SIZE - 1, self.origin + (hi + 1) * self.width, np.inf
+        )
+
+        return np.stack([lower, upper])
+
+class _TiledCloud():
+    """A point cloud partitioned by ``grid``. The points are
+    deduplicated and sorted by the cell numbers into memory-mapped
+    files, so a tile, or the cells around it, can be loaded without
+    reading the whole point cloud.
+    """
+    def __init__(
+            self,
+            pc: PointCloud,
+            grid: _Grid,
+            hist: np.ndarray,
+            colors: bool,
+            normals: bool,
+            tmp_dir: Path
+        ) -> None:
+        """
+        Parameters
+        ----------
+        pc : `PointCloud`
+            The point cloud.
+        grid : `_Grid`
+            The grid with the chosen tile size.
+        hist : `np.ndarray`
+            (G, G, G) number of points in each cell.
+        colors : `bool`
+            True to include the colors.
+        normals : `bool`
+            True to include the normals.
+        tmp_dir : `Path`
+            The directory of the memory-mapped files.
+        """
+        self.grid = grid
+        num_points = int(hist.sum())
+
+        def open_memmap(name, dtype):
+            return np.lib.format.open_memmap(
+                tmp_dir.joinpath(f'{name}.npy'), mode='w+', dtype=dtype,
+                shape=(num_points, 3)
+            )
+        self.points = open_memmap('points', np.float64)
+        self.colors = open_memmap('colors', np.uint8) if colors else None
+        self.normals = open_memmap('normals', np.float64) if normals else None
+
+        self._scatter(pc, grid.reorder(hist))
+        self._drop_duplicates()
+
+    def _scatter(self, pc: PointCloud, counts: np.ndarray) -> None:
+        """Copy the points of ``pc`` into the files, sorted by the cell
+        numbers (a counting sort).
+        """
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        fill = self.offsets[:-1].copy()
+
+        chunks = _read_chunks(
+            pc, self.colors is not None, self.normals is not None
+        )
+        for points, colors, normals in chunks:
+            pos = self.grid.positions(self.grid.cells(points))
+            order = np.argsort(pos, kind='stable')
+            pos = pos[order]
+            rank = np.arange(len(pos)) - np.searchsorted(pos, pos)
+            dest = fill[pos] + rank
+
+            self.points[dest] = points[order]
+            if self.colors is not None:
+                self.colors[dest] = colors[order]
+            if self.normals is not None:
+                self.normals[dest] = normals[order]
+            fill += np.bincount(pos, minlength=len(fill))
+
+    def _drop_duplicates(self) -> None:
+        """Merge the duplicated points tile by tile. Duplicated points
+        are in the same cell, so the result is the same as
+        ``drop_duplicates()`` on the whole point cloud. The unique
+        points are compacted in place.
+        """
+        tile_cells = self.grid.tile_cells
+        counts = np.zeros(len(self.offsets) - 1, dtype=np.int64)
+
+        n = 0
+        for tile in self.tiles():
+            start, stop = self.tile_range(tile)
+            points, colors, normals = drop_duplicates(
+                np.array(self.points[start:stop]),
+                None if self.colors is None else
+                np.array(self.colors[start:stop]),
+                None if self.normals is None else
+                np.array(self.normals[start:stop])
+            )
+
+            # keep the points sorted by the cell numbers
+            pos = self.grid.positions(self.grid.cells(points))
+            order = np.argsort(pos, kind='stable')
+            stop = n + len(points)
+            self.points[n:stop] = points[order]
+            if colors is not None:
+                self.colors[n:stop] = colors[order]
+            if normals is not None:
+                self.normals[n:stop] = normals[order]
+
+            first = tile * tile_cells
+            counts[first:first+tile_cells] = np.bincount(
+                pos - first, minlength=tile_cells
+            )
+            n = stop
+
+        self.n = n
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def tiles(self) -> np.ndarray:
+        """Numbers of the non-empty tiles.
+        """
+        return np.flatnonzero(np.diff(self.offsets[::self.grid.tile_cells]))
+
+    def tile_range(self, tile: int) -> Tuple[int, int]:
+        """The range of the points of ``tile`` in the files.
+        """
+        tile_cells = self.grid.tile_cells
+        return (
+            int(self.offsets[tile * tile_cells]),
+            int(self.offsets[(tile + 1) * tile_cells])
+        )
+
+    def gather(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Indices of the points in the cell box from ``lo`` to ``hi``.
+        """
+        cells = np.stack(np.meshgrid(
+            *[np.arange(l, h + 1) for l, h in zip(lo, hi)], indexing='ij'
+        ), -1).reshape(-1, 3)
+        pos = np.sort(self.grid.positions(cells))
+
+        starts = self.offsets[pos]
+        lens = self.offsets[pos + 1] - starts
+
+        return (
+            np.repeat(starts - np.cumsum(lens) + lens, lens)
+            + np.arange(lens.sum())
+        )
+
+def _scan(pc: PointCloud) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """The bounding box of ``pc``, and whether all the coordinates are
+    integers.
+    """
+    lo, hi = np.full(3, np.inf), np.full(3, -np.inf)
+    integer = True
+    for points, _, _ in _read_chunks(pc, False, False):
+        lo = np.minimum(lo, points.min(axis=0))
+        hi = np.maximum(hi, points.max(axis=0))
+        integer = integer and bool(np.all(points == np.round(points)))
+
+    return lo, hi, integer
+
+def _histogram(pc: PointCloud, grid: _Grid) -> np.ndarray:
+    """(G, G, G) number of points of ``pc`` in each cell.
+    """
+    hist = np.zeros(GRID_SIZE ** 3, dtype=np.int64)
+    for points, _, _ in _read_chunks(pc, False, False):
+        cells = grid.cells(points)
+        hist += np.bincount(
+            (cells[:, 0] * GRID_SIZE + cells[:, 1]) * GRID_SIZE + cells[:, 2],
+            minlength=len(hist)
+        )
+
+    return hist.reshape((GRID_SIZE,) * 3)
+
+def _box_sums(
+        integral: np.ndarray,
+        lo: np.ndarray,
+        hi: np.ndarray
+    ) -> np.ndarray:
+    """Sums of the cell boxes from ``lo`` to ``hi`` (both (T, 3)) with
+    the summed-area table ``integral``.
+    """
+    a, c = lo.T, (hi + 1).T
+    return (
+        integral[c[0], c[1], c[2]]
+        - integral[a[0], c[1], c[2]]
+        - integral[c[0], a[1], c[2]]
+        - integral[c[0], c[1], a[2]]
+        + integral[a[0], a[1], c[2]]
+        + integral[a[0], c[1], a[2]]
+        + integral[c[0], a[1], a[2]]
+        - integral[a[0], a[1], a[2]]
+    )
+
+def _choose_tile_size(
+        hist_a: np.ndarray,
+        hist_b: np.ndarray,
+        max_points: int
+    ) -> int:
+    """The largest tile size (in cells, a power of 2) such that the
+    points of any tile and the points of the other point cloud around
+    it fit in ``max_points``.
+    """
+    integrals = []
+    for hist in (hist_a, hist_b):
+        integral = np.zeros((GRID_SIZE + 1,) * 3, dtype=np.int64)
+        integral[1:, 1:, 1:] = hist.cumsum(0).cumsum(1).cumsum(2)
+        integrals.append(integral)
+
+    b = GRID_SIZE
+    while True:
+        nt = GRID_SIZE // b
+        lo = np.indices((nt, nt, nt)).reshape(3, -1).T * b
+        hi = lo + b - 1
+        lo_m, hi_m = np.maximum(lo - 1, 0), np.minimum(hi + 1, GRID_SIZE - 1)
+        core = [_box_sums(integral, lo, hi) for integral in integrals]
+        margin = [_box_sums(integral, lo_m, hi_m) for integral in integrals]
+
+        cost = int(np.maximum(core[0] + margin[1], core[1] + margin[0]).max())
+        if cost <= max_points:
+            return b
+        if b == 1:
+            logger.warning(
+                f"The densest tile has {cost} points with the margin, "
+                f"more than {max_points} points within the memory limit."
+            )
+            return b
+        b //= 2
+
+def _save_part(
+        path: Path,
+        rows: np.ndarray,
+        nn: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> Path:
+    """Save the nearest neighbours ``nn`` of the query points ``rows``.
+    """
+    counts, indices, sqr_dists = nn
+    np.savez(
+        path, rows=rows, counts=counts, indices=indices, sqr_dists=sqr_dists
+    )
+
+    return path
+
+def _load_part(
+        path: Path
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    with np.load(path) as part:
+        return (
+            part['rows'],
+            (part['counts'], part['indices'], part['sqr_dists'])
+        )
+
+def _search_tiles(
+        x: _TiledCloud,
+        y: _TiledCloud,
+        tmp_dir: Path,
+        name: str
+    ) -> Tuple[List[Path], np.ndarray, np.ndarray]:
+    """Find the nearest neighbours of the points of ``x`` in ``y`` tile
+    by tile, searching the points of ``y`` in the tile and its margin.
+
+    Returns
+    -------
+    `Tuple[List[Path], np.ndarray, np.ndarray]`
+        The files of the exact nearest neighbours, and the query points
+        whose nearest neighbours may be beyond the margin with the
+        upper bounds of their squared NN distances.
+    """
+    grid = x.grid
+    parts, far_rows, far_bounds = [], [], []
+
+    for tile in x.tiles():
+        start, stop = x.tile_range(tile)
+        rows = np.arange(start, stop)
+        queries = np.array(x.points[start:stop])
+
+        lo, hi = grid.tile_box(tile)
+        lo, hi = np.maximum(lo - 1, 0), np.minimum(hi + 1, GRID_SIZE - 1)
+        idx = y.gather(lo, hi)
+        if len(idx) == 0:
+            far_rows.append(rows)
+            far_bounds.append(np.full(len(rows), np.inf))
+            continue
+
+        counts, indices, sqr_dists = search(
+            search_structure(y.points[idx]), queries
+        )
+
+        # the neighbours are exact if they are closer than the border
+        # of the loaded cells
+        lower, upper = grid.bounds(lo, hi)
+        bound = np.minimum(queries - lower, upper - queries).min(axis=1)
+        bound = np.maximum(bound - grid.tol, 0)
+        first = sqr_dists[np.cumsum(counts) - counts]
+        exact = first + TIE_MARGIN < bound * bound
+
+        keep = np.repeat(exact, counts)
+        parts.append(_save_part(
+            tmp_dir.joinpath(f'{name}_{tile}.npz'), rows[exact],
+            (counts[exact], idx[indices[keep]], sqr_dists[keep])
+        ))
+        far_rows.append(rows[~exact])
+        far_bounds.append(first[~exact] + TIE_MARGIN)
+
+    return parts, np.concatenate(far_rows), np.concatenate(far_bounds)
+
+def _search_far(
+        x: _TiledCloud,
+        y: _TiledCloud,
+        rows: np.ndarray,
+        bounds: np.ndarray,
+        round_dists: bool,
+        max_points: int,
+        tmp_dir: Path,
+        name: str
+    ) -> List[Path]:
+    """Find the nearest neighbours of the points ``rows`` of ``x`` in
+    ``y``, visiting the tiles of ``y`` within the upper bounds
+    ``bounds`` of their squared NN distances. Same results as
+    ``nearest_neighbours()``.
+    """
+    grid = y.grid
+    nt = grid.num_tiles
+    tile_width = grid.width * grid.tile_size
+    non_empty = np.zeros(nt ** 3, dtype=bool)
+    non_empty[y.tiles()] = True
+
+    k = min(NUM_RESULTS, y.n)
+    k_max = min(NUM_RESULTS_MAX, y.n)
+    batch_size = max(max_points // (2 * k_max), 1)
+
+    parts = []
+    for batch in range(0, len(rows), batch_size):
+        batch_rows = rows[batch:batch+batch_size]
+        bound = bounds[batch:batch+batch_size].copy()
+        queries = np.array(x.points[batch_rows])
+        num_queries = len(queries)
+
+        # tiles intersecting the bounding box of each NN ball
+        radius = np.sqrt(bound)[:, None] + grid.tol
+        with np.errstate(invalid='ignore'):
+            lo = np.floor((queries - radius - grid.origin) / tile_width)
+            hi = np.floor((queries + radius - grid.origin) / tile_width)
+        lo = np.clip(np.nan_to_num(lo, neginf=0), 0, nt - 1).astype(np.int64)
+        hi = np.clip(np.nan_to_num(hi, posinf=nt), 0, nt - 1).astype(np.int64)
+        ext = hi - lo + 1
+        num_pairs = ext.prod(axis=1)
+
+        pair_query = np.repeat(np.arange(num_queries), num_pairs)
+        j = np.arange(num_pairs.sum()) - np.repeat(
+            np.cumsum(num_pairs) - num_pairs, num_pairs
+        )
+        e = ext[pair_query]
+        t = lo[pair_query] + np.stack([
+            j // (e[:, 1] * e[:, 2]), j // e[:, 2] % e[:, 1], j % e[:, 2]
+        ], axis=1)
+        pair_tile = (t[:, 0] * nt + t[:, 1]) * nt + t[:, 2]
+
+        keep = non_empty[pair_tile]
+        pair_query, pair_tile = pair_query[keep], pair_tile[keep]
+        order = np.argsort(pair_tile, kind='stable')
+        pair_query, pair_tile = pair_query[order], pair_tile[order]
+        tiles, first = np.unique(pair_tile, return_index=True)
+
+        best_d = np.full((num_queries, k_max), np.inf)
+        best_i = np.full((num_queries, k_max), -1, dtype=np.int64)
+        for tile, sel in zip(tiles, np.split(pair_query, first[1:])):
+            # skip the query points whose NN ball shrank away
+            lo_c, hi_c = grid.tile_box(tile)
+            box_lo = grid.origin + lo_c * grid.width
+            box_hi = grid.origin + (hi_c + 1) * grid.width
+            gap = (
+                np.maximum(box_lo - queries[sel], 0)
+                + np.maximum(queries[sel] - box_hi, 0)
+            )
+            gap = np.maximum(gap - grid.tol, 0)
+            sel = sel[(gap * gap).sum(axis=1) <= bound[sel]]
+            if len(sel) == 0:
+                continue
+
+            start, stop = y.tile_range(tile)
+            tree = cKDTree(y.points[start:stop])
+            kk = min(k_max, tree.n)
+            dist, idx = tree.query(
+                queries[sel], k=kk,
+                distance_upper_bound=float(np.sqrt(bound[sel].max()))
+            )
+            dist, idx = dist.reshape(len(sel), kk), idx.reshape(len(sel), kk)
+            found = idx < tree.n
+
+            cand_d = np.hstack([
+                best_d[sel], np.where(found, dist * dist, np.inf)
+            ])
+            cand_i = np.hstack([
+                best_i[sel], np.where(found, idx + start, -1)
+            ])
+            order = np.argsort(cand_d, axis=1, kind='stable')[:, :k_max]
+            best_d[sel] = np.take_along_axis(cand_d, order, axis=1)
+            best_i[sel] = np.take_along_axis(cand_i, order, axis=1)
+            bound[sel] = np.minimum(bound[sel], best_d[sel, 0] + TIE_MARGIN)
+
+        # same tie rules as ``nearest_neighbours()``
+        if round_dists:
+            best_d = np.round(best_d)
+        width = np.where(best_d[:, 0] == best_d[:, k - 1], k_max, k)
+        tied = np.ones(best_d.shape, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            tied[:, 1:] = np.cumprod(
+                np.abs(np.diff(best_d, axis=1)) < 1e-8, axis=1
+            ).astype(bool)
+        tied &= np.arange(k_max) < width[:, None]
+
+        parts.append(_save_part(
+            tmp_dir.joinpath(f'{name}_far_{batch}.npz'), batch_rows,
+            (tied.sum(axis=1), best_i[tied], best_d[tied])
+        ))
+
+    return parts
+
+def _exact_ties(
+        nn: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """The row of each neighbour, and the mask of the neighbours at
+    exactly the nearest distance.
+    """
+    counts, _, sqr_dists = nn
+    rows = np.repeat(np.arange(len(counts)), counts)
+
+    return rows, sqr_dists == sqr_dists[np.cumsum(counts) - counts][rows]
+
+def _scale_normals(
+        ref: _TiledCloud,
+        target: _TiledCloud,
+        parts_ab: List[Path],
+        parts_ba: List[Path],
+        tmp_dir: Path
+    ) -> np.ndarray:
+    """Same as ``scale_normals()`` on the tiled point clouds, with the
+    nearest neighbours saved part by part.
+    """
+    def open_memmap(name, dtype, shape):
+        return np.lib.format.open_memmap(
+            tmp_dir.joinpath(f'{name}.npy'), mode='w+', dtype=dtype,
+            shape=shape
+        )
+    sums = open_memmap('normal_sums', np.float64, (target.n, 3))
+    contrib = open_memmap('normal_contrib', np.int64, (target.n,))
+    normals = open_memmap('target_normals', np.float64, (target.n, 3))
+
+    # each reference point contributes its normal to its nearest points
+    for path in parts_ab:
+        rows, nn = _load_part(path)
+        r, exact = _exact_ties(nn)
+        uniq, inverse = np.unique(nn[1][exact], return_inverse=True)
+        ref_normals = ref.normals[rows[r[exact]]]
+
+        contrib[uniq] += np.bincount(inverse, minlength=len(uniq))
+        for c in range(3):
+            sums[uniq, c] += np.bincount(
+                inverse, weights=ref_normals[:, c], minlength=len(uniq)
+            )
+
+    # points without any contribution take the average normal of their
+    # nearest points
+    for path in parts_ba:
+        rows, nn = _load_part(path)
+        num = contrib[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            part_normals = sums[rows] / num[:, None]
+
+        orphan = num == 0
+        if np.any(orphan):
+            r, exact = _exact_ties(nn)
+            exact &= orphan[r]
+            ref_normals = ref.normals[nn[1][exact]]
+            num = np.bincount(r[exact], minlength=len(rows))[orphan]
+            for c in range(3):
+                part_normals[orphan, c] = np.bincount(
+                    r[exact], weights=ref_normals[:, c], minlength=len(rows)
+                )[orphan] / num
+
+        normals[rows] = part_normals
+
+    return normals
+
+def _find_metric(
+        x: _TiledCloud,
+        y: _TiledCloud,
+        parts: List[Path],
+        normals_y: np.ndarray = None,
+        colors: bool = True
+    ) -> Dict[str, np.ndarray]:
+    """Same as ``find_metric()`` on the tiled point clouds, with the
+    nearest neighbours saved part by part.
+    """
+    ret = {}
+    for path in parts:
+        rows, (counts, indices, sqr_dists) = _load_part(path)
+        if len(rows) == 0:
+            continue
+        uniq, inverse = np.unique(indices, return_inverse=True)
+
+        metric = find_metric(
+            x.points[rows], y.points[uniq],
+            (counts, inverse.reshape(-1), sqr_dists),
+            None if normals_y is None else normals_y[uniq],
+            x.colors[rows] if colors else None,
+            y.colors[uniq] if colors else None
+        )
+        for key, value in metric.items():
+            if key not in ret:
+                ret[key] = value
+            elif key.startswith('max_'):
+                ret[key] = max(ret[key], value)
+            else:
+                ret[key] = ret[key] + value
+
+    return ret
+
+def compute_tiled_metrics(
+        ref_pc: Union[str, Path, PointCloud],
+        target_pc: Union[str, Path, PointCloud],
+        resolution: float,
+        memory_limit: int,
+        colors: bool = True,
+        normals: bool = True,
+        hybrid_alpha: float = HYBRID_ALPHA,
+        tmp_dir: Union[str, Path] = None
+    ) -> Dict[str, float]:
+    """Compute the same metrics as ``compute_quality_metrics()`` within
+    a memory limit, for point clouds too large to be evaluated in
+    memory (e.g., by many parallel workers).
+
+    Both point clouds are partitioned by a uniform grid into spatial
+    tiles, which are stored in memory-mapped files and processed one at
+    a time. The nearest neighbours of the points in a tile are searched
+    in the tile and a margin of one cell around it. The query points
+    whose neighbours may be beyond the margin are searched again in all
+    the tiles within their NN distance, so the results are exact.
+
+    Parameters
+    ----------
+    ref_pc : `Union[str, Path, PointCloud]`
+        The reference point cloud.
+    target_pc : `Union[str, Path, PointCloud]`
+        The target point cloud.
+    resolution : `float`
+        Peak value for the CD-PSNR, i.e., the diameter of the reference
+        point cloud.
+    memory_limit : `int`
+        Memory limit in bytes. Tiles are sized to keep the estimated
+        memory usage within it.
+    colors : `bool`, optional
+        True to compute the color metrics, if both point clouds have
+        colors. Defaults to True.
+    normals : `bool`, optional
+        True to compute the p2plane metrics, if the reference point
+        cloud has normals. Defaults to True.
+    hybrid_alpha : `float`, optional
+        Weight of combining geometry and color metrics. Defaults to
+        ``HYBRID_ALPHA``.
+    tmp_dir : `Union[str, Path]`, optional
+        Parent directory of the temporary tile files. Defaults to
+        None, ``get_cache_dir(TILE_DIR)``.
+
+    Returns
+    -------
+    `Dict[str, float]`
+        Quality metrics named after the columns of the summary csv
+        file. Metrics that cannot be calculated are nan.
+
+    Raises
+    ------
+    `ValueError`
+        Either point cloud is empty.
+    """
+    ref_pc = PointCloud.wrap(ref_pc)
+    target_pc = PointCloud.wrap(target_pc)
+    if ref_pc.num_points == 0 or target_pc.num_points == 0:
+        logger.error(
+            f"Cannot evaluate empty point clouds ({ref_pc.path} and "
+            f"{target_pc.path})."
+        )
+        raise ValueError
+
+    colors = colors and ref_pc.has_colors() and target_pc.has_colors()
+    normals = normals and ref_pc.has_normals()
+    max_points = max(int(memory_limit) // BYTES_PER_POINT, 1)
+
+    ref_lo, ref_hi, ref_integer = _scan(ref_pc)
+    target_lo, target_hi, target_integer = _scan(target_pc)
+    grid = _Grid(np.minimum(ref_lo, target_lo), np.maximum(ref_hi, target_hi))
+    ref_hist = _histogram(ref_pc, grid)
+    target_hist = _histogram(target_pc, grid)
+    grid.tile_size = _choose_tile_size(ref_hist, target_hist, max_points)
+    logger.debug(
+        f"Evaluate {target_pc.path} with {grid.num_tiles ** 3} tiles of "
+        f"{grid.tile_size ** 3} cells."
+    )
+
+    if tmp_dir is None:
+        tmp_dir = get_cache_dir(TILE_DIR)
+    Path(tmp_dir).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        tmp = Path(tmp)
+        tmp.joinpath('ref').mkdir()
+        tmp.joinpath('target').mkdir()
+        ref = _TiledCloud(
+            ref_pc, grid, ref_hist, colors, normals, tmp.joinpath('ref')
+        )
+        target = _TiledCloud(
+            target_pc, grid, target_hist, colors, False,
+            tmp.joinpath('target')
+        )
+
+        # squared distances between integer points are integers
+        round_dists = ref_integer and target_integer
+        nn_parts = []
+        for x, y, name in [(ref, target, 'ab'), (target, ref, 'ba')]:
+            parts, far_rows, far_bounds = _search_tiles(x, y, tmp, name)
+            logger.debug(
+                f"{len(far_rows)} of {x.n} points are searched beyond the "
+                f"tile margins."
+            )
+            parts += _search_far(
+                x, y, far_rows, far_bounds, round_dists, max_points, tmp,
+                name
+            )
+            nn_parts.append(parts)
+
+        if normals:
+            target_normals = _scale_normals(
+                ref, target, nn_parts[0], nn_parts[1], tmp
+            )
+        else:
+            target_normals = None
+
+        metric_a = _find_metric(
+            ref, target, nn_parts[0], target_normals, colors
+        )
+        metric_b = _find_metric(
+            target, ref, nn_parts[1],
+            ref.normals if normals else None, colors
+        )
+
+    return summarize_metrics(
+        metric_a, metric_b, ref.n, target.n, resolution, hybrid_alpha
+    )
@@ -0,0 +1,241 @@
+import math
+import logging
+from typing import Tuple, List, Callable
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+# Squared radius of the ball searched on the grid. Points without a
+# neighbour within the ball are searched with a KD-tree.
+MAX_SQR_RADIUS = 9
+# Approximate cost of a KD-tree query in grid probes. The shell search
+# stops when the next shell is not expected to pay off, e.g., for noisy
+# point clouds whose neighbours are mostly far away.
+KD_QUERY_COST = 64
+# Number of query points to estimate the ratio of the query points
+# falling back to the KD-tree, and the maximum ratio to use the grid
+SAMPLE_SIZE = 4096
+MAX_FALLBACK_RATIO = 0.25
+# Number of probes (query points x offsets) processed at once, bounds
+# the memory of the probe arrays.
+PROBE_CHUNK_SIZE = 1 << 22
+# Coordinates must be within this range to be packed into a 64-bit key
+MAX_COORD = 1 << 20
+
+def is_voxelized(points: np.ndarray) -> bool:
+    """Check if all the coordinates of ``points`` are integers, i.e.,
+    the point cloud lies on an integer lattice.
+    """
+    if len(points) == 0:
+        return False
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    if not (np.all(np.isfinite(lo)) and np.all(np.isfinite(hi))):
+        return False
+    if np.any(hi - lo >= MAX_COORD) or np.any(np.abs(lo) >= MAX_COORD):
+        return False
+    return bool(np.all(points == np.round(points)))
+
+def _shell_offsets(max_sqr_radius: int) -> List[Tuple[int, np.ndarray]]:
+    """Lattice offsets in the ball of squared radius ``max_sqr_radius``
+    except the center, grouped by their squared length in increasing
+    order.
+    """
+    radius = math.isqrt(max_sqr_radius)
+    r = np.arange(-radius, radius + 1)
+    offsets = np.stack(np.meshgrid(r, r, r, indexing='ij'), -1).reshape(-1, 3)
+    sqr_len = (offsets ** 2).sum(axis=1)
+
+    return [
+        (d, offsets[sqr_len == d])
+        for d in np.unique(sqr_len) if 0 < d <= max_sqr_radius
+    ]
+
+class VoxelGrid():
+    """Exact nearest neighbour search on point clouds with integer
+    coordinates. Each voxel is packed into a 64-bit key and looked up in
+    the sorted keys of the point cloud, so the search is a few
+    vectorized binary searches per query point instead of a tree
+    traversal.
+
+    The query points are first matched exactly, then searched shell by
+    shell, i.e., the lattice offsets of the same length in increasing
+    order. Once a neighbour is found in a shell, all the offsets closer
+    than the shell have been probed, so the shell holds exactly the
+    nearest neighbours (all the ties). Query points without a neighbour
+    within ``MAX_SQR_RADIUS`` fall back to a KD-tree.
+    """
+    def __init__(self, points: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        points : `np.ndarray`
+            (N, 3) unique points with integer coordinates.
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.n = len(self.points)
+        self._tree = None
+
+        # query points within ``radius`` of the bounding box may have
+        # neighbours in the shells, and their probes are within 
+        # ``2 * radius`` of the bounding box
+        radius = math.isqrt(MAX_SQR_RADIUS)
+        coords = self.points.astype(np.int64)
+        self._lo = coords.min(axis=0) - radius
+        self._hi = coords.max(axis=0) + radius
+        self._origin = self._lo - radius
+        dims = self._hi - self._lo + 1 + 2 * radius
+        self._strides = np.array([dims[1] * dims[2], dims[2], 1])
+
+        keys = self._keys(coords)
+        self._order = np.argsort(keys, kind='stable')
+        self._keys_sorted = keys[self._order]
+
+    def __getstate__(self) -> dict:
+        # the fallback tree is rebuilt on demand
+        state = self.__dict__.copy()
+        state['_tree'] = None
+        return state
+
+    @property
+    def tree(self) -> cKDTree:
+        """KD-tree of the points, built on the first use.
+        """
+        if self._tree is None:
+            self._tree = cKDTree(self.points)
+        return self._tree
+
+    def _keys(self, coords: np.ndarray) -> np.ndarray:
+        return (coords - self._origin) @ self._strides
+
+    def _lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Find ``keys`` in the grid. Return the found mask and the
+        point indices (valid where found).
+        """
+        pos = np.searchsorted(self._keys_sorted, keys)
+        pos[pos == self.n] = 0
+        found = self._keys_sorted[pos] == keys
+
+        return found, self._order[pos]
+
+    def _search_shells(
+            self,
+            pending: np.ndarray,
+            keys: np.ndarray,
+            max_results: int
+        ) -> Tuple[List[np.ndarray], ...]:
+        """Search the query points ``pending`` with voxel ``keys`` on the
+        grid. Return the lists of the rows, indices and squared
+        distances of the neighbours found, and the query points not
+        resolved.
+        """
+        rows, indices, sqr_dists = [], [], []
+
+        # exact matches, the points are unique so there is no tie
+        found, idx = self._lookup(keys)
+        rows.append(pending[found])
+        indices.append(idx[found])
+        sqr_dists.append(np.zeros(found.sum()))
+        pending, keys = pending[~found], keys[~found]
+
+        hit_rate = 1.0
+        for sqr_len, offsets in _shell_offsets(MAX_SQR_RADIUS):
+            if len(pending) == 0 or hit_rate * KD_QUERY_COST < len(offsets):
+                break
+            offset_keys = offsets @ self._strides
+            chunk = max(1, PROBE_CHUNK_SIZE // len(offsets))
+
+            resolved = np.zeros(len(pending), dtype=bool)
+            for start in range(0, len(pending), chunk):
+                sl = slice(start, start + chunk)
+                found, idx = self._lookup(
+                    keys[sl, None] + offset_keys[None, :]
+                )
+                resolved[sl] = found.any(axis=1)
+
+                # keep the first ``max_results`` tied neighbours
+                found &= np.cumsum(found, axis=1) <= max_results
+                r, c = np.nonzero(found)
+                rows.append(pending[sl][r])
+                indices.append(idx[r, c])
+                sqr_dists.append(np.full(len(r), sqr_len, dtype=np.float64))
+
+            hit_rate = resolved.mean()
+            pending, keys = pending[~resolved], keys[~resolved]
+
+        return rows, indices, sqr_dists, pending
+
+    def nearest_neighbours(
+            self,
+            points: np.ndarray,
+            max_results: int,
+            fallback: Callable
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the nearest neighbours of ``points`` in the grid. All the
+        neighbours at the nearest distance are returned (at most
+        ``max_results``), in a compressed sparse row format.
+
+        Parameters
+        ----------
+        points : `np.ndarray`
+            (M, 3) query points with integer coordinates.
+        max_results : `int`
+            Maximum number of tied neighbours of a query point.
+        fallback : `Callable`
+            ``fallback(tree, points)`` searches the query points that
+            are not resolved on the grid with the KD-tree of the grid.
+
+        Returns
+        -------
+        `Tuple[np.ndarray, np.ndarray, np.ndarray]`
+            The number of neighbours of each query point, and the
+            flatten indices and squared distances of the neighbours.
+        """
+        coords = np.asarray(points).astype(np.int64)
+        num_queries = len(coords)
+
+        # query points far outside the bounding box cannot have any
+        # neighbour in the shells
+        inside = np.all((coords >= self._lo) & (coords <= self._hi), axis=1)
+        pending = np.flatnonzero(inside)
+        keys = self._keys(coords[pending])
+        # nearby probes are faster to look up
+        order = np.argsort(keys)
+        pending, keys = pending[order], keys[order]
+
+        # the grid does not pay off if too many query points fall back
+        # to the KD-tree anyway, estimate it on a sample first
+        sample = np.unique(
+            np.linspace(0, len(pending) - 1, min(SAMPLE_SIZE, len(pending)))
+            .astype(int)
+        )
+        *_, left = self._search_shells(
+            pending[sample], keys[sample], max_results
+        )
+        if len(left) > MAX_FALLBACK_RATIO * len(sample):
+            return fallback(self.tree, coords.astype(np.float64))
+
+        rows, indices, sqr_dists, pending = self._search_shells(
+            pending, keys, max_results
+        )
+
+        # the rest with the KD-tree
+        pending = np.union1d(pending, np.flatnonzero(~inside))
+        if len(pending) > 0:
+            counts, idx, dist = fallback(
+                self.tree, coords[pending].astype(np.float64)
+            )
+            rows.append(np.repeat(pending, counts))
+            indices.append(idx)
+            # squared distances between integer points are integers
+            sqr_dists.append(np.round(dist))
+
+        rows = np.concatenate(rows)
+        order = np.argsort(rows, kind='stable')
+
+        return (
+            np.bincount(rows, minlength=num_queries),
+            np.concatenate(indices)[order],
+            np.concatenate(sqr_dists)[order]
+        )
@@ -0,0 +1,137 @@
+import argparse
+import logging
+import logging.config
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from libs.point_cloud import PointCloud
+from utils.processing import parallel
+from utils.cache import DiskCache, get_cache_dir
+from evaluator.metrics.diameter import diameter
+from evaluator.metrics.tiled_distortion import BYTES_PER_POINT
+from utils.file_io import load_cfg, glob_file, file_hash, get_logging_config
+
+logger = logging.getLogger(__name__)
+
+# Name of the resolution cache directory, see ``get_cache_dir()``
+RESOLUTION_CACHE = 'resolution'
+
+def get_resolution(
+        pc_file: Union[str, Path],
+        points: np.ndarray = None,
+        cache_dir: Union[str, Path] = None,
+        memory_limit: int = None
+    ) -> float:
+    """Get the resolution (max NN distance) of the point cloud
+    ``pc_file``. The resolution only depends on the content of the
+    point cloud, so it is cached on disk with the hash of the file and
+    calculated only once for all the algorithms and rates.
+
+    Parameters
+    ----------
+    pc_file : `Union[str, Path]`
+        Input point cloud.
+    points : `np.ndarray`, optional
+        The points of ``pc_file`` if they are already loaded (or 
+        memory-mapped). Only used when the resolution is not cached. 
+        Defaults to None.
+    cache_dir : `Union[str, Path]`, optional
+        The directory of the resolution cache. Defaults to
+        None, ``get_cache_dir(RESOLUTION_CACHE)``.
+    memory_limit : `int`, optional
+        Memory limit in bytes. The points are read chunk by chunk within
+        it, so a memory-mapped point cloud is never loaded as a whole.
+        Defaults to None, unbounded.
+
+    Returns
+    -------
+    `float`
+        Max NN distance of the point cloud.
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir(RESOLUTION_CACHE)
+    cache = DiskCache(cache_dir, suffix='.txt')
+    key = file_hash(pc_file)
+
+    cached = cache.load(key)
+    if cached is not None:
+        return float(cached.decode())
+
+    if points is None:
+        # the vertices of binary PLY files are memory-mapped
+        points = PointCloud(pc_file).points
+    chunk_size = (
+        None if memory_limit is None
+        else max(int(memory_limit) // BYTES_PER_POINT, 1)
+    )
+    resolution = diameter(points, chunk_size=chunk_size)
+    cache.save(key, repr(resolution).encode())
+
+    return resolution
+
+def precompute_resolution(
+        ds_name: str,
+        nbprocesses: int = None,
+        ds_cfg_file: Union[str, Path] = 'cfgs/datasets.yml'
+    ) -> None:
+    """Calculate the resolution of all the reference point clouds
+    (point clouds with normal) in the dataset ``ds_name`` and store
+    them into the resolution cache.
+
+    Parameters
+    ----------
+    ds_name : `str`
+        The name of the dataset (stored in 'cfgs/datasets.yml').
+    nbprocesses : `int`, optional
+        Specify the number of cpu parallel processes. If None, it will
+        equal to the cpu count. Defaults to None.
+    ds_cfg_file : `Union[str, Path]`, optional
+        The YAML config file of datasets. Defaults to
+        'cfgs/datasets.yml'.
+    """
+    ds_cfg = load_cfg(ds_cfg_file)
+
+    pc_files = glob_file(
+        ds_cfg[ds_name]['dataset_w_normal_dir'],
+        ds_cfg[ds_name]['test_pattern'],
+        fullpath=True,
+        verbose=True
+    )
+
+    logger.info(f"Precompute the resolution of {ds_name} dataset.")
+    parallel(get_resolution, pc_files, nbprocesses=nbprocesses)
+
+if __name__ == '__main__':
+    LOGGING_CONFIG = get_logging_config('utils/logging.conf')
+    logging.config.dictConfig(LOGGING_CONFIG)
+
+    parser = argparse.ArgumentParser(
+        description="Precompute the resolution of the reference point "
+                    "clouds in the datasets.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        'ds_names',
+        nargs='+',
+        help="Names of the datasets in ``ds_cfg``."
+    )
+    parser.add_argument(
+        '--ds_cfg',
+        default='cfgs/datasets.yml',
+        help="The YAML config file of datasets."
+    )
+    parser.add_argument(
+        '--nbprocesses',
+        type=int,
+        default=None,
+        help="Number of cpu parallel processes. Use the cpu count if "
+             "not specified."
+    )
+
+    args = parser.parse_args()
+
+    for ds_name in args.ds_names:
+        precompute_resolution(ds_name, args.nbprocesses, args.ds_cfg)
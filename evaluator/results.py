@@ -0,0 +1,109 @@
+import json
+import logging
+from pathlib import Path
+from typing import Union, Optional
+from dataclasses import dataclass, field, fields, asdict
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the machine-readable results saved next to the evaluation
+# log files
+SIDECAR_SUFFIX = '.json'
+
+@dataclass
+class EvaluationResult:
+    """Evaluation results of a target point cloud, named after the
+    columns of the summary csv files. The metrics not evaluated are
+    None.
+    """
+    pc_file: str
+    encT: Optional[float] = None
+    decT: Optional[float] = None
+    bpp: Optional[float] = None
+    y_psnr: Optional[float] = None
+    cb_psnr: Optional[float] = None
+    cr_psnr: Optional[float] = None
+    ssim: Optional[float] = None
+    vmaf: Optional[float] = None
+    acd12_p2pt: Optional[float] = None
+    acd21_p2pt: Optional[float] = None
+    cd_p2pt: Optional[float] = None
+    cdpsnr_p2pt: Optional[float] = None
+    h_p2pt: Optional[float] = None
+    acd12_p2pl: Optional[float] = None
+    acd21_p2pl: Optional[float] = None
+    cd_p2pl: Optional[float] = None
+    cdpsnr_p2pl: Optional[float] = None
+    h_p2pl: Optional[float] = None
+    y_cpsnr: Optional[float] = None
+    u_cpsnr: Optional[float] = None
+    v_cpsnr: Optional[float] = None
+    hybrid: Optional[float] = None
+    # the formatted evaluation results
+    log: str = field(default='', repr=False, compare=False)
+
+    def to_json(self) -> str:
+        """Serialize the results without the formatted log.
+        """
+        ret = asdict(self)
+        del ret['log']
+
+        return json.dumps(ret)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'EvaluationResult':
+        """Load the results serialized by ``to_json()``. Unknown keys
+        are ignored.
+        """
+        names = {f.name for f in fields(cls)}
+        values = json.loads(text)
+
+        return cls(**{k: v for k, v in values.items() if k in names})
+
+def sidecar_path(evl_log: Union[str, Path]) -> Path:
+    """Path of the machine-readable results of ``evl_log``.
+    """
+    return Path(evl_log).with_suffix(SIDECAR_SUFFIX)
+
+def save_result(
+        evl_log: Union[str, Path],
+        result: EvaluationResult
+    ) -> None:
+    """Write the formatted log of ``result`` into ``evl_log``, and the
+    results into its sidecar file.
+
+    Parameters
+    ----------
+    evl_log : `Union[str, Path]`
+        The evaluation log file.
+    result : `EvaluationResult`
+        The evaluation results.
+    """
+    with open(evl_log, 'w') as f:
+        f.write(result.log)
+    sidecar_path(evl_log).write_text(result.to_json())
+
+def load_result(evl_log: Union[str, Path]) -> Optional[EvaluationResult]:
+    """Load the results saved by ``save_result()`` with ``evl_log``.
+
+    Parameters
+    ----------
+    evl_log : `Union[str, Path]`
+        The evaluation log file.
+
+    Returns
+    -------
+    `Optional[EvaluationResult]`
+        The evaluation results, or None if the sidecar file is missing
+        (e.g., logs written by the older versions) or outdated.
+    """
+    sidecar = sidecar_path(evl_log)
+    try:
+        if sidecar.stat().st_mtime_ns < Path(evl_log).stat().st_mtime_ns:
+            return None
+        return EvaluationResult.from_json(sidecar.read_text())
+    except FileNotFoundError:
+        return None
+    except (ValueError, TypeError):
+        logger.warning(f"Failed to load {sidecar}, parse {evl_log} instead.")
+        return None
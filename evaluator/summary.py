@@ -1,25 +1,69 @@
-import re
+import os
 import csv
+import json
 import logging
+import warnings
 import numpy as np
 from pathlib import Path
-from typing import Union
+from multiprocessing import Pool
+from typing import Union, List, Dict, Any, Tuple
 from collections import defaultdict
 
 from scipy.io import savemat
 
 from utils.file_io import glob_file
 from utils._version import __version__
+from evaluator.results import load_result
+from evaluator.warehouse import ResultsWarehouse, RESULTS_DB
 
 logger = logging.getLogger(__name__)
 
-# [TODO]
-# Find a better way handle the log parsing and writing
-# Current version is hard to maintain.
-def summarize_one_setup(log_dir: Union[str, Path], color: bool = False) -> None:
+# Labels of the metrics in the evaluation logs, named after the columns
+# of the summary csv files
+METRIC_LABELS = {
+    'pc_file':     'Target Point Cloud: ',
+    'encT':        'Encoding time (s)           : ',
+    'decT':        'Decoding time (s)           : ',
+    'bpp':         'bpp (bits per point)        : ',
+    'y_psnr':      'Y-PSNR (dB)                    : ',
+    'cb_psnr':     'Cb-PSNR (dB)                   : ',
+    'cr_psnr':     'Cr-PSNR (dB)                   : ',
+    'ssim':        'SSIM                           : ',
+    'vmaf':        'VMAF                           : ',
+    'acd12_p2pt':  'Asym. Chamfer dist. (1->2) p2pt: ',
+    'acd21_p2pt':  'Asym. Chamfer dist. (2->1) p2pt: ',
+    'cd_p2pt':     'Chamfer dist.              p2pt: ',
+    'cdpsnr_p2pt': 'CD-PSNR (dB)               p2pt: ',
+    'h_p2pt':      'Hausdorff distance         p2pt: ',
+    'acd12_p2pl':  'Asym. Chamfer dist. (1->2) p2pl: ',
+    'acd21_p2pl':  'Asym. Chamfer dist. (2->1) p2pl: ',
+    'cd_p2pl':     'Chamfer dist.              p2pl: ',
+    'cdpsnr_p2pl': 'CD-PSNR (dB)               p2pl: ',
+    'h_p2pl':      'Hausdorff distance         p2pl: ',
+    'y_cpsnr':     'Y-CPSNR (dB)                   : ',
+    'u_cpsnr':     'U-CPSNR (dB)                   : ',
+    'v_cpsnr':     'V-CPSNR (dB)                   : ',
+    'hybrid':      'Hybrid geo-color               : ',
+}
+# Metrics summarized only for the datasets with colors
+COLOR_METRICS = ['y_cpsnr', 'u_cpsnr', 'v_cpsnr', 'hybrid']
+# Bump when the parsing of the logs changes to invalidate the manifests
+MANIFEST_VERSION = 1
+# Minimum number of logs to parse with a process pool
+PARALLEL_THRESHOLD = 64
+
+def summarize_one_setup(
+        log_dir: Union[str, Path],
+        color: bool = False,
+        nbprocesses: int = None
+    ) -> None:
     """Summarize the evaluation results for an experimental setup. Store
     raw data into .csv file and summarize the avg., stdev., max., and 
-    min. into .log file.
+    min. into .log file. The results are also upserted into the results
+    database of the experiments directory, see 
+    ``evaluator.warehouse``.
+
+    Only the new or changed logs are parsed, see ``collect_setup()``.
     
     Parameters
     ----------
@@ -27,186 +71,247 @@ def summarize_one_setup(log_dir: Union[str, Path], color: bool = False) -> None:
         The directory of the evaluation log files.
     color : `int`, optional
         True for dataset with color, false otherwise. Defaults to false.
+    nbprocesses : `int`, optional
+        Number of processes parsing the logs if there are many of them.
+        If None, it will equal to the cpu count. Defaults to None.
     """
-    log_files = glob_file(log_dir, '**/*.log', fullpath=True)
-
-    # [TODO] add reconstructed point cloud path to .csv
-    chosen_metrics_text = {
-        'pc_file':     'Target Point Cloud: ',
-        'encT':        'Encoding time (s)           : ',
-        'decT':        'Decoding time (s)           : ',
-        'bpp':         'bpp (bits per point)        : ',
-        'y_psnr':      'Y-PSNR (dB)                    : ',
-        'cb_psnr':     'Cb-PSNR (dB)                   : ',
-        'cr_psnr':     'Cr-PSNR (dB)                   : ',
-        'ssim':        'SSIM                           : ',
-        'vmaf':        'VMAF                           : ',
-        'acd12_p2pt':  'Asym. Chamfer dist. (1->2) p2pt: ',
-        'acd21_p2pt':  'Asym. Chamfer dist. (2->1) p2pt: ',
-        'cd_p2pt':     'Chamfer dist.              p2pt: ',
-        'cdpsnr_p2pt': 'CD-PSNR (dB)               p2pt: ',
-        'h_p2pt':      'Hausdorff distance         p2pt: ',
-        'acd12_p2pl':  'Asym. Chamfer dist. (1->2) p2pl: ',
-        'acd21_p2pl':  'Asym. Chamfer dist. (2->1) p2pl: ',
-        'cd_p2pl':     'Chamfer dist.              p2pl: ',
-        'cdpsnr_p2pl': 'CD-PSNR (dB)               p2pl: ',
-        'h_p2pl':      'Hausdorff distance         p2pl: ',
-    }
-    if color is True:
-        chosen_metrics_text.update({
-            'y_cpsnr':     'Y-CPSNR (dB)                   : ',
-            'u_cpsnr':     'U-CPSNR (dB)                   : ',
-            'v_cpsnr':     'V-CPSNR (dB)                   : ',
-            'hybrid':      'Hybrid geo-color               : ',
-        })
-
-    # escape special characters
-    chosen_metrics = {
-        key: re.escape(pattern) for key, pattern in chosen_metrics_text.items()
-    }
+    log_dir = Path(log_dir)
+    alg_name, ds_name, rate = _setup_names(log_dir)
+    summary_csv = (
+        log_dir.parent.joinpath(f'{alg_name}_{ds_name}_{rate}_summary.csv')
+    )
 
-    found_val = {key: [] for key in chosen_metrics.keys()}
+    results = collect_setup(log_dir, nbprocesses)
 
-    # Parsing data from each log file
-    for log in log_files:
-        with open(log, 'r') as f:
-            flines = f.readlines()
-            for metric, pattern in chosen_metrics.items():
-                isfound = False
-                for line in flines:
-                    m = re.search(f'(?<={pattern}).*', line)
-                    if m:
-                        if m.group() == 'inf':
-                            found_val[metric].append(np.inf)
-                        elif m.group() == 'nan':
-                            found_val[metric].append(np.nan)
-                        else:
-                            if metric == 'pc_file':
-                                found_val[metric].append(str(m.group()))
-                            else:
-                                found_val[metric].append(float(m.group()))
-                        isfound = True
-                        break
-                if not isfound:
-                    # Not found that metric result
-                    found_val[metric].append(None)
+    metrics = [
+        metric for metric in METRIC_LABELS.keys()
+        if color is True or metric not in COLOR_METRICS
+    ]
+    rows = [
+        [values[metric] for metric in metrics]
+        for values in results.values()
+    ]
 
     # Save raw data (with None and np.inf) into .csv file
-    alg_name = Path(log_dir).parents[2].stem
-    ds_name = Path(log_dir).parents[1].stem
-    rate = Path(log_dir).parents[0].stem
-
-    summary_csv = (
-        Path(log_dir).parent
-        .joinpath(f'{alg_name}_{ds_name}_{rate}_summary.csv')
-    )
-    
     with open(summary_csv, 'w') as csvfile:
         csvwriter = csv.writer(csvfile, delimiter=',')
         # write header
-        header = [metric_name for metric_name in chosen_metrics.keys()]
-        csvwriter.writerow(header)
+        csvwriter.writerow(metrics)
         # write results
-        rows = zip(*[list_ for list_ in found_val.values()])
-        for row in rows:
-            csvwriter.writerow(row)
+        csvwriter.writerows(rows)
 
-    # # Summarize the results and save them into the .log file
-    # summary_log = summary_csv.with_suffix('.log')
-    
-    # with open(summary_log, 'w') as f:
-    #     lines = [
-    #         f"PCC-Arena Evaluator {__version__}",
-    #         f"Summary of the log directory: {log_dir}"
-    #         "\n",
-    #     ]
-        
-    #     statistics = {
-    #         'Avg.': np.nanmean,
-    #         'Stdev.': np.nanstd,
-    #         'Max.': np.nanmax,
-    #         'Min.': np.nanmin,
-    #     }
-        
-    #     for stat, op in statistics.items():
-    #         tmp_lines = [f"***** {stat} *****"]
-    #         for key, pattern in chosen_metrics_text.items():
-    #             tmp_nparray = np.array(found_val[key], dtype=np.float)
-    #             tmp_lines.append(f"{stat} {pattern}{op(tmp_nparray)}")
-            
-    #         tmp_lines.insert(1, "========== Time & Binary Size ==========")
-    #         tmp_lines.insert(5, "\n")
-    #         tmp_lines.insert(6, "========== Objective Quality ===========")
-    #         tmp_lines.insert(12, "----------------------------------------")
-    #         tmp_lines.insert(18, "----------------------------------------")
-    #         if color is True:
-    #             tmp_lines.insert(18, "----------------------------------------")
-    #             tmp_lines.insert(22, "\n")
-    #             tmp_lines.insert(23, "============== QoE Metric ==============")
-    #             tmp_lines.insert(25, "\n")
-            
-    #         tmp_lines.append("\n")
-    #         lines += tmp_lines
-
-    #     f.writelines('\n'.join(lines))
-
-    return
-
-def summarize_all_to_csv(exp_dir):
-    # [TODO] add reconstructed point cloud path to .csv
-    # Unfinished
-    exp_results = sorted(
-        glob_file(exp_dir, '*_summary.csv', fullpath=True)
+    # Summarize the results and save them into the .log file
+    _write_statistics(
+        summary_csv.with_suffix('.log'), log_dir, metrics[1:], 
+        [row[1:] for row in rows]
     )
-    csvfile = Path(exp_dir).joinpath('summary.csv')
-    
-    chosen_metrics = [
-        'pc_file',
-        'encT',
-        'decT',
-        'bpp',
-        'y_psnr',
-        'cb_psnr',
-        'cr_psnr',
-        'ssim',
-        'vmaf',
-        'acd12_p2pt',
-        'acd21_p2pt',
-        'cd_p2pt',
-        'cdpsnr_p2pt',
-        'h_p2pt',
-        'acd12_p2pl',
-        'acd21_p2pl',
-        'cd_p2pl',
-        'cdpsnr_p2pl',
-        'h_p2pl',
-        'y_cpsnr',
-        'u_cpsnr',
-        'v_cpsnr',
-        'hybrid'
+
+    # the experiments directory is '{exp_dir}/{alg}/{dataset}/{rate}/evl'
+    with ResultsWarehouse(log_dir.resolve().parents[3].joinpath(RESULTS_DB)) as wh:
+        wh.replace_setup(
+            alg_name, ds_name, rate,
+            [{'file': key, **values} for key, values in results.items()]
+        )
+
+def collect_setup(
+        log_dir: Union[str, Path],
+        nbprocesses: int = None
+    ) -> Dict[str, Dict[str, Any]]:
+    """Collect the evaluation results of an experimental setup. The 
+    parsed results of each log are recorded in a manifest with the 
+    modification time and the size of the log, so only the new or 
+    changed logs are parsed when the setup is collected again.
+
+    Parameters
+    ----------
+    log_dir : `Union[str, Path]`
+        The directory of the evaluation log files.
+    nbprocesses : `int`, optional
+        Number of processes parsing the logs if there are many of them.
+        If None, it will equal to the cpu count. Defaults to None.
+
+    Returns
+    -------
+    `Dict[str, Dict[str, Any]]`
+        The results of each log, keyed by the path of the log relative 
+        to ``log_dir`` without the suffix.
+    """
+    log_dir = Path(log_dir)
+    log_files = sorted(glob_file(log_dir, '**/*.log', fullpath=True))
+
+    alg_name, ds_name, rate = _setup_names(log_dir)
+    manifest_file = log_dir.parent.joinpath(
+        f'{alg_name}_{ds_name}_{rate}_manifest.json'
+    )
+
+    # reuse the results of the logs not changed since the last summary
+    manifest = _load_manifest(manifest_file)
+    entries, outdated = {}, []
+    for log in log_files:
+        key = str(log.relative_to(log_dir.resolve()))
+        stat = log.stat()
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = manifest.get(key)
+        if entry is not None and entry['stat'] == signature:
+            entries[key] = entry
+        else:
+            entries[key] = {'stat': signature}
+            outdated.append(key)
+
+    logger.info(
+        f"Summarize {len(log_files)} logs in {log_dir}, "
+        f"{len(outdated)} of them are new or changed."
+    )
+    logs = [log_dir.joinpath(key) for key in outdated]
+    if len(logs) >= PARALLEL_THRESHOLD:
+        with Pool(nbprocesses) as pool:
+            values = pool.map(_parse_log, logs, chunksize=16)
+    else:
+        values = [_parse_log(log) for log in logs]
+    for key, val in zip(outdated, values):
+        entries[key]['values'] = val
+
+    _save_manifest(manifest_file, entries)
+
+    return {
+        str(Path(key).with_suffix('')): entry['values']
+        for key, entry in entries.items()
+    }
+
+def _setup_names(log_dir: Path) -> Tuple[str, str, str]:
+    """Names of the algorithm, the dataset and the rate of the log 
+    directory '{exp_dir}/{alg}/{dataset}/{rate}/evl'.
+    """
+    return (
+        log_dir.parents[2].stem, log_dir.parents[1].stem, 
+        log_dir.parents[0].stem
+    )
+
+def _parse_log(log: Path) -> Dict[str, Any]:
+    """Load the results of ``log`` from its sidecar file, or parse the
+    log if there is none. Metrics not found are None.
+    """
+    result = load_result(log)
+    if result is not None:
+        return {metric: getattr(result, metric) for metric in METRIC_LABELS}
+
+    found_val = dict.fromkeys(METRIC_LABELS.keys())
+    with open(log, 'r') as f:
+        for line in f:
+            for metric, label in METRIC_LABELS.items():
+                if found_val[metric] is None and label in line:
+                    val = line.split(label, 1)[1].rstrip('\n')
+                    found_val[metric] = (
+                        val if metric == 'pc_file' else float(val)
+                    )
+                    break
+
+    return found_val
+
+def _load_manifest(manifest_file: Path) -> Dict[str, dict]:
+    """Load the entries of the manifest, or none if it is missing or 
+    outdated.
+    """
+    try:
+        manifest = json.loads(manifest_file.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+
+    return manifest['entries']
+
+def _save_manifest(manifest_file: Path, entries: Dict[str, dict]) -> None:
+    tmp_file = manifest_file.with_name(
+        f'.{manifest_file.name}.{os.getpid()}.tmp'
+    )
+    tmp_file.write_text(
+        json.dumps({'version': MANIFEST_VERSION, 'entries': entries})
+    )
+    os.replace(tmp_file, manifest_file)
+
+def _write_statistics(
+        summary_log: Path,
+        log_dir: Path,
+        metrics: List[str],
+        rows: List[list]
+    ) -> None:
+    """Write the avg., stdev., max., and min. of each metric over the
+    logs (ignoring the missing values) into ``summary_log``.
+    """
+    values = np.array(
+        [[np.nan if v is None else v for v in row] for row in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(metrics))
+
+    statistics = {
+        'Avg.': np.nanmean,
+        'Stdev.': np.nanstd,
+        'Max.': np.nanmax,
+        'Min.': np.nanmin,
+    }
+
+    lines = [
+        f"PCC-Arena Evaluator {__version__}",
+        f"Summary of the log directory: {log_dir}",
+        f"Number of evaluation logs: {len(rows)}",
+        "\n",
     ]
+    with warnings.catch_warnings():
+        # metrics not evaluated in any log are nan
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for stat, op in statistics.items():
+            results = op(values, axis=0) if len(rows) > 0 else (
+                np.full(len(metrics), np.nan)
+            )
+            lines.append(f"***** {stat} *****")
+            lines += [
+                f"{stat} {METRIC_LABELS[metric]}{val}"
+                for metric, val in zip(metrics, results)
+            ]
+            lines.append("\n")
 
-    with open(csvfile, 'w') as csvfile:
-        csvwriter = csv.writer(csvfile, delimiter=',')
-        header = [
-            'algs',
-            'datasets',
-            'rate',
-        ]
-        header += chosen_metrics
-        csvwriter.writerow(header)
-        
-        for log in exp_results:
-            alg_name = Path(log).parents[2].stem
-            ds_name = Path(log).parents[1].stem
-            rate = Path(log).parents[0].stem
-            
-            with open(log, 'r') as f:
-                row = [alg_name, ds_name, rate]
-                f_csv = csv.reader(f, delimiter=',')
-                for idx, line in enumerate(f_csv):
-                    if idx == 0:
-                        # skip the header in the *_summary.csv file
-                        pass
-                    else:
-                        csvwriter.writerow(row + line)
\ No newline at end of file
+    with open(summary_log, 'w') as f:
+        f.write('\n'.join(lines))
+
+def ingest_experiments(
+        exp_dir: Union[str, Path],
+        nbprocesses: int = None
+    ) -> None:
+    """Upsert the evaluation results of all the experimental setups in
+    ``exp_dir`` into its results database. Only the new or changed logs
+    are parsed.
+
+    Parameters
+    ----------
+    exp_dir : `Union[str, Path]`
+        The directory of experiments results.
+    nbprocesses : `int`, optional
+        Number of processes parsing the logs if there are many of them.
+        If None, it will equal to the cpu count. Defaults to None.
+    """
+    exp_dir = Path(exp_dir)
+    with ResultsWarehouse(exp_dir.joinpath(RESULTS_DB)) as wh:
+        for log_dir in sorted(exp_dir.glob('*/*/*/evl')):
+            if not any(log_dir.rglob('*.log')):
+                continue
+            results = collect_setup(log_dir, nbprocesses)
+            wh.replace_setup(
+                *_setup_names(log_dir),
+                [{'file': key, **values} for key, values in results.items()]
+            )
+
+def summarize_all_to_csv(exp_dir: Union[str, Path]) -> None:
+    """Export the evaluation results of all the experimental setups in
+    ``exp_dir`` into '{exp_dir}/summary.csv', with the algorithm, the 
+    dataset and the rate of each result.
+
+    Parameters
+    ----------
+    exp_dir : `Union[str, Path]`
+        The directory of experiments results.
+    """
+    ingest_experiments(exp_dir)
+
+    with ResultsWarehouse(Path(exp_dir).joinpath(RESULTS_DB)) as wh:
+        wh.export_csv(Path(exp_dir).joinpath('summary.csv'))
@@ -0,0 +1,133 @@
+import io
+import hashlib
+import logging
+from pathlib import Path
+from typing import Union, List, Tuple
+
+import numpy as np
+
+from libs.point_cloud import PointCloud
+from utils.file_io import file_hash
+from utils.cache import DiskCache, get_cache_dir
+from evaluator.metrics.renderer import POINT_SIZE, View, get_views, render
+
+logger = logging.getLogger(__name__)
+
+# Name of the view cache directory, see ``get_cache_dir()``
+VIEW_CACHE = 'views'
+# Maximum total size of the view cache in bytes
+VIEW_CACHE_MAX_SIZE = 4 * (1 << 30)
+# Bump when the output of ``evaluator.metrics.renderer`` changes to
+# invalidate the cached views
+VIEW_VERSION = 1
+
+def get_reference_views(
+        ref_pc: Union[str, Path, PointCloud],
+        view_rotations: np.ndarray,
+        width: int,
+        height: int,
+        background: np.ndarray,
+        point_color: np.ndarray,
+        point_size: int = POINT_SIZE,
+        cache_dir: Union[str, Path] = None,
+        max_size: int = VIEW_CACHE_MAX_SIZE
+    ) -> Tuple[List[View], List[np.ndarray]]:
+    """Get the projected views of the reference point cloud ``ref_pc``.
+    The views of a reference are the same for all the targets, so they
+    are rendered once, saved as compressed arrays into an on-disk cache
+    keyed by the hash of the file and the view parameters, and loaded by
+    the later evaluations.
+
+    Parameters
+    ----------
+    ref_pc : `Union[str, Path, PointCloud]`
+        The reference point cloud.
+    view_rotations : `np.ndarray`
+        (V, 3) rotations of the views about the x, y and z axes.
+    width : `int`
+        Width of the images.
+    height : `int`
+        Height of the images.
+    background : `np.ndarray`
+        (3,) RGB background color in [0, 255].
+    point_color : `np.ndarray`
+        (3,) RGB color in [0, 255] of the points if ``ref_pc`` does not
+        have colors.
+    point_size : `int`, optional
+        Side length of the splats in pixels. Defaults to
+        ``POINT_SIZE``.
+    cache_dir : `Union[str, Path]`, optional
+        The directory of the view cache. Defaults to
+        None, ``get_cache_dir(VIEW_CACHE)``.
+    max_size : `int`, optional
+        The maximum total size of the view cache in bytes. The least
+        recently used views are evicted. Defaults to
+        ``VIEW_CACHE_MAX_SIZE``.
+
+    Returns
+    -------
+    `Tuple[List[View], List[np.ndarray]]`
+        The V views, with which the targets are rendered, and the
+        (height, width, 3) RGB images of ``ref_pc``.
+    """
+    ref_pc = PointCloud.wrap(ref_pc)
+    view_rotations = np.asarray(view_rotations, dtype=np.float64)
+    background = np.asarray(background, dtype=np.uint8)
+    colors = ref_pc.colors if ref_pc.has_colors() else (
+        np.asarray(point_color, dtype=np.uint8)
+    )
+
+    params = hashlib.sha1()
+    params.update(view_rotations.tobytes())
+    params.update(np.array([width, height, point_size]).tobytes())
+    params.update(background.tobytes())
+    if colors.ndim == 1:
+        params.update(colors.tobytes())
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir(VIEW_CACHE)
+    cache = DiskCache(cache_dir, suffix='.npz', max_size=max_size)
+    key = (
+        f'{file_hash(ref_pc.path)}-v{VIEW_VERSION}'
+        f'-{params.hexdigest()[:16]}'
+    )
+
+    cached = cache.load(key)
+    if cached is not None:
+        try:
+            with np.load(io.BytesIO(cached)) as f:
+                views = [
+                    View(rotation, center, origin, float(scale))
+                    for rotation, center, origin, scale in zip(
+                        f['rotations'], f['centers'], f['origins'],
+                        f['scales']
+                    )
+                ]
+                return views, list(f['images'])
+        except Exception:
+            logger.warning(
+                f"Failed to load the cached views of {ref_pc.path}, "
+                f"render them again."
+            )
+
+    views = get_views(ref_pc.points, width, height, view_rotations)
+    images = [
+        render(
+            ref_pc.points, colors, view, width, height, background,
+            point_size
+        )
+        for view in views
+    ]
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        images=np.stack(images),
+        rotations=np.stack([view.rotation for view in views]),
+        centers=np.stack([view.center for view in views]),
+        origins=np.stack([view.origin for view in views]),
+        scales=np.array([view.scale for view in views]),
+    )
+    cache.save(key, buf.getvalue())
+
+    return views, images
@@ -0,0 +1,228 @@
+import csv
+import sqlite3
+import logging
+from pathlib import Path
+from dataclasses import fields
+from typing import Union, List, Dict, Any, Iterable
+
+from evaluator.results import EvaluationResult
+
+logger = logging.getLogger(__name__)
+
+# File name of the results database in the experiments directory
+RESULTS_DB = 'results.sqlite'
+# Columns identifying a result: the algorithm, the dataset, the rate,
+# and the file (the path of the evaluation log relative to the ``evl``
+# directory, without the suffix)
+KEY_COLUMNS = ['algorithm', 'dataset', 'rate', 'file']
+# Columns of the results, same as the summary csv files
+RESULT_COLUMNS = [
+    f.name for f in fields(EvaluationResult) if f.name != 'log'
+]
+# Columns of the setup in the exported csv file, named as in the
+# summary csv files of the previous versions
+CSV_KEY_COLUMNS = ['algs', 'datasets', 'rate']
+# Seconds to wait for the other processes writing the database
+TIMEOUT = 60.0
+
+class ResultsWarehouse():
+    """The evaluation results of all the experiments in a SQLite
+    database, indexed by (algorithm, dataset, rate, file) for the
+    queries across algorithms, datasets and rates.
+    """
+    def __init__(self, db_file: Union[str, Path]) -> None:
+        """
+        Parameters
+        ----------
+        db_file : `Union[str, Path]`
+            The database file. Created if not exists.
+        """
+        self._db_file = Path(db_file)
+        self._conn = sqlite3.connect(str(self._db_file), timeout=TIMEOUT)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_tables()
+
+    def __enter__(self) -> 'ResultsWarehouse':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _create_tables(self) -> None:
+        metrics = ', '.join(
+            f'{col} TEXT' if col == 'pc_file' else f'{col} REAL'
+            for col in RESULT_COLUMNS
+        )
+        with self._conn:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS results ('
+                f'algorithm TEXT NOT NULL, dataset TEXT NOT NULL, '
+                f'rate TEXT NOT NULL, file TEXT NOT NULL, {metrics}, '
+                f'PRIMARY KEY (algorithm, dataset, rate, file))'
+            )
+            # comparisons across the algorithms on a dataset
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS results_dataset '
+                'ON results (dataset, rate, algorithm)'
+            )
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert the results, or update them if they exist, in a
+        single transaction.
+
+        Parameters
+        ----------
+        rows : `Iterable[Dict[str, Any]]`
+            Each result with the ``KEY_COLUMNS`` and the
+            ``RESULT_COLUMNS``. Missing metrics are NULL.
+
+        Returns
+        -------
+        `int`
+            Number of the upserted results.
+        """
+        columns = KEY_COLUMNS + RESULT_COLUMNS
+        updates = ', '.join(f'{col}=excluded.{col}' for col in RESULT_COLUMNS)
+        sql = (
+            f'INSERT INTO results ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET {updates}'
+        )
+        values = [[row.get(col) for col in columns] for row in rows]
+        with self._conn:
+            self._conn.executemany(sql, values)
+
+        return len(values)
+
+    def replace_setup(
+            self,
+            algorithm: str,
+            dataset: str,
+            rate: str,
+            rows: List[Dict[str, Any]]
+        ) -> None:
+        """Upsert the results of an experimental setup, and delete its
+        results not in ``rows`` (e.g., of the removed logs).
+
+        Parameters
+        ----------
+        algorithm : `str`
+            Name of the algorithm.
+        dataset : `str`
+            Name of the dataset.
+        rate : `str`
+            Tag of the rate control set.
+        rows : `List[Dict[str, Any]]`
+            Each result with the ``file`` column and the
+            ``RESULT_COLUMNS``.
+        """
+        setup = {'algorithm': algorithm, 'dataset': dataset, 'rate': rate}
+        self.upsert({**row, **setup} for row in rows)
+
+        files = [row['file'] for row in rows]
+        with self._conn:
+            self._conn.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS kept (file TEXT)'
+            )
+            self._conn.execute('DELETE FROM kept')
+            self._conn.executemany(
+                'INSERT INTO kept VALUES (?)', [(f,) for f in files]
+            )
+            self._conn.execute(
+                'DELETE FROM results WHERE algorithm=? AND dataset=? '
+                'AND rate=? AND file NOT IN (SELECT file FROM kept)',
+                (algorithm, dataset, rate)
+            )
+
+    def aggregate(
+            self,
+            metric: str,
+            algorithm: str = None,
+            dataset: str = None,
+            rate: str = None
+        ) -> List[tuple]:
+        """Aggregate ``metric`` over the files of each (algorithm,
+        dataset, rate).
+
+        Parameters
+        ----------
+        metric : `str`
+            The metric, one of the ``RESULT_COLUMNS``.
+        algorithm : `str`, optional
+            Only the results of this algorithm. Defaults to None, all.
+        dataset : `str`, optional
+            Only the results on this dataset. Defaults to None, all.
+        rate : `str`, optional
+            Only the results of this rate. Defaults to None, all.
+
+        Returns
+        -------
+        `List[tuple]`
+            (algorithm, dataset, rate, count, avg., min., max.) of each
+            group. NULL metrics are ignored.
+        """
+        self._check_metric(metric)
+        filters = {'algorithm': algorithm, 'dataset': dataset, 'rate': rate}
+        filters = {col: val for col, val in filters.items() if val}
+        where = ' AND '.join(f'{col}=?' for col in filters) or '1'
+
+        return self._conn.execute(
+            f'SELECT algorithm, dataset, rate, COUNT({metric}), '
+            f'AVG({metric}), MIN({metric}), MAX({metric}) FROM results '
+            f'WHERE {where} GROUP BY algorithm, dataset, rate '
+            f'ORDER BY algorithm, dataset, rate',
+            list(filters.values())
+        ).fetchall()
+
+    def compare(self, dataset: str, metrics: List[str]) -> List[tuple]:
+        """Compare the algorithms on ``dataset`` by the average
+        ``metrics`` of each rate.
+
+        Parameters
+        ----------
+        dataset : `str`
+            Name of the dataset.
+        metrics : `List[str]`
+            The metrics, e.g., ['bpp', 'cdpsnr_p2pt'] for rate-distortion
+            curves.
+
+        Returns
+        -------
+        `List[tuple]`
+            (algorithm, rate, number of files, avg. of each metric) of
+            each algorithm and rate.
+        """
+        for metric in metrics:
+            self._check_metric(metric)
+        averages = ', '.join(f'AVG({metric})' for metric in metrics)
+
+        return self._conn.execute(
+            f'SELECT algorithm, rate, COUNT(*), {averages} FROM results '
+            f'WHERE dataset=? GROUP BY algorithm, rate '
+            f'ORDER BY algorithm, rate',
+            (dataset,)
+        ).fetchall()
+
+    def export_csv(self, csv_file: Union[str, Path]) -> None:
+        """Export all the results into ``csv_file``, with the
+        ``CSV_KEY_COLUMNS`` and the ``RESULT_COLUMNS``.
+        """
+        cursor = self._conn.execute(
+            f'SELECT {", ".join(KEY_COLUMNS[:3] + RESULT_COLUMNS)} '
+            f'FROM results ORDER BY algorithm, dataset, rate, file'
+        )
+        with open(csv_file, 'w') as f:
+            csvwriter = csv.writer(f, delimiter=',')
+            csvwriter.writerow(CSV_KEY_COLUMNS + RESULT_COLUMNS)
+            csvwriter.writerows(cursor)
+
+    def _check_metric(self, metric: str) -> None:
+        # metric names are formatted into the queries
+        if metric not in RESULT_COLUMNS:
+            logger.error(
+                f"Unknown metric: {metric}. Use one of {RESULT_COLUMNS}."
+            )
+            raise ValueError
@@ -1,24 +1,53 @@
 import abc
 from pathlib import Path
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Dict, Any
 
-import open3d as o3d
+from libs.point_cloud import PointCloud
 
 class MetricBase(metaclass=abc.ABCMeta):
     """Base class of metrics.
     """
+    # Name of the metric family in the metric cache
+    NAME = None
+    # Version of the metric family. Bump it whenever the results change,
+    # so the cached results of the older versions are recomputed.
+    VERSION = 1
+
     def __init__(
             self,
-            ref_pc: Union[str, Path],
-            target_pc: Union[str, Path]
+            ref_pc: Union[str, Path, PointCloud],
+            target_pc: Union[str, Path, PointCloud]
         ) -> None:
-        self._ref_pc = ref_pc
-        self._target_pc = target_pc
-        self._has_color = o3d.io.read_point_cloud(str(self._ref_pc)).has_colors()
-        self._has_normal = o3d.io.read_point_cloud(str(self._ref_pc)).has_normals()
+        self._ref_pc = PointCloud.wrap(ref_pc)
+        self._target_pc = PointCloud.wrap(target_pc)
+        self._has_color = self._ref_pc.has_colors()
+        self._has_normal = self._ref_pc.has_normals()
         self._results = []
+        # the evaluated metrics named after the fields of
+        # ``evaluator.results.EvaluationResult``
+        self._values = {}
         self._resolution = None
     
     @abc.abstractmethod
     def evaluate(self) -> str:
-        return NotImplemented
\ No newline at end of file
+        return NotImplemented
+
+    def options(self) -> Dict[str, Any]:
+        """The options changing the results of ``evaluate()``, which are
+        a part of the key in the metric cache. JSON serializable.
+        """
+        return {}
+
+    @property
+    def ref_pc(self) -> PointCloud:
+        return self._ref_pc
+
+    @property
+    def target_pc(self) -> PointCloud:
+        return self._target_pc
+
+    @property
+    def values(self) -> Dict[str, float]:
+        """The values of the metrics logged by ``evaluate()``.
+        """
+        return self._values
@@ -0,0 +1,137 @@
+from pathlib import Path
+from functools import cached_property
+from typing import Union, Optional
+
+import numpy as np
+import open3d as o3d
+
+from utils.file_io import PlyHeader, read_ply_header
+from utils.ply import read_ply, get_fields
+
+class PointCloud():
+    """A handle of a point cloud file. The file is read on the first
+    access of its content and kept in memory, so the evaluator and all
+    the metrics can share one handle without parsing the file again.
+    The point count and the available attributes of PLY files are taken
+    from the header, without reading the point data, and the point data
+    of PLY files is memory-mapped with its dtypes in the file.
+    """
+    def __init__(self, path: Union[str, Path]) -> None:
+        """
+        Parameters
+        ----------
+        path : `Union[str, Path]`
+            Full path of the point cloud file.
+        """
+        self.path = Path(path)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}('{self.path}')"
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+    @classmethod
+    def wrap(cls, pc: Union[str, Path, 'PointCloud']) -> 'PointCloud':
+        """Return ``pc`` if it is already a handle, otherwise create a
+        new handle of the file ``pc``.
+        """
+        if isinstance(pc, cls):
+            return pc
+        return cls(pc)
+
+    @cached_property
+    def header(self) -> Optional[PlyHeader]:
+        """The PLY header, or None if the file is not a PLY file.
+        """
+        if self.path.suffix.lower() != '.ply':
+            return None
+        return read_ply_header(self.path)
+
+    @cached_property
+    def vertices(self) -> Optional[np.ndarray]:
+        """(N,) structured array of the vertices of a PLY file (memory-
+        mapped if binary), or None if the file is not a PLY file.
+        """
+        if self.header is None:
+            return None
+        return read_ply(self.path)
+
+    @cached_property
+    def o3d_pc(self) -> o3d.geometry.PointCloud:
+        """The point cloud read by open3d. Only used for the files that
+        are not PLY files.
+        """
+        return o3d.io.read_point_cloud(str(self.path))
+
+    @cached_property
+    def points(self) -> np.ndarray:
+        """(N, 3) point coordinates.
+        """
+        if self.vertices is not None:
+            return get_fields(self.vertices, ['x', 'y', 'z'])
+        return np.asarray(self.o3d_pc.points)
+
+    @cached_property
+    def colors(self) -> Optional[np.ndarray]:
+        """(N, 3) RGB colors in [0, 255], or None if the point cloud does
+        not have colors.
+        """
+        if self.vertices is not None:
+            if not self.header.has_colors:
+                return None
+            colors = get_fields(self.vertices, ['red', 'green', 'blue'])
+            return colors.astype(np.uint8, copy=False)
+        if not self.o3d_pc.has_colors():
+            return None
+        return np.round(np.asarray(self.o3d_pc.colors) * 255).astype(np.uint8)
+
+    @cached_property
+    def normals(self) -> Optional[np.ndarray]:
+        """(N, 3) normals, or None if the point cloud does not have
+        normals.
+        """
+        if self.vertices is not None:
+            if not self.header.has_normals:
+                return None
+            return get_fields(self.vertices, ['nx', 'ny', 'nz'])
+        if not self.o3d_pc.has_normals():
+            return None
+        return np.asarray(self.o3d_pc.normals)
+
+    @property
+    def num_points(self) -> int:
+        """Number of points.
+        """
+        if self.header is not None:
+            return self.header.num_points
+        return len(self.points)
+
+    def to_o3d(self) -> o3d.geometry.PointCloud:
+        """Create a new open3d point cloud with colors in [0, 1].
+        """
+        pc = o3d.geometry.PointCloud()
+        pc.points = o3d.utility.Vector3dVector(
+            np.asarray(self.points, dtype=np.float64)
+        )
+        if self.colors is not None:
+            pc.colors = o3d.utility.Vector3dVector(self.colors / 255.0)
+        if self.normals is not None:
+            pc.normals = o3d.utility.Vector3dVector(
+                np.asarray(self.normals, dtype=np.float64)
+            )
+        
+        return pc
+
+    def has_colors(self) -> bool:
+        if self.header is not None:
+            return self.header.has_colors
+        return self.colors is not None
+
+    def has_normals(self) -> bool:
+        if self.header is not None:
+            return self.header.has_normals
+        return self.normals is not None
@@ -0,0 +1,98 @@
+import argparse
+import logging.config
+from pathlib import Path
+
+from utils.file_io import get_logging_config
+from evaluator.summary import ingest_experiments
+from evaluator.warehouse import ResultsWarehouse, RESULTS_DB
+
+def print_table(header, rows):
+    rows = [[str(v) for v in row] for row in rows]
+    widths = [
+        max([len(h)] + [len(row[i]) for row in rows])
+        for i, h in enumerate(header)
+    ]
+    for row in [header] + rows:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
+
+def query_results(args):
+    if args.command == 'ingest':
+        ingest_experiments(args.exp_dir, args.nbprocesses)
+        return
+
+    with ResultsWarehouse(Path(args.exp_dir).joinpath(RESULTS_DB)) as wh:
+        if args.command == 'aggregate':
+            print_table(
+                ['algorithm', 'dataset', 'rate', 'count', 'avg', 'min',
+                 'max'],
+                wh.aggregate(
+                    args.metric, args.algorithm, args.dataset, args.rate
+                )
+            )
+        elif args.command == 'compare':
+            print_table(
+                ['algorithm', 'rate', 'files'] + args.metrics,
+                wh.compare(args.dataset, args.metrics)
+            )
+        elif args.command == 'export':
+            wh.export_csv(args.csv_file)
+
+if __name__ == '__main__':
+    LOGGING_CONFIG = get_logging_config('utils/logging.conf')
+    logging.config.dictConfig(LOGGING_CONFIG)
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(
+        description="Query the evaluation results of the experiments "
+                    "from the results database.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        'exp_dir',
+        help="The directory of experiments results."
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser(
+        'ingest',
+        help="Upsert the new or changed evaluation logs into the "
+             "database."
+    )
+    ingest.add_argument(
+        '--nbprocesses',
+        type=int,
+        default=None,
+        help="Number of processes parsing the logs. If not specified, it "
+             "equals to the cpu count."
+    )
+
+    aggregate = subparsers.add_parser(
+        'aggregate',
+        help="Count, average, minimum and maximum of a metric for each "
+             "algorithm, dataset and rate."
+    )
+    aggregate.add_argument('metric', help="The metric, e.g., cdpsnr_p2pt.")
+    aggregate.add_argument('--algorithm', help="Filter by algorithm.")
+    aggregate.add_argument('--dataset', help="Filter by dataset.")
+    aggregate.add_argument('--rate', help="Filter by rate, e.g., r1.")
+
+    compare = subparsers.add_parser(
+        'compare',
+        help="Average metrics of each algorithm and rate on a dataset."
+    )
+    compare.add_argument('dataset', help="The dataset.")
+    compare.add_argument(
+        'metrics',
+        nargs='+',
+        help="The metrics, e.g., bpp cdpsnr_p2pt."
+    )
+
+    export = subparsers.add_parser(
+        'export',
+        help="Export all the results into a csv file."
+    )
+    export.add_argument('csv_file', help="The output csv file.")
+
+    args = parser.parse_args()
+
+    query_results(args)
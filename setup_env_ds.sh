@@ -1,13 +1,6 @@
 #! /bin/bash
 set -euo pipefail
 
-# check mpeg-pcc-dmetric-master.tar.gz exists
-if [ ! -f evaluator/dependencies/mpeg-pcc-dmetric-master.tar.gz ]; then
-    echo "[File not found] evaluator/dependencies/mpeg-pcc-dmetric-master.tar.gz"
-    echo "Please download it from http://mpegx.int-evry.fr/software/MPEG/PCC/mpeg-pcc-dmetric"
-    exit 0
-fi
-
 # Cleaning conda environments 
 conda env remove -n GeoCNNv1
 conda env remove -n GeoCNNv2
@@ -61,22 +54,19 @@ cd ..
 cd evaluator/dependencies
 # ========== In [root]/evaluator/dependencies ==========
 
-# MPEG pcc dmetric
-# Download mpeg-pcc-dmetric-master.tar.gz v0.13.5 
+# MPEG pcc dmetric (optional)
+# The metrics are computed in-process, pc_error is only built to 
+# cross-check them. Download mpeg-pcc-dmetric-master.tar.gz v0.13.5 
 # from http://mpegx.int-evry.fr/software/MPEG/PCC/mpeg-pcc-dmetric
-tar zxvf mpeg-pcc-dmetric-master.tar.gz
-patch -sp0 < mpeg-pcc-dmetric.patch
-cd mpeg-pcc-dmetric-master
-./build.sh
-cd ..
+if [ -f mpeg-pcc-dmetric-master.tar.gz ]; then
+    tar zxvf mpeg-pcc-dmetric-master.tar.gz
+    patch -sp0 < mpeg-pcc-dmetric.patch
+    cd mpeg-pcc-dmetric-master
+    ./build.sh
+    cd ..
+fi
 
-# libgdiam
-wget https://sarielhp.org/research/papers/00/diameter/libgdiam-1.0.3.tar.gz
-tar zxvf libgdiam-1.0.3.tar.gz
-patch -sp0 < libgdiam-1.0.3.patch
-cd libgdiam-1.0.3
-mkdir build && cd build && cmake .. && make
-cd ../../../..
+cd ../..
 
 # ========== In [root] ==========
 mv checkpoints/ algorithms/PCGCv1/
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from algs_wrapper.base import Base
+from utils.cache import CACHE_ROOTDIR_ENV
+
+def write_ply(filename, num_points, seed=0, normals=False):
+    """Write a random binary PLY point cloud with colors, and normals
+    if ``normals``.
+    """
+    rng = np.random.default_rng(seed)
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if normals:
+        fields += [('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4')]
+    fields += [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
+    vertex = np.empty(num_points, dtype=fields)
+    for axis in 'xyz':
+        vertex[axis] = rng.random(num_points) * 100
+    if normals:
+        for axis in ('nx', 'ny', 'nz'):
+            vertex[axis] = rng.standard_normal(num_points)
+    for channel in ('red', 'green', 'blue'):
+        vertex[channel] = rng.integers(0, 256, num_points)
+
+    properties = ''.join(
+        f"property {'float' if dtype == '<f4' else 'uchar'} {name}\n"
+        for name, dtype in fields
+    )
+    header = (
+        'ply\nformat binary_little_endian 1.0\n'
+        f'element vertex {num_points}\n{properties}end_header\n'
+    )
+    with open(filename, 'wb') as f:
+        f.write(header.encode())
+        f.write(vertex.tobytes())
+
+class CopyCodec(Base):
+    """A lossless codec copying the point clouds, failing on the files
+    in ``fail``.
+    """
+    def __init__(self, rootdir):
+        # without ``cfgs/algs/CopyCodec.yml``
+        self._algs_cfg = {
+            'rootdir': str(rootdir), 'bin_suffix': '.bin', 'use_gpu': False,
+            'r1': {}, 'r2': {},
+        }
+        self._use_gpu = False
+        self._failure_cnt = 0
+        self.debug = False
+        self.defer_evaluation = False
+        self.memory_limit = None
+        self.projection = None
+        self.resume = True
+        self.pipelined = False
+        self.fail = set()
+        self.rate = 'r1'
+
+    def make_encode_cmd(self, in_pcfile, bin_file):
+        if Path(in_pcfile).name in self.fail:
+            return ['false']
+        return ['cp', in_pcfile, bin_file]
+
+    def make_decode_cmd(self, bin_file, out_pcfile):
+        return ['cp', bin_file, out_pcfile]
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    """Empty on-disk caches for each test, shared with its workers, so
+    the evaluations are never loaded from the previous runs.
+    """
+    cache_root = tmp_path.joinpath('cache')
+    monkeypatch.setenv(CACHE_ROOTDIR_ENV, str(cache_root))
+    return cache_root
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A dataset of three point clouds and its config file.
+    """
+    src_dir = tmp_path.joinpath('src')
+    src_dir.mkdir()
+    for i, name in enumerate(['a', 'b', 'c']):
+        write_ply(src_dir.joinpath(f'{name}.ply'), 500 * (i + 1), seed=i)
+
+    ds_cfg_file = tmp_path.joinpath('datasets.yml')
+    ds_cfg_file.write_text(
+        'Test:\n'
+        f'  dataset_dir: {src_dir}\n'
+        f'  dataset_w_normal_dir: {src_dir}\n'
+        '  test_pattern: "*.ply"\n'
+        '  scale: 100\n'
+        '  color: True\n'
+    )
+
+    return ds_cfg_file
+
+@pytest.fixture
+def codec(tmp_path):
+    return CopyCodec(tmp_path)
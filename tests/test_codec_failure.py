@@ -0,0 +1,24 @@
+from algs_wrapper.base import sidecar_path
+
+def test_failed_codec_returns_no_job(tmp_path, dataset, codec):
+    codec.fail = {'b.ply'}
+    pc_files, dirs = codec.setup_dataset(
+        'Test', tmp_path.joinpath('experiments'), dataset
+    )
+
+    assert codec._run_codec('b.ply', **dirs) is None
+    assert codec._failure_cnt == 1
+    assert codec._run_codec('a.ply', **dirs) is not None
+    assert codec._failure_cnt == 1
+
+def test_pipeline_survives_failed_codec(tmp_path, dataset, codec):
+    exp_root = tmp_path.joinpath('experiments')
+    codec.fail = {'b.ply'}
+    codec.pipelined = True
+    codec.run_dataset('Test', exp_root, nbprocesses=2, ds_cfg_file=dataset)
+
+    evl_dir = exp_root.joinpath('CopyCodec/Test/r1/evl')
+    for name, evaluated in (('a', True), ('b', False), ('c', True)):
+        evl_log = evl_dir.joinpath(f'{name}.log')
+        assert evl_log.exists() is evaluated
+        assert sidecar_path(evl_log).exists() is evaluated
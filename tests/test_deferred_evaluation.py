@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+from conftest import CopyCodec
+from algs_wrapper import base
+from algs_wrapper.base import evaluate_pending, PENDING_SUFFIX
+
+def test_deferred_evaluation_records_manifest(tmp_path, dataset, codec):
+    exp_root = tmp_path.joinpath('experiments')
+    codec.defer_evaluation = True
+    codec.run_dataset('Test', exp_root, nbprocesses=2, ds_cfg_file=dataset)
+
+    exp_dir = exp_root.joinpath('CopyCodec/Test/r1')
+    assert len(list(exp_dir.rglob(f'*{PENDING_SUFFIX}'))) == 3
+
+    evaluate_pending(exp_root, nbprocesses=2)
+
+    assert list(exp_dir.rglob(f'*{PENDING_SUFFIX}')) == []
+    pc_files, dirs = codec.setup_dataset('Test', exp_root, dataset)
+    for pcfile in pc_files:
+        evl_log = exp_dir.joinpath('evl', pcfile).with_suffix('.log')
+        assert evl_log.exists()
+        assert evl_log.with_suffix('.json').exists()
+
+        manifest = json.loads(
+            exp_dir.joinpath('manifest', pcfile)
+            .with_suffix('.json').read_text()
+        )
+        assert set(manifest) == {'encode', 'decode', 'evaluate'}
+        assert manifest['evaluate']['info']['time'] > 0
+        # nothing left to do when resuming
+        assert codec.pending_stages(pcfile, **dirs) == []
+
+def _pending_jobs(exp_dir):
+    return {
+        Path(pending_file).stem: json.loads(pending_file.read_text())
+        for pending_file in Path(exp_dir).rglob(f'*{PENDING_SUFFIX}')
+    }
+
+def test_pending_grouped_by_options(tmp_path, dataset, monkeypatch):
+    exp_root = tmp_path.joinpath('experiments')
+    for rate, memory_limit in (('r1', None), ('r2', 1 << 30)):
+        codec = CopyCodec(tmp_path)
+        codec.rate = rate
+        codec.memory_limit = memory_limit
+        codec.defer_evaluation = True
+        codec.run_dataset(
+            'Test', exp_root, nbprocesses=2, ds_cfg_file=dataset
+        )
+
+    groups = []
+    def run_in_process(func, groups_, **kwargs):
+        groups.extend(groups_)
+        for jobs in groups_:
+            func(jobs)
+    monkeypatch.setattr(base, 'parallel', run_in_process)
+    evaluate_pending(exp_root)
+
+    # one group per reference and memory limit
+    assert len(groups) == 6
+    for jobs in groups:
+        assert len({job['ref_pcfile'] for job in jobs}) == 1
+        assert len({job['memory_limit'] for job in jobs}) == 1
+    assert _pending_jobs(exp_root) == {}
+
+def test_missing_and_broken_targets(tmp_path, dataset, codec):
+    exp_root = tmp_path.joinpath('experiments')
+    codec.defer_evaluation = True
+    codec.run_dataset('Test', exp_root, nbprocesses=2, ds_cfg_file=dataset)
+    jobs = _pending_jobs(exp_root)
+    Path(jobs['a']['target_pcfile']).unlink()
+    Path(jobs['b']['target_pcfile']).write_text('not a point cloud')
+
+    evaluate_pending(exp_root, nbprocesses=2)
+
+    # the missing one is dropped, the broken one stays pending, and the
+    # other one of the group is still evaluated
+    assert set(_pending_jobs(exp_root)) == {'b'}
+    assert not Path(jobs['a']['evl_log']).exists()
+    assert not Path(jobs['b']['evl_log']).exists()
+    assert Path(jobs['c']['evl_log']).exists()
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import write_ply
+from evaluator import evaluator as evaluator_module
+from evaluator.evaluator import Evaluator
+from evaluator.metric_cache import evaluate_cached, _cache_key
+from evaluator.metrics.PointBasedMetrics import PointBasedMetrics
+from evaluator.metrics.ProjectionBasedMetrics import ProjectionBasedMetrics
+
+@pytest.fixture
+def clouds(tmp_path):
+    write_ply(tmp_path.joinpath('ref.ply'), 2000, seed=0)
+    write_ply(tmp_path.joinpath('target.ply'), 1800, seed=1)
+    return tmp_path.joinpath('ref.ply'), tmp_path.joinpath('target.ply')
+
+def _count_evaluations(monkeypatch):
+    counts = {}
+    for cls in (PointBasedMetrics, ProjectionBasedMetrics):
+        def evaluate(self, _evaluate=cls.evaluate, _name=cls.NAME):
+            counts[_name] = counts.get(_name, 0) + 1
+            return _evaluate(self)
+        monkeypatch.setattr(cls, 'evaluate', evaluate)
+    return counts
+
+def test_bumped_version_recomputes_only_that_family(clouds, monkeypatch):
+    counts = _count_evaluations(monkeypatch)
+    first = Evaluator(*clouds, projection=True).evaluate()
+    assert counts == {'point': 1, 'projection': 1}
+
+    Evaluator(*clouds, projection=True).evaluate()
+    assert counts == {'point': 1, 'projection': 1}
+
+    monkeypatch.setattr(
+        ProjectionBasedMetrics, 'VERSION', ProjectionBasedMetrics.VERSION + 1
+    )
+    again = Evaluator(*clouds, projection=True).evaluate()
+    assert counts == {'point': 1, 'projection': 2}
+    assert again.log == first.log
+
+def test_options_change_the_key(clouds, monkeypatch):
+    exact = PointBasedMetrics(*clouds)
+    sampled = PointBasedMetrics(*clouds, sample_size=500)
+    coarse = PointBasedMetrics(*clouds, resolution=1.0)
+    keys = {_cache_key(metric) for metric in (exact, sampled, coarse)}
+    assert len(keys) == 3
+
+    counts = _count_evaluations(monkeypatch)
+    same = PointBasedMetrics(*clouds, sample_size=500)
+    for metric in (exact, sampled, same):
+        evaluate_cached(metric)
+    assert counts == {'point': 2}
+
+def test_cached_targets_skip_the_reference_index(clouds, monkeypatch):
+    ref_file, target_file = clouds
+    first = Evaluator.evaluate_many(ref_file, [(target_file,)])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the reference index is looked up")
+    monkeypatch.setattr(evaluator_module, 'get_reference_index', fail)
+    again = Evaluator.evaluate_many(ref_file, [(target_file,)])
+
+    assert again[0].log == first[0].log
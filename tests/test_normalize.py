@@ -0,0 +1,24 @@
+import numpy as np
+
+from conftest import write_ply
+from utils.ply import read_ply
+from utils.pc_utils import normalize
+
+def test_normalize_ply(tmp_path):
+    tmp_path.joinpath('src').mkdir()
+    write_ply(tmp_path.joinpath('src/a.ply'), 1000)
+    before = np.array(read_ply(tmp_path.joinpath('src/a.ply')))
+
+    normalize('a.ply', tmp_path.joinpath('src'), tmp_path.joinpath('dest'), 10)
+
+    vertices = read_ply(tmp_path.joinpath('dest/a.ply'))
+    assert vertices.dtype['x'] == np.float64
+    assert vertices.dtype['red'] == np.uint8
+    np.testing.assert_array_equal(vertices['red'], before['red'])
+    points = np.stack([vertices[axis] for axis in 'xyz'], axis=1)
+    assert np.allclose(points.min(axis=0), 0)
+    assert np.isclose(points.max(), 10)
+    # the source is mapped read-only
+    np.testing.assert_array_equal(
+        read_ply(tmp_path.joinpath('src/a.ply')), before
+    )
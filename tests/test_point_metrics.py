@@ -0,0 +1,18 @@
+from conftest import write_ply
+from evaluator.metrics.PointBasedMetrics import PointBasedMetrics
+
+def test_log_formatted_like_pc_error(tmp_path, cache_root):
+    write_ply(tmp_path.joinpath('ref.ply'), 1000, seed=0)
+    write_ply(tmp_path.joinpath('target.ply'), 900, seed=1)
+
+    metric = PointBasedMetrics(
+        tmp_path.joinpath('ref.ply'), tmp_path.joinpath('target.ply')
+    )
+    log = metric.evaluate()
+
+    values = [
+        line.split(': ')[1] for line in log.splitlines() if ': ' in line
+    ]
+    assert values == [f'{metric.values[key]:g}' for key in metric.values]
+    # the resolution is cached in the cache of the test
+    assert len(list(cache_root.joinpath('resolution').iterdir())) == 1
@@ -0,0 +1,20 @@
+import numpy as np
+
+from conftest import write_ply
+from evaluator.resolution import get_resolution
+from evaluator.metrics.diameter import diameter
+
+def test_chunked_diameter():
+    points = np.random.default_rng(0).normal(size=(5000, 3))
+
+    assert diameter(points, chunk_size=700) == diameter(points)
+
+def test_resolution_within_memory_limit(tmp_path):
+    pc_file = tmp_path.joinpath('a.ply')
+    write_ply(pc_file, 5000)
+
+    # separate caches, so both are computed
+    assert get_resolution(
+        pc_file, cache_dir=tmp_path.joinpath('chunked'),
+        memory_limit=100 * 512
+    ) == get_resolution(pc_file, cache_dir=tmp_path.joinpath('whole'))
@@ -0,0 +1,11 @@
+def test_dataset_options_invalidate_encoding(tmp_path, dataset, codec):
+    exp_root = tmp_path.joinpath('experiments')
+    codec.run_dataset('Test', exp_root, nbprocesses=2, ds_cfg_file=dataset)
+    pc_files, dirs = codec.setup_dataset('Test', exp_root, dataset)
+    assert codec.pending_stages('a.ply', **dirs) == []
+
+    dataset.write_text(dataset.read_text().replace('scale: 100', 'scale: 50'))
+    pc_files, dirs = codec.setup_dataset('Test', exp_root, dataset)
+    assert codec.pending_stages('a.ply', **dirs) == [
+        'encode', 'decode', 'evaluate'
+    ]
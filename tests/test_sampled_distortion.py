@@ -0,0 +1,63 @@
+import numpy as np
+
+from conftest import write_ply
+from evaluator.metrics.pc_distortion import (
+    ReferenceIndex, compute_target_metrics
+)
+from evaluator.metrics.sampled_distortion import compute_sampled_metrics
+from evaluator.metrics.PointBasedMetrics import PointBasedMetrics
+
+def _clouds():
+    rng = np.random.default_rng(0)
+    ref = rng.random((20000, 3)) * 100
+    # a noisy copy with a few outliers
+    target = ref[:15000] + rng.normal(scale=0.5, size=(15000, 3))
+    target[:20] += 20
+    ref_colors = rng.integers(0, 256, (len(ref), 3)).astype(np.uint8)
+    target_colors = np.clip(
+        ref_colors[:15000].astype(int) + rng.integers(-8, 9, (15000, 3)),
+        0, 255
+    ).astype(np.uint8)
+    return ref, ref_colors, target, target_colors
+
+def test_intervals_contain_the_exact_metrics():
+    ref, ref_colors, target, target_colors = _clouds()
+    ref_index = ReferenceIndex(ref, ref_colors)
+    exact = compute_target_metrics(ref_index, target, 100.0, target_colors)
+
+    num_seeds = 50
+    covered = {}
+    for seed in range(num_seeds):
+        estimate, intervals = compute_sampled_metrics(
+            ref_index, target, 100.0, target_colors, sample_size=2000,
+            seed=seed
+        )
+        assert estimate['samples12'] < len(ref)
+        assert estimate['samples21'] < len(target)
+        for key, (lo, hi) in intervals.items():
+            covered[key] = covered.get(key, 0) + (lo <= exact[key] <= hi)
+        # the Hausdorff distance of the sample is a lower bound, and the
+        # covering radius gives an upper bound
+        assert estimate['h_p2pt'] == intervals['h_p2pt'][0]
+
+    assert covered['h_p2pt'] == num_seeds
+    # 95% confidence intervals
+    for key, count in covered.items():
+        assert count >= 0.85 * num_seeds, key
+
+def test_sampled_log_leaves_out_p2plane(tmp_path, cache_root):
+    write_ply(tmp_path.joinpath('ref.ply'), 2000, seed=0, normals=True)
+    write_ply(tmp_path.joinpath('target.ply'), 1800, seed=1)
+    clouds = tmp_path.joinpath('ref.ply'), tmp_path.joinpath('target.ply')
+
+    exact = PointBasedMetrics(*clouds)
+    assert 'p2pl' in exact.evaluate()
+    assert 'hybrid' in exact.values
+
+    sampled = PointBasedMetrics(*clouds, sample_size=500)
+    log = sampled.evaluate()
+    assert 'p2pl' not in log
+    assert 'Hybrid' not in log
+    assert 'nan' not in log
+    assert not any('p2pl' in key for key in sampled.values)
+    assert 'hybrid' not in sampled.values
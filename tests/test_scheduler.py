@@ -0,0 +1,70 @@
+from pathlib import Path
+from functools import partial
+
+from conftest import CopyCodec
+from algs_wrapper import scheduler
+from algs_wrapper.scheduler import schedule_experiments
+
+class SerialCodec(CopyCodec):
+    """A copying codec logging the start and the end of each encoding.
+    """
+    def __init__(self, rootdir, log_file):
+        super().__init__(rootdir)
+        self.log_file = log_file
+
+    def make_encode_cmd(self, in_pcfile, bin_file):
+        name = Path(in_pcfile).stem
+        return [
+            'sh', '-c',
+            f'echo "start {name} $(date +%s.%N)" >> {self.log_file}; '
+            f'sleep 0.2; cp {in_pcfile} {bin_file}; '
+            f'echo "end {name} $(date +%s.%N)" >> {self.log_file}'
+        ]
+
+def _write_cfg(tmp_path, dataset, max_jobs):
+    cfg_file = tmp_path.joinpath('experiments.yml')
+    cfg_file.write_text(
+        f'exp_dir: {tmp_path.joinpath("experiments")}\n'
+        f'ds_cfg_file: {dataset}\n'
+        'nbprocesses: 4\n'
+        'algorithms:\n'
+        '  SerialCodec:\n'
+        '    rates: [r1, r2]\n'
+        '    datasets: [Test]\n'
+        f'    max_jobs: {max_jobs}\n'
+    )
+    return cfg_file
+
+def _encodings(log_file):
+    """(name, start, end) of each encoding, in the start order.
+    """
+    events = {}
+    for line in log_file.read_text().splitlines():
+        event, name, t = line.split()
+        events.setdefault(name, []).append((event, float(t)))
+    spans = []
+    for name, times in events.items():
+        starts = sorted(t for event, t in times if event == 'start')
+        ends = sorted(t for event, t in times if event == 'end')
+        spans += [(name, s, e) for s, e in zip(starts, ends)]
+    return sorted(spans, key=lambda span: span[1])
+
+def test_max_jobs_and_longest_first(tmp_path, dataset, monkeypatch):
+    log_file = tmp_path.joinpath('encodings.log')
+    monkeypatch.setitem(
+        scheduler.ALGORITHMS, 'SerialCodec',
+        partial(SerialCodec, tmp_path, log_file)
+    )
+    schedule_experiments(_write_cfg(tmp_path, dataset, 1))
+
+    spans = _encodings(log_file)
+    assert len(spans) == 6
+    # never two encodings at the same time
+    for (_, _, end), (_, start, _) in zip(spans, spans[1:]):
+        assert end <= start
+    # the largest point clouds first: c (1500 points), b, then a
+    assert [name for name, _, _ in spans] == ['c', 'c', 'b', 'b', 'a', 'a']
+
+    exp_dir = tmp_path.joinpath('experiments/SerialCodec/Test')
+    for rate in ('r1', 'r2'):
+        assert len(list(exp_dir.joinpath(rate, 'evl').glob('*.log'))) == 3
@@ -0,0 +1,59 @@
+import os
+import multiprocessing as mp
+from pathlib import Path
+
+import numpy as np
+
+from utils import shared_memory
+from utils.shared_memory import SESSION_ENV, share_object, release_session
+
+def _build():
+    return {'points': np.arange(1000, dtype=np.float32)}
+
+def _use(key):
+    with share_object(key, _build) as obj:
+        total = float(obj['points'].sum())
+        shared = not obj['points'].flags.owndata
+    return total, shared, list(shared_memory._attached)
+
+def _use_without_space(key):
+    shared_memory._free_space = lambda: 0
+    return _use(key)
+
+def _segments(session):
+    return list(Path('/dev/shm').glob(f'pcc_arena_{session}_*'))
+
+def _run(func, session):
+    os.environ[SESSION_ENV] = session
+    try:
+        with mp.get_context('fork').Pool(2) as pool:
+            results = pool.map(func, ['a', 'b', 'a', 'b'])
+        # left before ``release_session()``
+        return results, _segments(session)
+    finally:
+        del os.environ[SESSION_ENV]
+        release_session(session)
+
+def test_segments_released_after_use():
+    session = 'test' + os.urandom(4).hex()
+    results, segments = _run(_use, session)
+
+    assert all(total == 499500.0 for total, _, _ in results)
+    assert all(shared for _, shared, _ in results)
+    # the attachments are closed, and the segments unlinked by their
+    # last user before the session ends
+    assert all(attached == [] for _, _, attached in results)
+    assert segments == []
+
+def test_private_copy_without_space():
+    session = 'test' + os.urandom(4).hex()
+    results, segments = _run(_use_without_space, session)
+
+    assert all(total == 499500.0 for total, _, _ in results)
+    assert not any(shared for _, shared, _ in results)
+    assert segments == []
+
+def test_built_outside_workers():
+    with share_object('a', _build) as obj:
+        assert obj['points'].flags.owndata
+    assert shared_memory._attached == {}
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from utils.ply import write_ply
+from libs.point_cloud import PointCloud
+from evaluator.metrics.pc_distortion import compute_quality_metrics
+from evaluator.metrics.tiled_distortion import (
+    BYTES_PER_POINT, compute_tiled_metrics
+)
+
+def _write(filename, points, colors, normals=None):
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    fields += [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
+    if normals is not None:
+        fields += [('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4')]
+    vertices = np.empty(len(points), dtype=fields)
+    for i, axis in enumerate('xyz'):
+        vertices[axis] = points[:, i]
+    for i, channel in enumerate(('red', 'green', 'blue')):
+        vertices[channel] = colors[:, i]
+    if normals is not None:
+        for i, axis in enumerate(('nx', 'ny', 'nz')):
+            vertices[axis] = normals[:, i]
+    write_ply(filename, vertices)
+
+def _clouds(rng, voxelized, duplicates):
+    """A reference and a distorted target with a few far outliers.
+    """
+    ref = rng.random((3000, 3)) * 100
+    if voxelized:
+        ref = np.round(ref)
+    if duplicates:
+        ref = np.concatenate([ref, ref[:500]])
+    target = ref[rng.random(len(ref)) < 0.8]
+    target = target + rng.normal(scale=0.5, size=target.shape)
+    target = np.concatenate([target, rng.random((5, 3)) * 400 - 150])
+    if voxelized:
+        target = np.round(target)
+
+    return ref, target
+
+@pytest.mark.parametrize('voxelized', [False, True])
+@pytest.mark.parametrize('duplicates', [False, True])
+@pytest.mark.parametrize('max_points', [200, 2000])
+def test_tiled_metrics_are_exact(tmp_path, voxelized, duplicates, max_points):
+    rng = np.random.default_rng(max_points + 2 * voxelized + duplicates)
+    ref, target = _clouds(rng, voxelized, duplicates)
+    ref_colors = rng.integers(0, 256, (len(ref), 3))
+    target_colors = rng.integers(0, 256, (len(target), 3))
+    normals = rng.normal(size=ref.shape)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    _write(tmp_path.joinpath('ref.ply'), ref, ref_colors, normals)
+    _write(tmp_path.joinpath('target.ply'), target, target_colors)
+
+    # compared on the values stored in the files
+    ref_pc = PointCloud(tmp_path.joinpath('ref.ply'))
+    target_pc = PointCloud(tmp_path.joinpath('target.ply'))
+    expected = compute_quality_metrics(
+        np.asarray(ref_pc.points, dtype=np.float64),
+        np.asarray(target_pc.points, dtype=np.float64),
+        100.0,
+        ref_colors=ref_pc.colors,
+        target_colors=target_pc.colors,
+        ref_normals=np.asarray(ref_pc.normals, dtype=np.float64)
+    )
+    tiled = compute_tiled_metrics(
+        ref_pc, target_pc, 100.0, max_points * BYTES_PER_POINT,
+        tmp_dir=tmp_path.joinpath('tiles')
+    )
+
+    assert tiled.keys() == expected.keys()
+    for key in expected:
+        np.testing.assert_allclose(
+            tiled[key], expected[key], rtol=1e-12, err_msg=key
+        )
+    # the temporary tiles are removed
+    assert list(tmp_path.joinpath('tiles').iterdir()) == []
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from conftest import write_ply
+from evaluator import view_cache
+from evaluator.view_cache import get_reference_views
+from evaluator.metrics.renderer import VIEW_ROTATIONS
+
+WHITE = np.array([255, 255, 255])
+BLACK = np.array([0, 0, 0])
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Count the images rendered by the view cache.
+    """
+    counts = [0]
+    def render(*args, _render=view_cache.render):
+        counts[0] += 1
+        return _render(*args)
+    monkeypatch.setattr(view_cache, 'render', render)
+    return counts
+
+def _views(ref_pc, cache_dir, background=WHITE):
+    return get_reference_views(
+        ref_pc, VIEW_ROTATIONS, 64, 48, background, BLACK,
+        cache_dir=cache_dir
+    )
+
+def test_cached_views_are_identical(tmp_path, renders):
+    ref_pc = tmp_path.joinpath('ref.ply')
+    write_ply(ref_pc, 1000)
+
+    views, images = _views(ref_pc, tmp_path)
+    assert renders[0] == len(VIEW_ROTATIONS)
+
+    cached_views, cached_images = _views(ref_pc, tmp_path)
+    assert renders[0] == len(VIEW_ROTATIONS)
+    assert len(cached_views) == len(views)
+    for view, cached in zip(views, cached_views):
+        for a, b in zip(view, cached):
+            np.testing.assert_array_equal(a, b)
+    for image, cached in zip(images, cached_images):
+        assert image.dtype == cached.dtype
+        np.testing.assert_array_equal(image, cached)
+
+def test_invalidated_by_version_and_background(
+        tmp_path,
+        renders,
+        monkeypatch
+    ):
+    ref_pc = tmp_path.joinpath('ref.ply')
+    write_ply(ref_pc, 1000)
+    num_views = len(VIEW_ROTATIONS)
+
+    _views(ref_pc, tmp_path)
+    _, images = _views(ref_pc, tmp_path, background=BLACK)
+    assert renders[0] == 2 * num_views
+    assert np.all(images[0][0, 0] == BLACK)
+
+    monkeypatch.setattr(
+        view_cache, 'VIEW_VERSION', view_cache.VIEW_VERSION + 1
+    )
+    _views(ref_pc, tmp_path)
+    assert renders[0] == 3 * num_views
+    # cached again under the new version
+    _views(ref_pc, tmp_path)
+    assert renders[0] == 3 * num_views
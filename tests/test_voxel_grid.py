@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from evaluator.metrics.voxel_grid import VoxelGrid, MAX_SQR_RADIUS
+from evaluator.metrics.pc_distortion import (
+    NUM_RESULTS_MAX, nearest_neighbours
+)
+
+def _split(nn):
+    counts, indices, sqr_dists = nn
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    return [
+        (sorted(indices[a:b]), sqr_dists[a:b].tolist())
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+
+def _assert_same(grid, tree, queries):
+    expected = _split(nearest_neighbours(tree, queries))
+    found = _split(
+        grid.nearest_neighbours(queries, NUM_RESULTS_MAX, nearest_neighbours)
+    )
+    assert len(found) == len(expected)
+    for (idx, dist), (idx_exp, dist_exp) in zip(found, expected):
+        # the KD-tree squares the rounded distances
+        np.testing.assert_allclose(dist, dist_exp, rtol=1e-12)
+        # which of the tied neighbours are kept beyond the maximum is
+        # arbitrary
+        if len(idx_exp) < NUM_RESULTS_MAX:
+            assert idx == idx_exp
+
+@pytest.mark.parametrize('seed', range(3))
+def test_voxel_grid_matches_kdtree(seed):
+    rng = np.random.default_rng(seed)
+    # a dense block, and a few sparse points far from it
+    points = np.concatenate([
+        rng.integers(0, 30, (3000, 3)),
+        rng.integers(-500, 500, (20, 3)),
+    ]).astype(np.float64)
+    points = np.unique(points, axis=0)
+    grid, tree = VoxelGrid(points), cKDTree(points)
+
+    queries = np.concatenate([
+        # exact matches and near misses, with duplicates
+        points[rng.integers(0, len(points), 2000)],
+        points[:500] + rng.integers(-2, 3, (500, 3)),
+        np.repeat(points[:50] + 1, 3, axis=0),
+        # sparse outliers beyond the shells, searched by the KD-tree
+        rng.integers(-2000, 2000, (100, 3)),
+        points[-20:] + 2 * np.sqrt(MAX_SQR_RADIUS),
+    ])
+    _assert_same(grid, tree, queries)
+
+def test_voxel_grid_ties():
+    # points on the even lattice, so the odd query points are equally
+    # far from up to 8 points
+    r = np.arange(0, 20, 2)
+    points = np.stack(
+        np.meshgrid(r, r, r, indexing='ij'), -1
+    ).reshape(-1, 3).astype(np.float64)
+    grid, tree = VoxelGrid(points), cKDTree(points)
+
+    r = np.arange(-1, 20)
+    queries = np.stack(
+        np.meshgrid(r, r, r, indexing='ij'), -1
+    ).reshape(-1, 3).astype(np.float64)
+    _assert_same(grid, tree, queries)
+
+def test_voxel_grid_shells():
+    # sparse lattice, and query points at each squared distance up to
+    # ``MAX_SQR_RADIUS``, enough of each for the shells to pay off
+    r = np.arange(0, 200, 8)
+    points = np.stack(
+        np.meshgrid(r, r, r, indexing='ij'), -1
+    ).reshape(-1, 3).astype(np.float64)
+    grid, tree = VoxelGrid(points), cKDTree(points)
+
+    rng = np.random.default_rng(0)
+    counts = {1: 40, 2: 20, 3: 20, 4: 40, 5: 20, 6: 10, 8: 10, 9: 10}
+    offsets = {
+        1: [1, 0, 0], 2: [1, 1, 0], 3: [1, 1, 1], 4: [2, 0, 0],
+        5: [2, 1, 0], 6: [2, 1, 1], 8: [2, 2, 0], 9: [2, 2, 1],
+    }
+    queries = np.concatenate([
+        points[rng.integers(0, len(points), count)]
+        + rng.permutation(offsets[sqr_len]) * rng.choice([-1, 1], 3)
+        for sqr_len, count in counts.items()
+    ])
+
+    def fallback(tree, points):
+        assert len(points) == 0, "not resolved in the shells"
+        return nearest_neighbours(tree, points)
+    nn = grid.nearest_neighbours(queries, NUM_RESULTS_MAX, fallback)
+
+    assert sorted(set(nn[2].tolist())) == list(counts)
+    _assert_same(grid, tree, queries)
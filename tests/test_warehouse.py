@@ -0,0 +1,77 @@
+import csv
+
+import pytest
+
+from evaluator.warehouse import (
+    ResultsWarehouse, CSV_KEY_COLUMNS, RESULT_COLUMNS
+)
+
+def _row(file, bpp, psnr, **setup):
+    return {
+        **setup, 'file': file, 'pc_file': f'{file}.ply', 'bpp': bpp,
+        'cdpsnr_p2pt': psnr
+    }
+
+@pytest.fixture
+def warehouse(tmp_path):
+    with ResultsWarehouse(tmp_path.joinpath('results.sqlite')) as wh:
+        wh.replace_setup('A', 'D', 'r1', [
+            _row('a', 1.0, 60.0), _row('b', 2.0, 70.0)
+        ])
+        wh.replace_setup('A', 'D', 'r2', [_row('a', 3.0, 75.0)])
+        wh.replace_setup('B', 'D', 'r1', [_row('a', 0.5, None)])
+        wh.replace_setup('B', 'E', 'r1', [_row('a', 9.0, 90.0)])
+        yield wh
+
+def test_upsert_updates_on_conflict(warehouse):
+    setup = {'algorithm': 'A', 'dataset': 'D', 'rate': 'r1'}
+    assert warehouse.upsert([_row('a', 1.5, 65.0, **setup)]) == 1
+
+    # updated in place, the other results are untouched
+    assert warehouse.aggregate('bpp', 'A', 'D', 'r1') == [
+        ('A', 'D', 'r1', 2, 1.75, 1.5, 2.0)
+    ]
+    assert warehouse.aggregate('bpp', 'A', 'D', 'r2') == [
+        ('A', 'D', 'r2', 1, 3.0, 3.0, 3.0)
+    ]
+
+def test_replace_setup_deletes_removed_files(warehouse):
+    warehouse.replace_setup('A', 'D', 'r1', [_row('b', 2.5, 71.0)])
+
+    assert warehouse.aggregate('bpp', 'A', 'D', 'r1') == [
+        ('A', 'D', 'r1', 1, 2.5, 2.5, 2.5)
+    ]
+    # only the results of that setup are replaced
+    assert warehouse.aggregate('bpp', 'A', 'D', 'r2')[0][3] == 1
+    assert warehouse.aggregate('bpp', 'B')[0][3] == 1
+
+def test_aggregate(warehouse):
+    assert warehouse.aggregate('cdpsnr_p2pt', dataset='D') == [
+        ('A', 'D', 'r1', 2, 65.0, 60.0, 70.0),
+        ('A', 'D', 'r2', 1, 75.0, 75.0, 75.0),
+        # NULL metrics are ignored
+        ('B', 'D', 'r1', 0, None, None, None),
+    ]
+    assert len(warehouse.aggregate('bpp')) == 4
+    with pytest.raises(ValueError):
+        warehouse.aggregate('bpp; DROP TABLE results')
+
+def test_compare(warehouse):
+    assert warehouse.compare('D', ['bpp', 'cdpsnr_p2pt']) == [
+        ('A', 'r1', 2, 1.5, 65.0),
+        ('A', 'r2', 1, 3.0, 75.0),
+        ('B', 'r1', 1, 0.5, None),
+    ]
+    with pytest.raises(ValueError):
+        warehouse.compare('D', ['bpp', 'psnr'])
+
+def test_export_csv_keeps_the_summary_columns(warehouse, tmp_path):
+    csv_file = tmp_path.joinpath('summary.csv')
+    warehouse.export_csv(csv_file)
+
+    with open(csv_file) as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:4] == ['algs', 'datasets', 'rate', 'pc_file']
+    assert rows[0] == CSV_KEY_COLUMNS + RESULT_COLUMNS
+    assert len(rows) == 6
+    assert rows[1][:4] == ['A', 'D', 'r1', 'a.ply']
@@ -0,0 +1,136 @@
+import os
+import logging
+from pathlib import Path
+from typing import Union, Optional
+
+logger = logging.getLogger(__name__)
+
+# Root directory of all the on-disk caches
+CACHE_ROOTDIR = Path(__file__).parents[1].joinpath('cache').resolve()
+# Environment variable overriding ``CACHE_ROOTDIR``, e.g., for tests.
+# Inherited by the worker processes.
+CACHE_ROOTDIR_ENV = 'PCC_ARENA_CACHE_DIR'
+
+def get_cache_dir(name: str) -> Path:
+    """The directory of the cache ``name`` under the cache root, i.e.,
+    ``CACHE_ROOTDIR`` or the directory in ``CACHE_ROOTDIR_ENV``. It is 
+    resolved at call time, so the root can be changed after import.
+    """
+    root = os.environ.get(CACHE_ROOTDIR_ENV, CACHE_ROOTDIR)
+    return Path(root).joinpath(name)
+
+class DiskCache():
+    """A simple on-disk key-value store. Each entry is stored as a file
+    named after its key. Entries are written to a temporary file and
+    renamed, so parallel processes can safely share the same cache
+    directory. If ``max_size`` is given, the least recently used 
+    entries are evicted when the total size exceeds it.
+    """
+    def __init__(
+            self,
+            cache_dir: Union[str, Path],
+            suffix: str = '',
+            max_size: int = None
+        ) -> None:
+        """
+        Parameters
+        ----------
+        cache_dir : `Union[str, Path]`
+            The directory to store the cache entries.
+        suffix : `str`, optional
+            The file suffix of the cache entries. Defaults to ''.
+        max_size : `int`, optional
+            The maximum total size of the cache entries in bytes. 
+            Defaults to None, unbounded.
+        """
+        self._cache_dir = Path(cache_dir)
+        self._suffix = suffix
+        self._max_size = max_size
+
+    def path(self, key: str) -> Path:
+        """Full path of the cache entry ``key``.
+        """
+        return self._cache_dir.joinpath(f'{key}{self._suffix}')
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Load the cache entry ``key``.
+
+        Parameters
+        ----------
+        key : `str`
+            The key of the cache entry.
+
+        Returns
+        -------
+        `Optional[bytes]`
+            The content of the cache entry, or None if not found.
+        """
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        
+        self._touch(path)
+        
+        return data
+
+    def save(self, key: str, data: bytes) -> None:
+        """Save ``data`` as the cache entry ``key``.
+
+        Parameters
+        ----------
+        key : `str`
+            The key of the cache entry.
+        data : `bytes`
+            The content of the cache entry.
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_file = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, path)
+        
+        if self._max_size is not None:
+            self._evict(keep=path)
+
+    def _touch(self, path: Path) -> None:
+        """Mark the entry ``path`` as recently used. The modification 
+        time is used instead of the access time, which is not updated
+        on most file systems.
+        """
+        if self._max_size is None:
+            return
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: Path) -> None:
+        """Remove the least recently used entries until the total size 
+        is within ``max_size``. The entry ``keep`` is never removed.
+        """
+        entries = []
+        for path in self._cache_dir.glob(f'*{self._suffix}'):
+            # skip the temporary files being written
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self._max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evict {path} from the cache.")
+            total -= size
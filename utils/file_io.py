@@ -1,7 +1,10 @@
 import ast
+import hashlib
 import logging
 from pathlib import Path
-from typing import Union, List
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Union, List, Tuple, Optional
 
 import yaml
 
@@ -102,4 +105,168 @@ def glob_file(
             f"Found {len(files)} files "
             f"with pattern: {pattern} in {Path(src_dir).resolve(True)}")
 
-    return files
\ No newline at end of file
+    return files
+
+def file_hash(filename: Union[str, Path]) -> str:
+    """Calculate the SHA-1 digest of the file content. The digest is 
+    memoized with the file size and modification time, so repeated 
+    calls on an unchanged file do not read it again.
+
+    Parameters
+    ----------
+    filename : `Union[str, Path]`
+        The file to hash.
+
+    Returns
+    -------
+    `str`
+        The hex digest of the file content.
+    """
+    filename = Path(filename).resolve()
+    stat = filename.stat()
+    
+    return _file_hash(str(filename), stat.st_size, stat.st_mtime_ns)
+
+@lru_cache(maxsize=4096)
+def _file_hash(filename: str, size: int, mtime_ns: int) -> str:
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    
+    return sha1.hexdigest()
+
+@dataclass
+class PlyElement():
+    """An element (e.g., vertex or face) declared in a PLY header.
+    
+    Attributes
+    ----------
+    name : `str`
+        Name of the element.
+    count : `int`
+        Number of the element.
+    properties : `List[Tuple[str, str]]`
+        (name, type) of each property. The type of a list property is 
+        like 'list uchar int'.
+    """
+    name: str
+    count: int
+    properties: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def property_names(self) -> List[str]:
+        return [name for name, _ in self.properties]
+
+@dataclass
+class PlyHeader():
+    """The header of a PLY file.
+    
+    Attributes
+    ----------
+    format : `str`
+        'ascii', 'binary_little_endian' or 'binary_big_endian'.
+    version : `str`
+        Version of the PLY format.
+    elements : `List[PlyElement]`
+        Elements in the order they are declared.
+    comments : `List[str]`
+        Comment lines of the header.
+    header_size : `int`
+        Size of the header in bytes, i.e., the offset of the data.
+    """
+    format: str
+    version: str
+    elements: List[PlyElement]
+    comments: List[str]
+    header_size: int
+
+    @property
+    def vertex(self) -> Optional[PlyElement]:
+        """The vertex element, or None if not declared.
+        """
+        for element in self.elements:
+            if element.name == 'vertex':
+                return element
+        return None
+
+    @property
+    def num_points(self) -> int:
+        return self.vertex.count if self.vertex else 0
+
+    @property
+    def properties(self) -> List[str]:
+        """Property names of the vertex element.
+        """
+        return self.vertex.property_names if self.vertex else []
+
+    @property
+    def has_colors(self) -> bool:
+        return {'red', 'green', 'blue'} <= set(self.properties)
+
+    @property
+    def has_normals(self) -> bool:
+        return {'nx', 'ny', 'nz'} <= set(self.properties)
+
+def read_ply_header(filename: Union[str, Path]) -> PlyHeader:
+    """Parse the header of a PLY file (ASCII or binary) without reading
+    the point data.
+
+    Parameters
+    ----------
+    filename : `Union[str, Path]`
+        The PLY file.
+
+    Returns
+    -------
+    `PlyHeader`
+        The parsed header.
+
+    Raises
+    ------
+    `ValueError`
+        ``filename`` is not a valid PLY file.
+    """
+    fmt = version = None
+    elements = []
+    comments = []
+    
+    with open(filename, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            logger.error(f"{filename} is not a PLY file.")
+            raise ValueError
+        
+        for line in f:
+            words = line.decode('ascii', errors='replace').split()
+            if not words:
+                continue
+            
+            keyword = words[0]
+            if keyword == 'end_header':
+                break
+            elif keyword == 'format' and len(words) == 3:
+                fmt, version = words[1], words[2]
+            elif keyword in ('comment', 'obj_info'):
+                comments.append(line.decode('ascii', errors='replace')
+                                .strip()[len(keyword):].strip())
+            elif keyword == 'element' and len(words) == 3:
+                elements.append(PlyElement(words[1], int(words[2])))
+            elif keyword == 'property' and elements and len(words) >= 3:
+                elements[-1].properties.append(
+                    (words[-1], ' '.join(words[1:-1]))
+                )
+            else:
+                logger.error(f"Invalid line in the header of {filename}: "
+                             f"{line!r}")
+                raise ValueError
+        else:
+            logger.error(f"Not found 'end_header' in {filename}.")
+            raise ValueError
+        
+        header_size = f.tell()
+    
+    if fmt not in ('ascii', 'binary_little_endian', 'binary_big_endian'):
+        logger.error(f"Unknown PLY format {fmt} of {filename}.")
+        raise ValueError
+    
+    return PlyHeader(fmt, version, elements, comments, header_size)
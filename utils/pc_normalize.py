@@ -2,28 +2,15 @@ import argparse
 import logging
 import numpy as np
 from pathlib import Path
-from pyntcloud import PyntCloud
 import subprocess as sp
 from multiprocessing import Pool
 from functools import partial
 from tqdm import tqdm
 
-def work(filepath, args):
-    infile = Path(args.src_dir).joinpath(filepath)
-    outfile = Path(args.dest_dir).joinpath(filepath)
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(infile, 'rb') as f:
-        pc = PyntCloud.from_file(str(infile))
-        coords = ['x', 'y', 'z']
-        points = pc.points[coords].values
-        points[:,0] = points[:,0] - np.min(points[:,0])
-        points[:,1] = points[:,1] - np.min(points[:,1])
-        points[:,2] = points[:,2] - np.min(points[:,2])
-        points = points / np.max(points) * (args.scale - 1)
-        pc.points[coords] = points
+from utils.pc_utils import normalize
 
-        pc.to_file(str(outfile))
+def work(filepath, args):
+    normalize(filepath, args.src_dir, args.dest_dir, args.scale - 1)
     return
 
 if __name__ == "__main__":
@@ -10,6 +10,8 @@ import numpy.typing as npt
 # from pyntcloud import PyntCloud
 import open3d as o3d
 
+from utils.ply import read_ply, write_ply
+
 logger = logging.getLogger(__name__)
 
 def sample_from_mesh(
@@ -129,13 +131,41 @@ def normalize(
         dest_dir: Union[str, Path],
         scale: int = 1
     ) -> None:
+    """Translate the point cloud to the origin and scale its longest
+    side to ``scale``. The coordinates are written as doubles. The 
+    vertices of PLY files are memory-mapped and the other properties
+    keep their dtypes, while the other formats are read and written by
+    open3d.
+    """
     infile = Path(src_dir).joinpath(pc_file)
     outfile = Path(dest_dir).joinpath(pc_file)
     outfile.parent.mkdir(parents=True, exist_ok=True)
     
-    pc = o3d.io.read_point_cloud(str(infile))
-    points = np.asarray(pc.points)
-    points = points - np.min(points, axis=0)
-    points = points / np.max(points) * scale
-    pc.points = o3d.utility.Vector3dVector(points)
-    o3d.io.write_point_cloud(outfile, pc)
+    if infile.suffix.lower() != '.ply':
+        pc = o3d.io.read_point_cloud(str(infile))
+        points = np.asarray(pc.points)
+        points = points - np.min(points, axis=0)
+        points = points / np.max(points) * scale
+        pc.points = o3d.utility.Vector3dVector(points)
+        o3d.io.write_point_cloud(str(outfile), pc)
+        return
+
+    coords = ['x', 'y', 'z']
+    vertices = read_ply(infile)
+    lower = [float(vertices[axis].min()) for axis in coords]
+    extent = max(
+        float(vertices[axis].max()) - lo for axis, lo in zip(coords, lower)
+    )
+
+    dtype = np.dtype([
+        (name, '<f8' if name in coords else vertices.dtype.fields[name][0])
+        for name in vertices.dtype.names
+    ])
+    normalized = np.empty(len(vertices), dtype=dtype)
+    for name in vertices.dtype.names:
+        if name in coords:
+            lo = lower[coords.index(name)]
+            normalized[name] = (vertices[name] - lo) / extent * scale
+        else:
+            normalized[name] = vertices[name]
+    write_ply(outfile, normalized)
@@ -0,0 +1,206 @@
+import logging
+from pathlib import Path
+from typing import Union, List, Sequence
+
+import numpy as np
+from numpy.lib import recfunctions as rfn
+
+from utils.file_io import PlyElement, read_ply_header
+
+logger = logging.getLogger(__name__)
+
+# PLY property types and the corresponding numpy types
+PLY_TO_NUMPY = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8',
+}
+NUMPY_TO_PLY = {
+    'i1': 'char', 'u1': 'uchar',
+    'i2': 'short', 'u2': 'ushort',
+    'i4': 'int', 'u4': 'uint',
+    'f4': 'float', 'f8': 'double',
+}
+
+def element_dtype(element: PlyElement, byte_order: str = '<') -> np.dtype:
+    """The numpy structured dtype of one ``element`` record.
+
+    Parameters
+    ----------
+    element : `PlyElement`
+        An element of the PLY header.
+    byte_order : `str`, optional
+        '<' for little-endian, '>' for big-endian. Defaults to '<'.
+
+    Returns
+    -------
+    `np.dtype`
+        The structured dtype with one field per property.
+
+    Raises
+    ------
+    `ValueError`
+        The element has list properties or unknown property types.
+    """
+    fields = []
+    for name, ply_type in element.properties:
+        if ply_type not in PLY_TO_NUMPY:
+            logger.error(
+                f"Property {name} ({ply_type}) of element {element.name} "
+                f"does not have a fixed size."
+            )
+            raise ValueError
+        fields.append((name, byte_order + PLY_TO_NUMPY[ply_type]))
+
+    return np.dtype(fields)
+
+def read_ply(
+        filename: Union[str, Path],
+        mmap_mode: str = 'r'
+    ) -> np.ndarray:
+    """Read the vertices of a PLY file as a numpy structured array, one
+    field per vertex property (e.g., x, y, z, red, green, blue). The
+    vertex data of binary PLY files is memory-mapped instead of being
+    copied, and the dtypes in the file (e.g., float32 and uint8) are
+    preserved.
+
+    Parameters
+    ----------
+    filename : `Union[str, Path]`
+        The PLY file.
+    mmap_mode : `str`, optional
+        The mode of ``np.memmap``: 'r' for read-only, 'r+' for writing
+        back to the file, 'c' for copy-on-write. If None, the vertices
+        are read into memory. ASCII PLY files are always read into
+        memory. Defaults to 'r'.
+
+    Returns
+    -------
+    `np.ndarray`
+        (N,) structured array of the vertices.
+
+    Raises
+    ------
+    `ValueError`
+        The file does not have a vertex element, or the vertex data
+        cannot be located without parsing the preceding elements.
+    """
+    header = read_ply_header(filename)
+    if header.vertex is None:
+        logger.error(f"Not found the vertex element in {filename}.")
+        raise ValueError
+
+    byte_order = '>' if header.format == 'binary_big_endian' else '<'
+    dtype = element_dtype(header.vertex, byte_order)
+    count = header.vertex.count
+
+    # the vertex element is usually the first one, otherwise skip the
+    # records of the preceding elements
+    offset = header.header_size
+    num_lines = 0
+    for element in header.elements:
+        if element.name == 'vertex':
+            break
+        if header.format == 'ascii':
+            num_lines += element.count
+        else:
+            offset += element.count * element_dtype(element).itemsize
+
+    if header.format == 'ascii':
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            for _ in range(num_lines):
+                f.readline()
+            return np.loadtxt(f, dtype=dtype, max_rows=count, ndmin=1)
+
+    if mmap_mode is None or count == 0:
+        return np.fromfile(filename, dtype=dtype, count=count, offset=offset)
+
+    return np.memmap(
+        filename, dtype=dtype, mode=mmap_mode, offset=offset, shape=(count,)
+    )
+
+def write_ply(
+        filename: Union[str, Path],
+        vertices: np.ndarray,
+        comments: List[str] = None,
+        ascii: bool = False
+    ) -> None:
+    """Write a structured array of vertices to a PLY file. Binary files
+    are written directly from the memory of ``vertices`` if it is
+    little-endian.
+
+    Parameters
+    ----------
+    filename : `Union[str, Path]`
+        The output PLY file.
+    vertices : `np.ndarray`
+        (N,) structured array, one field per vertex property.
+    comments : `List[str]`, optional
+        Comment lines in the header. Defaults to None.
+    ascii : `bool`, optional
+        True for ASCII PLY, False for binary little-endian PLY. Defaults
+        to False.
+
+    Raises
+    ------
+    `ValueError`
+        ``vertices`` has fields that cannot be stored in a PLY file.
+    """
+    dtype = vertices.dtype
+    if dtype.names is None:
+        logger.error("The vertices should be a structured array.")
+        raise ValueError
+
+    fmt = 'ascii' if ascii else 'binary_little_endian'
+    lines = ['ply', f'format {fmt} 1.0']
+    lines += [f'comment {comment}' for comment in comments or []]
+    lines.append(f'element vertex {len(vertices)}')
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        if field.str[1:] not in NUMPY_TO_PLY:
+            logger.error(f"Unsupported dtype {field} of property {name}.")
+            raise ValueError
+        lines.append(f'property {NUMPY_TO_PLY[field.str[1:]]} {name}')
+    lines.append('end_header')
+
+    with open(filename, 'wb') as f:
+        f.write(('\n'.join(lines) + '\n').encode('ascii'))
+        if ascii:
+            fmts = [
+                '%d' if dtype.fields[name][0].kind in 'iu' else '%.9g'
+                for name in dtype.names
+            ]
+            np.savetxt(f, vertices, fmt=fmts)
+        else:
+            little = np.dtype([
+                (name, dtype.fields[name][0].newbyteorder('<'))
+                for name in dtype.names
+            ])
+            if dtype != little:
+                vertices = vertices.astype(little)
+            vertices.tofile(f)
+
+def get_fields(vertices: np.ndarray, names: Sequence[str]) -> np.ndarray:
+    """Stack the fields ``names`` of ``vertices`` into a (N, len(names))
+    array, e.g., ``get_fields(vertices, ['x', 'y', 'z'])``. A view is
+    returned when the fields have the same dtype and are adjacent.
+
+    Parameters
+    ----------
+    vertices : `np.ndarray`
+        (N,) structured array.
+    names : `Sequence[str]`
+        Names of the fields.
+
+    Returns
+    -------
+    `np.ndarray`
+        (N, len(names)) array.
+    """
+    return rfn.structured_to_unstructured(vertices[list(names)], copy=False)
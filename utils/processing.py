@@ -1,19 +1,43 @@
 import os
+import time
 import logging
 import pkgutil
 import threading
 import importlib
+from uuid import uuid4
 from queue import Queue
 from functools import partial
-from typing import Callable, Iterable
-from multiprocessing import Pool, Manager
+from collections import defaultdict, deque
+from typing import Callable, Iterable, List, Tuple, Dict, Optional
+from multiprocessing import Pool, Manager, current_process
 from multiprocessing.pool import ThreadPool
+from multiprocessing.managers import SyncManager, BaseProxy
 
 import GPUtil
+import open3d as o3d
 from tqdm import tqdm
+from xvfbwrapper import Xvfb
+
+from utils.shared_memory import SESSION_ENV, release_session
 
 logger = logging.getLogger(__name__)
 
+# Screen size of the virtual displays, large enough for the projected
+# images of ``ProjectionBasedMetrics``
+DISPLAY_WIDTH = 1920
+DISPLAY_HEIGHT = 1920
+
+# Group of the jobs of ``schedule()`` running on a GPU
+GPU_GROUP = 'gpu'
+# Seconds between the updates of the estimated remaining time of
+# ``schedule()``
+ETA_INTERVAL = 5.0
+
+# Virtual display assigned to this worker process by ``parallel()``, and
+# the persistent open3d visualizer of the worker
+_display = None
+_visualizer = None
+
 # def load_modules(modules_path):
 #     for finder, name, _ in pkgutil.iter_modules(modules_path):
 #         try:
@@ -27,7 +51,8 @@ def parallel(
         func: Callable,
         filelist:Iterable,
         use_gpu: bool = False,
-        nbprocesses: int = None
+        nbprocesses: int = None,
+        display: bool = False
     ) -> None:
     """Parallel processing with multiprocessing.Pool(), works better 
     with functools.partial().
@@ -50,6 +75,10 @@ def parallel(
     nbprocesses : `int`, optional
         Specify the number of cpu parallel processes. If None, it will 
         equal to the cpu count. Defaults to None.
+    display : `bool`, optional
+        True for starting a virtual display (Xvfb) for each worker 
+        process, so each worker can render with its own open3d 
+        visualizer from ``get_visualizer()``. Defaults to False.
     
     Raises
     ------
@@ -58,36 +87,460 @@ def parallel(
     """
     assert len(filelist) > 0
 
-    if use_gpu is True:
-        # Get the number of available GPUs
-        deviceIDs = GPUtil.getAvailable(
-            order = 'first',
-            limit = 8,
-            maxLoad = 0.5,
-            maxMemory = 0.5,
-            includeNan=False,
-            excludeID=[],
-            excludeUUID=[]
+    # keep the manager alive until the pool is closed
+    process, pfunc, manager = _codec_workers(func, use_gpu, nbprocesses)
+
+    displays = start_displays(process) if display else []
+
+    # workers share the reference data of this session through the
+    # shared memory registry, see ``utils.shared_memory``
+    session = uuid4().hex[:8]
+    os.environ[SESSION_ENV] = session
+    try:
+        with Pool(
+            process, 
+            initializer=_init_worker if display else None,
+            initargs=([disp.new_display for disp in displays],)
+        ) as pool:
+            list(tqdm(
+                pool.imap_unordered(pfunc, filelist), total=len(filelist)
+            ))
+    finally:
+        del os.environ[SESSION_ENV]
+        release_session(session)
+        # each display restores the DISPLAY of the previous one
+        for disp in reversed(displays):
+            disp.stop()
+
+def pipeline(
+        codec_func: Callable,
+        eval_func: Callable,
+        filelist: Iterable,
+        use_gpu: bool = False,
+        nbprocesses: int = None,
+        eval_nbprocesses: int = None,
+        queue_size: int = None,
+        display: bool = False
+    ) -> None:
+    """Two-stage parallel processing. ``codec_func`` runs on each file 
+    in a codec pool sized like ``parallel()``, and its return value, if
+    not None, is passed to ``eval_func`` in an independently sized 
+    evaluation pool. The two stages overlap, so the codec slots (e.g., 
+    the GPUs) are not idle while the earlier files are evaluated.
+
+    Files enter the codec stage only when there are less than 
+    ``queue_size`` files in the pipeline (being encoded and decoded, 
+    waiting for the evaluation, or being evaluated), so the decoded 
+    outputs waiting for the evaluation are bounded.
+
+    Parameters
+    ----------
+    codec_func : `Callable`
+        The function of the codec stage, which returns the argument of
+        ``eval_func``, or None to skip the evaluation. Handles 
+        ``gpu_queue`` as ``func`` of ``parallel()`` if ``use_gpu`` is 
+        True.
+    eval_func : `Callable`
+        The function of the evaluation stage.
+    filelist : `Iterable`
+        The file list to process.
+    use_gpu : `bool`, optional
+        True for running NN-based PCC algs. in the codec stage, with a 
+        codec process for each available GPU. Defaults to False.
+    nbprocesses : `int`, optional
+        Number of codec processes if ``use_gpu`` is False. If None, it 
+        will equal to the cpu count. Defaults to None.
+    eval_nbprocesses : `int`, optional
+        Number of evaluation processes. If None, it will equal to the 
+        cpu count. Defaults to None.
+    queue_size : `int`, optional
+        Maximum number of files in the pipeline. If None, it will equal
+        to the total number of codec and evaluation processes, so 
+        neither stage waits for the other one unless it is slower. 
+        Defaults to None.
+    display : `bool`, optional
+        True for starting a virtual display (Xvfb) for each evaluation
+        process, see ``parallel()``. Defaults to False.
+
+    Raises
+    ------
+    `ValueError`
+        No available GPU.
+    """
+    assert len(filelist) > 0
+
+    # keep the manager alive until the pools are closed
+    codec_process, codec_func, manager = _codec_workers(
+        codec_func, use_gpu, nbprocesses
+    )
+    eval_process = eval_nbprocesses or os.cpu_count()
+    queue_size = queue_size or codec_process + eval_process
+    # a slot is taken by each file in the pipeline until it is evaluated
+    slots = threading.BoundedSemaphore(queue_size)
+    errors = []
+
+    displays = start_displays(eval_process) if display else []
+
+    session = uuid4().hex[:8]
+    os.environ[SESSION_ENV] = session
+    try:
+        with Pool(codec_process) as codec_pool, Pool(
+            eval_process,
+            initializer=_init_worker if display else None,
+            initargs=([disp.new_display for disp in displays],)
+        ) as eval_pool, tqdm(total=len(filelist)) as pbar:
+            # called by the result handler threads of the pools
+            def done(_ = None) -> None:
+                pbar.update()
+                slots.release()
+
+            def failed(e: BaseException) -> None:
+                errors.append(e)
+                done()
+
+            def decoded(job) -> None:
+                if job is None:
+                    done()
+                    return
+                eval_pool.apply_async(
+                    eval_func, (job,), callback=done, error_callback=failed
+                )
+
+            for filename in filelist:
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                codec_pool.apply_async(
+                    codec_func, (filename,), callback=decoded, 
+                    error_callback=failed
+                )
+            
+            # wait for all the files in the pipeline
+            for _ in range(queue_size):
+                slots.acquire()
+    finally:
+        del os.environ[SESSION_ENV]
+        release_session(session)
+        for disp in reversed(displays):
+            disp.stop()
+
+    if errors:
+        raise errors[0]
+
+def _codec_workers(
+        func: Callable,
+        use_gpu: bool,
+        nbprocesses: int
+    ) -> Tuple[int, Callable, Optional[SyncManager]]:
+    """Number of processes running ``func``, ``func`` with the 
+    ``gpu_queue`` of the available GPUs if ``use_gpu`` is True, and the
+    manager of the queue.
+    """
+    if use_gpu is False:
+        return nbprocesses or os.cpu_count(), func, None
+
+    deviceIDs, gpu_queue, manager = _gpu_queue()
+
+    return len(deviceIDs), partial(func, gpu_queue=gpu_queue), manager
+
+def _gpu_queue() -> Tuple[List[int], BaseProxy, SyncManager]:
+    """The IDs of the available GPUs, a queue of them, and the manager
+    of the queue.
+    """
+    # Get the number of available GPUs
+    deviceIDs = GPUtil.getAvailable(
+        order = 'first',
+        limit = 8,
+        maxLoad = 0.5,
+        maxMemory = 0.5,
+        includeNan=False,
+        excludeID=[],
+        excludeUUID=[]
+    )
+    
+    if len(deviceIDs) <= 0:
+        logger.error(
+            "No available GPU. Check with the threshold parameters "
+            "of ``GPUtil.getAvailable()``"
+        )
+        raise ValueError
+    
+    manager = Manager()
+    gpu_queue = manager.Queue()
+    # gpu_queue = Queue()
+
+    for id in deviceIDs:
+        gpu_queue.put(id)
+
+    return deviceIDs, gpu_queue, manager
+
+def schedule(
+        jobs: List[Tuple[Callable, tuple, List[str], Optional[float]]],
+        limits: Dict[str, int] = None,
+        nbprocesses: int = None,
+        display: bool = False
+    ) -> None:
+    """Run heterogeneous jobs in a single worker pool, with a limit on 
+    the number of running jobs of each group (e.g., of each PCC alg.).
+
+    Each job is a tuple (func, args, groups, cost), where cost is its
+    predicted running time in seconds, or None if unknown. Jobs are 
+    started in the given order (e.g., longest first), except that a 
+    job whose groups are at their limits lets the later jobs of the 
+    other groups start first. If ``func`` returns a list of jobs (e.g.,
+    the evaluation of the decoded point cloud), they are started before
+    the remaining ones.
+
+    Jobs of the group ``GPU_GROUP`` are limited to the number of the 
+    available GPUs, and ``gpu_queue`` is passed to their ``func`` as in
+    ``parallel()``.
+
+    The progress bar shows the estimated remaining time from the costs 
+    of the waiting and running jobs, see ``_Eta``.
+
+    Parameters
+    ----------
+    jobs : `List[Tuple[Callable, tuple, List[str], Optional[float]]]`
+        The jobs to run.
+    limits : `Dict[str, int]`, optional
+        Maximum number of running jobs of each group. Groups not in it
+        are limited by the number of processes only. Defaults to None.
+    nbprocesses : `int`, optional
+        Number of worker processes. If None, it will equal to the cpu 
+        count. Defaults to None.
+    display : `bool`, optional
+        True for starting a virtual display (Xvfb) for each worker 
+        process, see ``parallel()``. Defaults to False.
+
+    Raises
+    ------
+    `ValueError`
+        No available GPU for the jobs of ``GPU_GROUP``.
+    """
+    assert len(jobs) > 0
+
+    process = nbprocesses or os.cpu_count()
+    limits = dict(limits or {})
+    # keep the manager alive until the pool is closed
+    gpu_queue = manager = None
+    if any(GPU_GROUP in groups for _, _, groups, _ in jobs):
+        deviceIDs, gpu_queue, manager = _gpu_queue()
+        limits[GPU_GROUP] = min(
+            limits.get(GPU_GROUP, len(deviceIDs)), len(deviceIDs)
         )
-        process = len(deviceIDs)
-        
-        if process <= 0:
-            logger.error(
-                "No available GPU. Check with the threshold parameters "
-                "of ``GPUtil.getAvailable()``"
+
+    eta = _Eta(process)
+    # waiting jobs of each combination of groups, in order
+    queues = defaultdict(deque)
+    for order, (func, args, groups, cost) in enumerate(jobs):
+        queues[tuple(groups)].append((order, func, args))
+        eta.add(order, cost)
+    # jobs returned by the finished ones are started first
+    first = 0
+    running = defaultdict(int)
+    idle = process
+    errors = []
+    cond = threading.Condition()
+
+    def next_job() -> Optional[tuple]:
+        # the earliest waiting job whose groups are below their limits
+        heads = [
+            (queue[0][0], groups) for groups, queue in queues.items()
+            if queue and all(
+                running[group] < limits.get(group, process)
+                for group in groups
             )
-            raise ValueError
-        
-        manager = Manager()
-        gpu_queue = manager.Queue()
-        # gpu_queue = Queue()
-
-        for id in deviceIDs:
-            gpu_queue.put(id)
-        pfunc = partial(func, gpu_queue=gpu_queue)
-    else:
-        process = nbprocesses
-        pfunc = func
-
-    with Pool(process) as pool:
-        list(tqdm(pool.imap_unordered(pfunc, filelist), total=len(filelist)))
\ No newline at end of file
+        ]
+        if len(heads) == 0:
+            return None
+        _, groups = min(heads)
+
+        return groups, queues[groups].popleft()
+
+    displays = start_displays(process) if display else []
+
+    session = uuid4().hex[:8]
+    os.environ[SESSION_ENV] = session
+    try:
+        with Pool(
+            process, 
+            initializer=_init_worker if display else None,
+            initargs=([disp.new_display for disp in displays],)
+        ) as pool, tqdm(
+            total=len(jobs), 
+            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} '
+                       '[{elapsed}{postfix}]'
+        ) as pbar:
+            # called by the result handler thread of the pool
+            def finished(
+                    groups: tuple, 
+                    order: int, 
+                    ret = None, 
+                    error = None
+                ) -> None:
+                nonlocal idle, first
+                with cond:
+                    idle += 1
+                    for group in groups:
+                        running[group] -= 1
+                    eta.finish(order)
+                    if error is not None:
+                        errors.append(error)
+                    for func, args, next_groups, cost in reversed(ret or []):
+                        first -= 1
+                        queues[tuple(next_groups)].appendleft(
+                            (first, func, args)
+                        )
+                        eta.add(first, cost)
+                        pbar.total += 1
+                    pbar.update()
+                    cond.notify()
+
+            with cond:
+                while len(errors) == 0:
+                    job = next_job() if idle > 0 else None
+                    if job is None:
+                        if idle == process and not any(queues.values()):
+                            break
+                        pbar.set_postfix_str(f'ETA {eta}')
+                        cond.wait(ETA_INTERVAL)
+                        continue
+
+                    groups, (order, func, args) = job
+                    idle -= 1
+                    for group in groups:
+                        running[group] += 1
+                    eta.start(order)
+                    pool.apply_async(
+                        func, args,
+                        {'gpu_queue': gpu_queue} 
+                        if GPU_GROUP in groups else {},
+                        callback=partial(finished, groups, order),
+                        error_callback=partial(finished, groups, order, None)
+                    )
+                
+                # wait for the running jobs
+                while idle < process:
+                    pbar.set_postfix_str(f'ETA {eta}')
+                    cond.wait(ETA_INTERVAL)
+    finally:
+        del os.environ[SESSION_ENV]
+        release_session(session)
+        for disp in reversed(displays):
+            disp.stop()
+
+    if errors:
+        raise errors[0]
+
+class _Eta():
+    """Estimated remaining time of ``schedule()``. The predicted costs 
+    of the jobs are scaled by the ratio of the actual to the predicted
+    running time of the finished jobs, and the jobs without a cost are
+    assumed to take the average running time. The remaining time is 
+    the remaining work divided by the number of processes, but not 
+    less than the longest remaining job.
+    """
+    def __init__(self, process: int) -> None:
+        self._process = process
+        self._waiting = {}
+        # start time and cost of the running jobs
+        self._running = {}
+        self._durations = []
+        # predicted and actual running time of the finished jobs with
+        # a cost
+        self._predicted = 0.0
+        self._actual = 0.0
+
+    def add(self, job_id: int, cost: Optional[float]) -> None:
+        self._waiting[job_id] = cost
+
+    def start(self, job_id: int) -> None:
+        self._running[job_id] = (time.time(), self._waiting.pop(job_id))
+
+    def finish(self, job_id: int) -> None:
+        start, cost = self._running.pop(job_id)
+        duration = time.time() - start
+        self._durations.append(duration)
+        if cost is not None:
+            self._predicted += cost
+            self._actual += duration
+
+    def estimate(self) -> Optional[float]:
+        """The remaining time in seconds, or None if unknown.
+        """
+        now = time.time()
+        scale = self._actual / self._predicted if self._predicted else 1.0
+        average = (
+            sum(self._durations) / len(self._durations) 
+            if self._durations else None
+        )
+
+        remaining = []
+        for start, cost in (
+            [(now, cost) for cost in self._waiting.values()] 
+            + list(self._running.values())
+        ):
+            expected = cost * scale if cost is not None else average
+            if expected is None:
+                return None
+            remaining.append(max(expected - (now - start), 0.0))
+        if len(remaining) == 0:
+            return 0.0
+
+        return max(sum(remaining) / self._process, max(remaining))
+
+    def __str__(self) -> str:
+        remaining = self.estimate()
+        if remaining is None:
+            return '?'
+
+        return tqdm.format_interval(remaining)
+
+def start_displays(num: int) -> List[Xvfb]:
+    """Start ``num`` virtual displays.
+    """
+    displays = []
+    try:
+        for _ in range(num):
+            disp = Xvfb(width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT)
+            disp.start()
+            displays.append(disp)
+    except:
+        for disp in reversed(displays):
+            disp.stop()
+        raise
+
+    logger.info(f"Started {num} virtual displays for the workers.")
+
+    return displays
+
+def _init_worker(displays: List[int]) -> None:
+    """Pool initializer assigning a virtual display to each worker. The
+    workers replacing the exited ones share the displays.
+    """
+    global _display
+
+    worker_id = current_process()._identity[0] - 1
+    _display = f':{displays[worker_id % len(displays)]}'
+    os.environ['DISPLAY'] = _display
+
+def get_visualizer() -> o3d.visualization.Visualizer:
+    """The persistent open3d visualizer of this worker process, which 
+    is reused by all the jobs of the worker. Its window is created and
+    resized by the caller.
+
+    Returns
+    -------
+    `o3d.visualization.Visualizer`
+        The visualizer, or None if the process is not a worker of 
+        ``parallel()`` with a display.
+    """
+    global _visualizer
+
+    if _display is None:
+        return None
+    if _visualizer is None:
+        _visualizer = o3d.visualization.Visualizer()
+
+    return _visualizer
\ No newline at end of file
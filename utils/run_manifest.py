@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Union, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def file_signature(files: List[Union[str, Path]]) -> List[list]:
+    """Name, size and modification time of each file, or None if the
+    file does not exist.
+    """
+    ret = []
+    for filename in files:
+        try:
+            stat = Path(filename).stat()
+        except FileNotFoundError:
+            return None
+        ret.append([Path(filename).name, stat.st_size, stat.st_mtime_ns])
+
+    return ret
+
+def config_hash(cfg: dict) -> str:
+    """SHA-1 digest of a config dictionary, independent of the order of
+    the keys.
+    """
+    text = json.dumps(cfg, sort_keys=True, default=str)
+
+    return hashlib.sha1(text.encode()).hexdigest()
+
+class RunManifest():
+    """Record of the completed stages (e.g., encode, decode and
+    evaluate) of an experiment on a single input file, so an
+    interrupted run can be resumed without redoing them.
+
+    Each stage is recorded with a key describing its inputs (e.g., the
+    hashes of the input file and the config) and the signatures of its
+    outputs. A recorded stage is valid if its key is unchanged and its
+    outputs are not modified since. The keys of the later stages include
+    the signatures of the outputs of the earlier ones, so redoing a
+    stage invalidates the stages depending on it.
+    """
+    def __init__(self, manifest_file: Union[str, Path]) -> None:
+        """
+        Parameters
+        ----------
+        manifest_file : `Union[str, Path]`
+            The manifest file of the experiment.
+        """
+        self._manifest_file = Path(manifest_file)
+        try:
+            self._stages = json.loads(self._manifest_file.read_text())
+        except (FileNotFoundError, ValueError):
+            self._stages = {}
+
+    @property
+    def path(self) -> Path:
+        return self._manifest_file
+
+    def get(
+            self,
+            stage: str,
+            key: dict,
+            outputs: List[Union[str, Path]]
+        ) -> Optional[dict]:
+        """Get the record of a completed stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage.
+        key : `dict`
+            The key of the stage, JSON serializable.
+        outputs : `List[Union[str, Path]]`
+            The output files of the stage.
+
+        Returns
+        -------
+        `Optional[dict]`
+            The information recorded with the stage, or None if the
+            stage is not recorded or not valid anymore.
+        """
+        record = self._stages.get(stage)
+        if record is None:
+            return None
+        if record['key'] != json.loads(json.dumps(key)):
+            return None
+        if len(outputs) == 0 or record['outputs'] != file_signature(outputs):
+            return None
+
+        return record['info']
+
+    def recorded(self, stage: str) -> Optional[dict]:
+        """The information recorded with a stage, even if the stage is
+        not valid anymore (e.g., the running time of an outdated 
+        stage), or None if the stage is not recorded.
+        """
+        record = self._stages.get(stage)
+
+        return None if record is None else record['info']
+
+    def record(
+            self,
+            stage: str,
+            key: dict,
+            outputs: List[Union[str, Path]],
+            **info
+        ) -> None:
+        """Record a completed stage and save the manifest.
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage.
+        key : `dict`
+            The key of the stage, JSON serializable.
+        outputs : `List[Union[str, Path]]`
+            The output files of the stage.
+        **info
+            The information recorded with the stage, JSON serializable,
+            e.g., its running time.
+        """
+        signature = file_signature(outputs)
+        if signature is None:
+            logger.warning(
+                f"The outputs of the {stage} stage are missing, "
+                f"the stage is not recorded."
+            )
+            return
+
+        self._stages[stage] = {
+            'key': key, 'outputs': signature, 'info': info
+        }
+
+        self._manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._manifest_file.with_name(
+            f'.{self._manifest_file.name}.{os.getpid()}.tmp'
+        )
+        tmp_file.write_text(json.dumps(self._stages))
+        os.replace(tmp_file, self._manifest_file)
@@ -0,0 +1,264 @@
+import os
+import errno
+import fcntl
+import pickle
+import struct
+import shutil
+import hashlib
+import logging
+import multiprocessing as mp
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Iterator, TextIO
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from utils.cache import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Environment variable of the session id of the shared memory registry.
+# Set by ``utils.processing.parallel()`` and inherited by the workers.
+SESSION_ENV = 'PCC_ARENA_SHM_SESSION'
+# Name of the directory of the lock files of the segments, see
+# ``get_cache_dir()``
+LOCK_DIR = 'shm'
+# Prefix of the segment names
+SEGMENT_PREFIX = 'pcc_arena'
+# Alignment of the arrays in a segment
+ALIGNMENT = 64
+# Mount point of the shared memory segments
+SHM_DIR = '/dev/shm'
+# Layout of a segment: [header size][header][aligned buffers...]
+_SIZE = struct.Struct('<Q')
+
+# Segments attached by this process, with their number of users in this
+# process
+_attached: Dict[str, list] = {}
+# Segments no longer used by this process, but still referred to by
+# objects loaded from them. Closed once the objects are freed.
+_detached: List[SharedMemory] = []
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _segment_name(key: str, session: str) -> str:
+    digest = hashlib.sha1(key.encode()).hexdigest()[:20]
+    return f'{SEGMENT_PREFIX}_{session}_{digest}'
+
+def _untrack(shm: SharedMemory) -> None:
+    # The segments are released explicitly by their last user or by
+    # ``release_session()``, not by the resource tracker when the first
+    # worker exits.
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+def get_session() -> str:
+    """The session id of the shared memory registry, or None if the
+    current process is not a worker of ``utils.processing.parallel()``.
+    """
+    if mp.parent_process() is None:
+        return None
+    return os.environ.get(SESSION_ENV)
+
+@contextmanager
+def share_object(key: str, build: Callable[[], Any]) -> Iterator[Any]:
+    """Get the object ``key`` from shared memory, as a context manager.
+    The first worker asking for ``key`` builds the object with 
+    ``build()`` and copies it into a shared memory segment, and the 
+    other workers attach to the segment instead of building their own
+    copy. The numpy arrays of the object (e.g., points and KD-tree 
+    nodes) are views of the shared memory, so they must be treated as 
+    read-only, and must not be used after the context exits.
+
+    Each segment counts the workers using it. The attachment of a worker
+    is closed when its context exits, and the segment is unlinked when
+    its last user exits, so only the objects in use occupy shared 
+    memory. If the segment cannot be created, e.g., shared memory is 
+    full, the object is built by the worker itself.
+
+    Outside the workers of ``utils.processing.parallel()``, the object
+    is simply built.
+
+    Parameters
+    ----------
+    key : `str`
+        Unique key of the object, e.g., the hash of its source file.
+    build : `Callable[[], Any]`
+        Function to build the object. The object must be picklable.
+
+    Yields
+    ------
+    `Any`
+        The object ``key``.
+    """
+    session = get_session()
+    if session is None:
+        yield build()
+        return
+
+    name = _segment_name(key, session)
+    if name in _attached:
+        _attached[name][1] += 1
+    else:
+        with _lock(name) as lock:
+            try:
+                shm = SharedMemory(name)
+            except FileNotFoundError:
+                obj = build()
+                try:
+                    shm = _create(name, obj)
+                except OSError as e:
+                    logger.warning(
+                        f"Failed to share {key} in shared memory ({e}), "
+                        f"use a private copy."
+                    )
+                    shm = None
+            if shm is not None:
+                _untrack(shm)
+                _add_users(lock, 1)
+        if shm is None:
+            yield obj
+            return
+        _attached[name] = [shm, 1]
+
+    try:
+        yield _load(_attached[name][0])
+    finally:
+        _release(name)
+
+@contextmanager
+def _lock(name: str) -> Iterator[TextIO]:
+    """Lock the segment ``name``. The lock file stores the number of
+    workers using the segment.
+    """
+    lock_dir = get_cache_dir(LOCK_DIR)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_dir.joinpath(f'{name}.lock'), 'a+') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield lock
+
+def _add_users(lock: TextIO, count: int) -> int:
+    lock.seek(0)
+    users = int(lock.read() or 0) + count
+    lock.seek(0)
+    lock.truncate()
+    lock.write(str(users))
+    lock.flush()
+
+    return users
+
+def _release(name: str) -> None:
+    """Release a use of the segment ``name`` by this process. The 
+    attachment is closed after the last use in this process, and the 
+    segment is unlinked after the last use in all the workers.
+    """
+    # close the attachments of which the objects are freed by now
+    for shm in _detached[:]:
+        _detached.remove(shm)
+        _close(shm)
+
+    _attached[name][1] -= 1
+    if _attached[name][1] > 0:
+        return
+    shm, _ = _attached.pop(name)
+    _close(shm)
+
+    with _lock(name) as lock:
+        if _add_users(lock, -1) <= 0:
+            _unlink(name)
+
+def _close(shm: SharedMemory) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # the caller still refers to the loaded object
+        _detached.append(shm)
+
+def _unlink(name: str) -> None:
+    try:
+        shm = SharedMemory(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+    logger.debug(f"Release shared memory segment {name}.")
+
+def _free_space() -> int:
+    """Free space of the shared memory in bytes, or None if unknown.
+    """
+    try:
+        return shutil.disk_usage(SHM_DIR).free
+    except OSError:
+        return None
+
+def _create(name: str, obj: Any) -> SharedMemory:
+    """Serialize ``obj`` into a new segment ``name``. Large buffers
+    (numpy arrays) are stored out-of-band and aligned, so they can be
+    loaded without copying.
+    """
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    buffers = [buf.raw() for buf in buffers]
+
+    # the header stores the payload and the location of each buffer,
+    # measure its size with the largest placeholder offsets first
+    def make_header(offsets):
+        return pickle.dumps(
+            (payload, [(o, b.nbytes) for o, b in zip(offsets, buffers)]),
+            protocol=5
+        )
+    header_size = len(make_header([1 << 62] * len(buffers)))
+    offsets = []
+    offset = _align(_SIZE.size + header_size)
+    for buf in buffers:
+        offsets.append(offset)
+        offset = _align(offset + buf.nbytes)
+    header = make_header(offsets)
+
+    # segments are allocated lazily, so a segment larger than the free
+    # space would crash the worker on writing instead of failing here
+    free = _free_space()
+    if free is not None and offset > free:
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), name)
+    shm = SharedMemory(name, create=True, size=max(offset, 1))
+    try:
+        shm.buf[:_SIZE.size] = _SIZE.pack(len(header))
+        shm.buf[_SIZE.size:_SIZE.size+len(header)] = header
+        for o, buf in zip(offsets, buffers):
+            shm.buf[o:o+buf.nbytes] = buf
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    logger.debug(f"Create shared memory segment {name} ({offset} bytes).")
+
+    return shm
+
+def _load(shm: SharedMemory) -> Any:
+    """Load the object in the segment ``shm`` without copying its
+    out-of-band buffers.
+    """
+    header_size, = _SIZE.unpack(shm.buf[:_SIZE.size])
+    payload, locations = pickle.loads(
+        shm.buf[_SIZE.size:_SIZE.size+header_size]
+    )
+    buffers = [shm.buf[o:o+nbytes] for o, nbytes in locations]
+
+    return pickle.loads(payload, buffers=buffers)
+
+def release_session(session: str) -> None:
+    """Unlink all the segments of ``session`` left by the workers, e.g.,
+    the ones killed while using them. Processes attached to the segments
+    can still use them until they exit.
+
+    Parameters
+    ----------
+    session : `str`
+        The session id set by ``utils.processing.parallel()``.
+    """
+    prefix = f'{SEGMENT_PREFIX}_{session}_'
+    for lock_file in get_cache_dir(LOCK_DIR).glob(f'{prefix}*.lock'):
+        _unlink(lock_file.stem)
+        lock_file.unlink()